@@ -0,0 +1,7 @@
+import os
+
+
+def set_dummy_upstream_settings() -> None:
+    """main.py requires the upstream settings at import; the benchmarks never call the real APIs."""
+    for name in ("API_KEY_MASTR", "API_URL_MASTR", "API_KEY_ENTSOE", "API_URL_ENTSOE"):
+        os.environ.setdefault(name, "http://127.0.0.1:9")
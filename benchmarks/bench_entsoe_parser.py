@@ -0,0 +1,61 @@
+"""
+Compares the legacy ENTSOE parse path (xmltodict -> Pydantic validate -> model_dump) with the
+streaming EntsoeDocumentParser: wall time and peak traced memory for one document.
+
+Usage:
+    python -m benchmarks.bench_entsoe_parser --days 28 --resolution PT15M
+"""
+import argparse
+import json
+import time
+import tracemalloc
+
+from benchmarks import set_dummy_upstream_settings
+
+set_dummy_upstream_settings()
+
+import main
+from benchmarks.entsoe_fixtures import make_document_for_days
+
+CHUNK_SIZE = 64 * 1024
+
+
+def legacy_path(body: bytes):
+    return main._parse_entsoe_xml(body.decode("utf-8"))
+
+
+def streaming_path(body: bytes):
+    return main.parse_entsoe_document(body[i:i + CHUNK_SIZE] for i in range(0, len(body), CHUNK_SIZE))
+
+
+def measure(fn, body: bytes, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(body)
+        best = min(best, time.perf_counter() - started)
+    tracemalloc.start()
+    result = fn(body)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak, result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=28)
+    parser.add_argument("--resolution", default="PT15M", choices=["PT15M", "PT30M", "PT60M"])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    body = make_document_for_days(args.days, args.resolution).encode("utf-8")
+    print(f"Document: {args.days} days at {args.resolution}, {len(body) / 1e6:.1f} MB")
+
+    legacy_time, legacy_peak, legacy_result = measure(legacy_path, body, args.repeat)
+    streaming_time, streaming_peak, streaming_result = measure(streaming_path, body, args.repeat)
+    same = json.dumps(legacy_result, sort_keys=True) == json.dumps(streaming_result, sort_keys=True)
+
+    print(f"{'path':<12}{'time (ms)':>12}{'peak (MB)':>12}")
+    print(f"{'legacy':<12}{legacy_time * 1e3:>12.1f}{legacy_peak / 1e6:>12.1f}")
+    print(f"{'streaming':<12}{streaming_time * 1e3:>12.1f}{streaming_peak / 1e6:>12.1f}")
+    print(f"speedup {legacy_time / streaming_time:.1f}x, peak memory {legacy_peak / streaming_peak:.1f}x lower, identical output: {same}")
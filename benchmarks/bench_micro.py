@@ -0,0 +1,58 @@
+"""
+Micro-benchmarks for the per-request hot paths: XML normalization helpers, ENTSOE parsing (legacy and
+streaming), response model validation and JSON serialization. Reports the best time per call.
+
+Usage:
+    python -m benchmarks.bench_micro --days 7
+"""
+import argparse
+import timeit
+
+from benchmarks import set_dummy_upstream_settings
+
+set_dummy_upstream_settings()
+
+import xmltodict
+
+import main
+from benchmarks.entsoe_fixtures import make_document_for_days
+from benchmarks.mastr_fixtures import make_einheit
+
+
+def cases(days: int):
+    xml = make_document_for_days(days, "PT15M")
+    body = xml.encode("utf-8")
+    parsed = xmltodict.parse(xml)
+    document = main.parse_entsoe_document([body])
+    einheit = make_einheit(main.GetEinheitWindResponse, "SEE900000000001")
+    return [
+        ("extract_text(dict)", lambda: main.extract_text({"@codingScheme": "A01", "#text": "10YCZ-CEPS-----N"})),
+        ("extract_text(str)", lambda: main.extract_text("10YCZ-CEPS-----N")),
+        ("ensure_list(dict)", lambda: main.ensure_list({"position": "1"})),
+        ("ensure_list(list)", lambda: main.ensure_list([{"position": "1"}])),
+        (f"xmltodict.parse {days}d", lambda: xmltodict.parse(xml)),
+        (f"parse_entsoe_document {days}d", lambda: main.parse_entsoe_document([body])),
+        (f"validate ENTSOE {days}d", lambda: main.DayAheadTotalLoadForecastResponse.model_validate(parsed).model_dump()),
+        ("validate GetEinheitWind", lambda: main.GetEinheitWindResponse.model_validate(einheit).model_dump(by_alias=True)),
+        ("dump_json GetEinheitWind", lambda: main.dump_json(einheit)),
+        (f"dump_json ENTSOE {days}d", lambda: main.dump_json(document)),
+    ]
+
+
+def best_per_call(fn, repeat: int = 5) -> float:
+    timer = timeit.Timer(fn)
+    # autorange picks a loop count that takes at least 0.2 s
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=7, help="Days of PT15M data in the ENTSOE document")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'case':<32}{'per call':>14}")
+    for label, fn in cases(args.days):
+        seconds = best_per_call(fn, args.repeat)
+        print(f"{label:<32}{seconds * 1e6:>11.2f} us" if seconds < 1e-3 else f"{label:<32}{seconds * 1e3:>11.2f} ms")
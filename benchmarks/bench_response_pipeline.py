@@ -0,0 +1,87 @@
+"""
+Compares the CPU time per request of the previous response pipeline (endpoint returns the dict, FastAPI
+validates it against response_model and encodes it with jsonable_encoder + json) with the current one
+(payload validated once when fetched, endpoint returns a FastJSONResponse). Both run in the same app,
+called in-process through httpx's ASGI transport, so the difference is the per-request CPU saved.
+
+Usage:
+    python -m benchmarks.bench_response_pipeline --requests 2000 --days 7
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from benchmarks import set_dummy_upstream_settings
+
+set_dummy_upstream_settings()
+
+import httpx
+from fastapi import FastAPI
+
+import main
+from benchmarks.entsoe_fixtures import make_document_for_days
+from benchmarks.mastr_fixtures import make_einheit
+
+
+def build_app(einheit, document) -> FastAPI:
+    app = FastAPI()
+    # What the cache holds: the raw payload before, the validated dump now
+    validated_einheit = main.validate_response("GetEinheitWind", main.GetEinheitWindResponse, einheit)
+
+    @app.post("/before/einheit", response_model=main.GetEinheitWindResponse, response_model_by_alias=True)
+    async def einheit_before():
+        return einheit
+
+    @app.post("/after/einheit")
+    async def einheit_after():
+        return main.FastJSONResponse(validated_einheit)
+
+    @app.get("/before/entsoe", response_model=main.DayAheadTotalLoadForecastResponse)
+    async def entsoe_before():
+        return document
+
+    @app.get("/after/entsoe")
+    async def entsoe_after():
+        return main.FastJSONResponse(document)
+
+    return app
+
+
+async def measure(client: httpx.AsyncClient, method: str, path: str, requests: int, repeat: int = 3):
+    body = (await client.request(method, path)).content
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.process_time()
+        for _ in range(requests):
+            await client.request(method, path)
+        best = min(best, (time.process_time() - started) / requests)
+    return best, body
+
+
+async def run(einheit, document, einheit_requests: int, entsoe_requests: int, days: int) -> None:
+    transport = httpx.ASGITransport(app=build_app(einheit, document))
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for label, method, path, count in (
+            ("GetEinheitWind", "POST", "einheit", einheit_requests),
+            (f"ENTSOE {days}d PT15M", "GET", "entsoe", entsoe_requests),
+        ):
+            before, before_body = await measure(client, method, f"/before/{path}", count)
+            after, after_body = await measure(client, method, f"/after/{path}", count)
+            same = json.loads(before_body) == json.loads(after_body)
+            print(f"{label:<24}{before * 1e3:>14.3f}{after * 1e3:>14.3f}{(before - after) * 1e3:>14.3f}{str(same):>11}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per Einheit case")
+    parser.add_argument("--days", type=int, default=7, help="Days of PT15M data in the ENTSOE document")
+    args = parser.parse_args()
+
+    einheit = make_einheit(main.GetEinheitWindResponse, "SEE900000000001")
+    document = main.parse_entsoe_document([make_document_for_days(args.days, "PT15M").encode("utf-8")])
+    entsoe_requests = max(args.requests // 20, 10)
+
+    print(f"JSON encoder: {'orjson' if main.orjson is not None else 'json (orjson not installed)'}")
+    print(f"{'case':<24}{'before (ms)':>14}{'after (ms)':>14}{'saved (ms)':>14}{'same body':>11}")
+    asyncio.run(run(einheit, document, args.requests, entsoe_requests, args.days))
@@ -0,0 +1,47 @@
+"""Synthetic ENTSOE GL_MarketDocument payloads for benchmarks and local upstream stand-ins."""
+import math
+from datetime import datetime, timedelta, timezone
+
+RESOLUTION_MINUTES = {"PT15M": 15, "PT30M": 30, "PT60M": 60}
+
+
+def make_gl_market_document(start: datetime, end: datetime, resolution: str = "PT60M",
+                            zone: str = "10YCZ-CEPS-----N") -> str:
+    """Builds a day-ahead total load forecast document with one TimeSeries per (UTC) day of [start, end)."""
+    step = RESOLUTION_MINUTES[resolution]
+    parts = [
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<GL_MarketDocument xmlns="urn:iec62325.351:tc57wg16:451-6:generationloaddocument:3:0">'
+        "<mRID>bench0000000000000000000000000000</mRID><revisionNumber>1</revisionNumber><type>A65</type>"
+        "<process.processType>A01</process.processType>"
+        '<sender_MarketParticipant.mRID codingScheme="A01">10X1001A1001A450</sender_MarketParticipant.mRID>'
+        "<sender_MarketParticipant.marketRole.type>A32</sender_MarketParticipant.marketRole.type>"
+        f"<createdDateTime>{start:%Y-%m-%dT%H:%M:%SZ}</createdDateTime>"
+        f"<time_Period.timeInterval><start>{start:%Y-%m-%dT%H:%MZ}</start><end>{end:%Y-%m-%dT%H:%MZ}</end></time_Period.timeInterval>"
+    ]
+    day_start = start
+    index = 1
+    while day_start < end:
+        day_end = min(day_start + timedelta(days=1), end)
+        count = int((day_end - day_start).total_seconds() // 60 // step)
+        parts.append(
+            f"<TimeSeries><mRID>{index}</mRID><businessType>A04</businessType><objectAggregation>A01</objectAggregation>"
+            f'<outBiddingZone_Domain.mRID codingScheme="A01">{zone}</outBiddingZone_Domain.mRID>'
+            "<quantity_Measure_Unit.name>MAW</quantity_Measure_Unit.name><curveType>A01</curveType>"
+            f"<Period><timeInterval><start>{day_start:%Y-%m-%dT%H:%MZ}</start><end>{day_end:%Y-%m-%dT%H:%MZ}</end></timeInterval>"
+            f"<resolution>{resolution}</resolution>"
+        )
+        for position in range(1, count + 1):
+            minutes = (position - 1) * step
+            quantity = 5000 + int(1500 * math.sin(2 * math.pi * minutes / 1440))
+            parts.append(f"<Point><position>{position}</position><quantity>{quantity}</quantity></Point>")
+        parts.append("</Period></TimeSeries>")
+        day_start = day_end
+        index += 1
+    parts.append("</GL_MarketDocument>")
+    return "".join(parts)
+
+
+def make_document_for_days(days: int, resolution: str = "PT15M") -> str:
+    start = datetime(2023, 1, 1, tzinfo=timezone.utc)
+    return make_gl_market_document(start, start + timedelta(days=days), resolution)
@@ -0,0 +1,226 @@
+"""
+Local stand-in for Redis: an in-memory server speaking the Redis protocol (RESP2) with the commands the proxy's
+cache backend uses, so CACHE_BACKEND=redis://... can be tried and load-tested without a Redis installation.
+
+Supported: PING, ECHO, AUTH, SELECT, GET, SET (EX/PX/NX/XX), DEL, EXISTS, PTTL, HSET, HMGET, ZADD, ZRANGEBYSCORE, DBSIZE,
+FLUSHDB, FLUSHALL, WATCH, UNWATCH, MULTI, EXEC, DISCARD, QUIT. Databases share one keyspace.
+
+Usage:
+    python -m benchmarks.fake_redis --port 6399
+    CACHE_BACKEND=redis://127.0.0.1:6399/0 python serve.py --workers 4
+"""
+import argparse
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class FakeRedis:
+    def __init__(self):
+        # key -> (value, expires_at or None); hashes and sorted sets are stored as dicts (field -> value / score)
+        self.data: Dict[bytes, Tuple[Any, Optional[float]]] = {}
+        # Bumped on every write, WATCH compares it at EXEC
+        self.versions: Dict[bytes, int] = {}
+        self.commands = 0
+
+    def _get(self, key: bytes) -> Any:
+        entry = self.data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self.data[key]
+            self._touch(key)
+            return None
+        return value
+
+    def _touch(self, key: bytes) -> None:
+        self.versions[key] = self.versions.get(key, 0) + 1
+
+    def execute(self, args: List[bytes]) -> Any:
+        self.commands += 1
+        name = args[0].upper()
+        if name == b"PING":
+            return SimpleString("PONG")
+        if name == b"ECHO":
+            return args[1]
+        if name in (b"AUTH", b"SELECT", b"UNWATCH"):
+            return SimpleString("OK")
+        if name == b"GET":
+            value = self._get(args[1])
+            if isinstance(value, dict):
+                return Error("WRONGTYPE Operation against a key holding the wrong kind of value")
+            return value
+        if name == b"SET":
+            return self._set(args[1], args[2], [arg.upper() for arg in args[3:]])
+        if name == b"DEL":
+            removed = 0
+            for key in args[1:]:
+                if self._get(key) is not None:
+                    del self.data[key]
+                    self._touch(key)
+                    removed += 1
+            return removed
+        if name == b"EXISTS":
+            return sum(self._get(key) is not None for key in args[1:])
+        if name == b"PTTL":
+            if self._get(args[1]) is None:
+                return -2
+            expires_at = self.data[args[1]][1]
+            return -1 if expires_at is None else int((expires_at - time.monotonic()) * 1000)
+        if name in (b"HSET", b"ZADD"):
+            mapping = self._get(args[1])
+            if mapping is None:
+                mapping = {}
+                self.data[args[1]] = (mapping, None)
+            pairs = list(zip(args[2::2], args[3::2]))
+            if name == b"ZADD":
+                pairs = [(member, float(score)) for score, member in pairs]
+            added = sum(field not in mapping for field, _ in pairs)
+            mapping.update(pairs)
+            self._touch(args[1])
+            return added
+        if name == b"HMGET":
+            mapping = self._get(args[1]) or {}
+            return [mapping.get(field) for field in args[2:]]
+        if name == b"ZRANGEBYSCORE":
+            return self._zrangebyscore(self._get(args[1]) or {}, args[2], args[3], b"WITHSCORES" in
+                                       [arg.upper() for arg in args[4:]])
+        if name == b"DBSIZE":
+            return sum(self._get(key) is not None for key in list(self.data))
+        if name in (b"FLUSHDB", b"FLUSHALL"):
+            for key in list(self.data):
+                self._touch(key)
+            self.data.clear()
+            return SimpleString("OK")
+        return Error(f"ERR unknown command '{args[0].decode(errors='replace')}'")
+
+    @staticmethod
+    def _zrangebyscore(scores: Dict[bytes, float], low: bytes, high: bytes, with_scores: bool) -> List[bytes]:
+        def bound(value: bytes) -> Tuple[float, bool]:
+            exclusive = value.startswith(b"(")
+            return float(value.lstrip(b"(")), exclusive
+
+        (low, low_exclusive), (high, high_exclusive) = bound(low), bound(high)
+        reply = []
+        for member, score in sorted(scores.items(), key=lambda item: (item[1], item[0])):
+            if (score > low or score == low and not low_exclusive) and (score < high or score == high and not high_exclusive):
+                reply.append(member)
+                if with_scores:
+                    reply.append(repr(score).encode() if score != int(score) else b"%d" % score)
+        return reply
+
+    def _set(self, key: bytes, value: bytes, options: List[bytes]) -> Any:
+        expires_at = None
+        if b"EX" in options:
+            expires_at = time.monotonic() + int(options[options.index(b"EX") + 1])
+        if b"PX" in options:
+            expires_at = time.monotonic() + int(options[options.index(b"PX") + 1]) / 1000
+        exists = self._get(key) is not None
+        if (b"NX" in options and exists) or (b"XX" in options and not exists):
+            return None
+        self.data[key] = (value, expires_at)
+        self._touch(key)
+        return SimpleString("OK")
+
+
+class SimpleString(str):
+    pass
+
+
+class Error(str):
+    pass
+
+
+def encode(reply: Any) -> bytes:
+    if reply is None:
+        return b"$-1\r\n"
+    if isinstance(reply, Error):
+        return b"-%b\r\n" % reply.encode()
+    if isinstance(reply, SimpleString):
+        return b"+%b\r\n" % reply.encode()
+    if isinstance(reply, int):
+        return b":%d\r\n" % reply
+    if isinstance(reply, bytes):
+        return b"$%d\r\n%b\r\n" % (len(reply), reply)
+    if isinstance(reply, list):
+        return b"*%d\r\n" % len(reply) + b"".join(encode(item) for item in reply)
+    raise TypeError(type(reply))
+
+
+async def read_command(reader: asyncio.StreamReader) -> Optional[List[bytes]]:
+    line = await reader.readline()
+    if not line:
+        return None
+    if not line.startswith(b"*"):
+        # Inline command, as sent by redis-cli or telnet
+        return line.split()
+    args = []
+    for _ in range(int(line[1:-2])):
+        length = int((await reader.readline())[1:-2])
+        args.append((await reader.readexactly(length + 2))[:-2])
+    return args
+
+
+def create_server(store: FakeRedis, host: str, port: int):
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        watched: Dict[bytes, int] = {}
+        queued: Optional[List[List[bytes]]] = None
+        try:
+            while True:
+                args = await read_command(reader)
+                if not args:
+                    break
+                name = args[0].upper()
+                if name == b"QUIT":
+                    writer.write(encode(SimpleString("OK")))
+                    break
+                if name == b"WATCH":
+                    watched.update((key, store.versions.get(key, 0)) for key in args[1:])
+                    reply = SimpleString("OK")
+                elif name == b"UNWATCH":
+                    watched.clear()
+                    reply = SimpleString("OK")
+                elif name == b"MULTI":
+                    queued = []
+                    reply = SimpleString("OK")
+                elif name == b"DISCARD":
+                    queued, reply = None, SimpleString("OK")
+                    watched.clear()
+                elif name == b"EXEC":
+                    if queued is None:
+                        reply = Error("ERR EXEC without MULTI")
+                    elif any(store.versions.get(key, 0) != version for key, version in watched.items()):
+                        # A watched key changed: the transaction is aborted with a nil reply
+                        reply = None
+                    else:
+                        reply = [store.execute(command) for command in queued]
+                    queued = None
+                    watched.clear()
+                elif queued is not None:
+                    queued.append(args)
+                    reply = SimpleString("QUEUED")
+                else:
+                    reply = store.execute(args)
+                writer.write(encode(reply))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    return asyncio.start_server(handle, host, port)
+
+
+async def serve(host: str, port: int) -> None:
+    server = await create_server(FakeRedis(), host, port)
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6399)
+    args = parser.parse_args()
+    asyncio.run(serve(args.host, args.port))
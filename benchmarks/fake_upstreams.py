@@ -0,0 +1,92 @@
+"""
+Local stand-ins for the MaStR (JSON) and ENTSOE (XML) APIs, so the proxy can be started and load-tested
+without API keys or network access.
+
+    MaStR:  POST /mastr/<Endpoint>   (API_URL_MASTR=http://127.0.0.1:<port>/mastr)
+    ENTSOE: GET  /entsoe/api         (API_URL_ENTSOE=http://127.0.0.1:<port>/entsoe/api)
+
+Usage:
+    python -m benchmarks.fake_upstreams --port 9100 --entsoe-resolution PT15M --latency-ms 50
+"""
+import argparse
+import asyncio
+import zlib
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Optional
+
+from benchmarks import set_dummy_upstream_settings
+
+set_dummy_upstream_settings()
+
+from fastapi import FastAPI, Request, Response
+
+import main
+from benchmarks.entsoe_fixtures import make_gl_market_document
+from benchmarks.mastr_fixtures import make_einheit, make_netzanschlusspunkt
+
+
+@lru_cache(maxsize=100_000)
+def _einheit_body(endpoint: str, einheit_mastr_nummer: str) -> bytes:
+    seed = zlib.crc32(einheit_mastr_nummer.encode())
+    return main.dump_json(make_einheit(main.EINHEIT_RESPONSE_MODELS[endpoint], einheit_mastr_nummer, seed=seed))
+
+
+@lru_cache(maxsize=1024)
+def _entsoe_body(period_start: str, period_end: str, zone: str, resolution: str) -> bytes:
+    start = datetime.strptime(period_start, "%Y%m%d%H%M").replace(tzinfo=timezone.utc)
+    end = datetime.strptime(period_end, "%Y%m%d%H%M").replace(tzinfo=timezone.utc)
+    return make_gl_market_document(start, end, resolution, zone).encode("utf-8")
+
+
+def create_app(latency_ms: float = 0.0, entsoe_resolution: str = "PT60M", netzanschlusspunkte: int = 10_000) -> FastAPI:
+    app = FastAPI(title="Fake MaStR & ENTSOE upstreams")
+    app.state.requests = 0
+
+    async def simulate_latency() -> None:
+        app.state.requests += 1
+        if latency_ms > 0:
+            await asyncio.sleep(latency_ms / 1000)
+
+    @app.post("/mastr/{endpoint}")
+    async def mastr(endpoint: str, request: Request):
+        await simulate_latency()
+        payload = await request.json()
+        if endpoint == "GetListeAlleNetzanschlusspunkte":
+            start_ab = payload.get("startAb") or 0
+            limit = payload.get("limit") or 100
+            rows = [make_netzanschlusspunkt(index) for index in range(start_ab, min(start_ab + limit, netzanschlusspunkte))]
+            return Response(main.dump_json({"Ergebniscode": "OK", "AufrufVeraltet": False, "AufrufVersion": 1,
+                                            "ListeNetzanschlusspunkte[]": rows}), media_type="application/json")
+        if endpoint not in main.EINHEIT_RESPONSE_MODELS:
+            return Response(f"Unknown endpoint {endpoint}", status_code=404)
+        return Response(_einheit_body(endpoint, payload["einheitMastrNummer"]), media_type="application/json")
+
+    @app.get("/entsoe/api")
+    async def entsoe(periodStart: str, periodEnd: str, out_Domain: Optional[str] = None,
+                     outBiddingZone_Domain: Optional[str] = None):
+        await simulate_latency()
+        # The proxy sends the zone as out_Domain
+        zone = out_Domain or outBiddingZone_Domain or "10YCZ-CEPS-----N"
+        body = _entsoe_body(periodStart, periodEnd, zone, entsoe_resolution)
+        return Response(body, media_type="text/xml")
+
+    @app.get("/stats")
+    async def stats():
+        return {"requests": app.state.requests}
+
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Added delay per upstream response")
+    parser.add_argument("--entsoe-resolution", default="PT60M", choices=["PT15M", "PT30M", "PT60M"])
+    parser.add_argument("--netzanschlusspunkte", type=int, default=10_000, help="Rows served by GetListeAlleNetzanschlusspunkte")
+    args = parser.parse_args()
+    uvicorn.run(create_app(args.latency_ms, args.entsoe_resolution, args.netzanschlusspunkte),
+                host=args.host, port=args.port, log_level="warning")
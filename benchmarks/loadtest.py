@@ -0,0 +1,200 @@
+"""
+End-to-end load test: starts the fake upstreams and the proxy (uvicorn) as subprocesses, then drives each
+scenario at the given concurrency levels for a fixed duration and reports RPS and latency percentiles.
+
+Scenarios:
+    root          GET  /                                  (framework overhead baseline)
+    einheit       POST /get_einheit_wind                  (random unit out of --units; cache hits after warm-up)
+    batch         POST /get_einheiten_batch               (--batch-size units per request)
+    netzanschluss POST /get_liste_alle_netzanschlusspunkte (one page of 100 rows)
+    entsoe        GET  /day_ahead_total_load_forecast     (--entsoe-days of data, chunked by the proxy)
+
+Usage:
+    python -m benchmarks.loadtest --concurrency 1,16,64 --duration 10 --latency-ms 20
+    python -m benchmarks.loadtest --proxy-url http://127.0.0.1:8000 --scenario einheit   # against a running proxy
+    python -m benchmarks.loadtest --workers 4 --cache-backend fake-redis                 # serve.py with a shared cache
+"""
+import os
+import sys
+import argparse
+import asyncio
+import random
+import subprocess
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+Request = Tuple[str, str, Dict]
+
+
+def make_scenarios(args) -> Dict[str, Callable[[random.Random], Request]]:
+    start = datetime(2023, 1, 2, tzinfo=timezone.utc)
+    entsoe_params = {
+        "document_type": "A65",
+        "process_type": "A01",
+        "out_bidding_zone_domain": "10YCZ-CEPS-----N",
+        "period_start": f"{start:%Y%m%d%H%M}",
+        "period_end": f"{start + timedelta(days=args.entsoe_days):%Y%m%d%H%M}",
+    }
+
+    def unit(rng: random.Random) -> str:
+        return f"SEE{rng.randrange(args.units):012d}"
+
+    return {
+        "root": lambda rng: ("GET", "/", {}),
+        "einheit": lambda rng: ("POST", "/get_einheit_wind", {
+            "json": {"marktakteurMastrNummer": "SNB000000000001", "einheitMastrNummer": unit(rng)}}),
+        "batch": lambda rng: ("POST", "/get_einheiten_batch", {
+            "json": {"marktakteurMastrNummer": "SNB000000000001",
+                     "einheiten": [{"einheitMastrNummer": unit(rng), "type": "wind"} for _ in range(args.batch_size)]}}),
+        "netzanschluss": lambda rng: ("POST", "/get_liste_alle_netzanschlusspunkte", {
+            "params": {"mirror_max_age": 0},
+            "json": {"marktakteurMastrNummer": "SNB000000000001", "startAb": rng.randrange(0, 9900), "limit": 100}}),
+        "entsoe": lambda rng: ("GET", "/day_ahead_total_load_forecast", {"params": entsoe_params}),
+    }
+
+
+async def run_scenario(client: httpx.AsyncClient, make_request: Callable[[random.Random], Request],
+                       concurrency: int, duration: float) -> Dict[str, float]:
+    latencies: List[float] = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker(seed: int) -> None:
+        nonlocal errors
+        rng = random.Random(seed)
+        while time.perf_counter() < deadline:
+            method, path, kwargs = make_request(rng)
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, path, **kwargs)
+                await response.aread()
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(seed) for seed in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    values = np.array(latencies) * 1000 if latencies else np.zeros(1)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed,
+        "p50": float(np.percentile(values, 50)),
+        "p90": float(np.percentile(values, 90)),
+        "p99": float(np.percentile(values, 99)),
+        "max": float(values.max()),
+    }
+
+
+async def wait_until_ready(url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get(url)
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+    raise RuntimeError(f"{url} did not come up within {timeout:.0f}s")
+
+
+def start_processes(args) -> List[subprocess.Popen]:
+    upstream = f"http://127.0.0.1:{args.upstream_port}"
+    fake = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.fake_upstreams", "--port", str(args.upstream_port),
+         "--latency-ms", str(args.latency_ms), "--entsoe-resolution", args.entsoe_resolution],
+        cwd=REPO_ROOT,
+    )
+    env = dict(
+        os.environ,
+        API_KEY_MASTR="bench", API_URL_MASTR=f"{upstream}/mastr",
+        API_KEY_ENTSOE="bench", API_URL_ENTSOE=f"{upstream}/entsoe/api",
+        # No disk state and no rate limiting, so runs are comparable
+        ENTSOE_STORE_PATH="", MASTR_MIRROR_PATH="",
+        MASTR_RATE_LIMIT="1000000", MASTR_RATE_BURST="1000000",
+        ENTSOE_RATE_LIMIT="1000000", ENTSOE_RATE_BURST="1000000",
+    )
+    if args.no_cache:
+        env.update(EINHEIT_CACHE_TTL_WIND="0", EINHEIT_CACHE_TTL_SOLAR="0",
+                   EINHEIT_CACHE_TTL_BIOMASSE="0", EINHEIT_CACHE_TTL_STROM_SPEICHER="0")
+    processes = [fake]
+    if args.cache_backend == "fake-redis":
+        processes.append(subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.fake_redis", "--port", str(args.redis_port)], cwd=REPO_ROOT))
+        env["CACHE_BACKEND"] = f"redis://127.0.0.1:{args.redis_port}/0"
+    elif args.cache_backend:
+        env["CACHE_BACKEND"] = args.cache_backend
+    processes.append(subprocess.Popen(
+        [sys.executable, "serve.py", "--port", str(args.proxy_port), "--workers", str(args.workers), "--log-level", "warning"],
+        cwd=REPO_ROOT, env=env,
+    ))
+    return processes
+
+
+async def upstream_request_count(args) -> int:
+    async with httpx.AsyncClient() as client:
+        return (await client.get(f"http://127.0.0.1:{args.upstream_port}/stats")).json()["requests"]
+
+
+async def main(args) -> None:
+    processes: List[subprocess.Popen] = []
+    proxy_url: Optional[str] = args.proxy_url
+    try:
+        if proxy_url is None:
+            processes = start_processes(args)
+            proxy_url = f"http://127.0.0.1:{args.proxy_port}"
+            await wait_until_ready(f"http://127.0.0.1:{args.upstream_port}/stats")
+        await wait_until_ready(f"{proxy_url}/")
+        upstream_requests = await upstream_request_count(args) if args.proxy_url is None else None
+
+        scenarios = make_scenarios(args)
+        concurrency_levels = [int(level) for level in args.concurrency.split(",")]
+        limits = httpx.Limits(max_connections=max(concurrency_levels), max_keepalive_connections=max(concurrency_levels))
+        print(f"{'scenario':<14}{'conc':>6}{'requests':>10}{'errors':>8}{'rps':>10}"
+              f"{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+        async with httpx.AsyncClient(base_url=proxy_url, limits=limits, timeout=60.0) as client:
+            for name in args.scenario or list(scenarios):
+                # Warm-up: connections, caches and lazy imports are not part of the measurement
+                await run_scenario(client, scenarios[name], max(concurrency_levels), args.warmup)
+                for concurrency in concurrency_levels:
+                    result = await run_scenario(client, scenarios[name], concurrency, args.duration)
+                    print(f"{name:<14}{concurrency:>6}{result['requests']:>10}{result['errors']:>8}{result['rps']:>10.1f}"
+                          f"{result['p50']:>10.2f}{result['p90']:>10.2f}{result['p99']:>10.2f}{result['max']:>10.2f}")
+        if upstream_requests is not None:
+            print(f"upstream requests: {await upstream_request_count(args) - upstream_requests}")
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", action="append", choices=["root", "einheit", "batch", "netzanschluss", "entsoe"],
+                        help="Scenario to run (repeatable, default: all)")
+    parser.add_argument("--concurrency", default="1,16,64", help="Comma separated concurrency levels")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per scenario and concurrency level")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Warm-up seconds per scenario")
+    parser.add_argument("--proxy-url", help="Benchmark an already running proxy instead of starting one")
+    parser.add_argument("--proxy-port", type=int, default=8900)
+    parser.add_argument("--upstream-port", type=int, default=9100)
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Simulated upstream latency")
+    parser.add_argument("--entsoe-resolution", default="PT15M", choices=["PT15M", "PT30M", "PT60M"])
+    parser.add_argument("--entsoe-days", type=int, default=7)
+    parser.add_argument("--units", type=int, default=1000, help="Distinct Einheiten requested")
+    parser.add_argument("--batch-size", type=int, default=20)
+    parser.add_argument("--no-cache", action="store_true", help="Disable the GetEinheit* cache in the proxy")
+    parser.add_argument("--workers", type=int, default=1, help="Proxy worker processes (started through serve.py)")
+    parser.add_argument("--cache-backend", help="CACHE_BACKEND of the proxy, or fake-redis to start benchmarks.fake_redis")
+    parser.add_argument("--redis-port", type=int, default=6399)
+    asyncio.run(main(parser.parse_args()))
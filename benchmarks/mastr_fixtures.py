@@ -0,0 +1,62 @@
+"""Synthetic MaStR payloads for benchmarks and local upstream stand-ins."""
+import random
+import typing
+from typing import Any, Dict
+
+from pydantic import BaseModel
+
+
+def _sample_value(annotation: Any, name: str, rng: random.Random) -> Any:
+    # Optional[X] -> X
+    args = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+    if typing.get_origin(annotation) is typing.Union and len(args) == 1:
+        annotation = args[0]
+    if annotation is bool:
+        return rng.random() < 0.5
+    if annotation is int:
+        return rng.randint(1, 1000)
+    if annotation is float:
+        return round(rng.uniform(1, 5000), 3)
+    if typing.get_origin(annotation) is list:
+        return [f"SNB{rng.randint(100000, 999999)}"]
+    if "datum" in name.lower():
+        return f"20{rng.randint(10, 23)}-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}"
+    return f"{name}-{rng.randint(0, 99999)}"
+
+
+def make_einheit(response_model: type, einheit_mastr_nummer: str, seed: int = 0) -> Dict[str, Any]:
+    """
+    Builds a GetEinheit* payload with every field of `response_model` filled (PascalCase keys, as MaStR sends them),
+    located somewhere in Germany.
+    """
+    assert issubclass(response_model, BaseModel)
+    rng = random.Random(seed)
+    payload = {
+        field.alias or name: _sample_value(field.annotation, field.alias or name, rng)
+        for name, field in response_model.model_fields.items()
+    }
+    payload.update(
+        Ergebniscode="OK",
+        AufrufVeraltet=False,
+        EinheitMastrNummer=einheit_mastr_nummer,
+        Land="Deutschland",
+        Laengengrad=round(rng.uniform(6.0, 15.0), 6),
+        Breitengrad=round(rng.uniform(47.3, 55.0), 6),
+    )
+    return payload
+
+
+
+def make_netzanschlusspunkt(index: int) -> Dict[str, Any]:
+    """One row of the GetListeAlleNetzanschlusspunkte list."""
+    return {
+        "NetzanschlusspunktMastrNummer": f"SAN{index:012d}",
+        "EinheitMastrNummer": f"SEE{index:012d}",
+        "LokationMastrNummer": f"SEL{index:012d}",
+        "Regelzone": ("50Hertz", "Amprion", "TenneT", "TransnetBW")[index % 4],
+        "Spannungsebene": ("Niederspannung", "Mittelspannung", "Hochspannung")[index % 3],
+        "EinheitPostleitzahl": f"{10000 + index % 89999:05d}",
+        "NetzbetreiberMastrNummer": f"SNB{index % 900:012d}",
+        "Nettoengpassleistung": round(1 + index % 5000 / 10, 1),
+        "DatumLetzteAktualisierung": "2024-01-01T00:00:00",
+    }
@@ -1,11 +1,62 @@
 import os
-import requests
+import io
+import re
+import math
+import random
+import csv
+import json
+import time
+import zlib
+import hashlib
+import asyncio
+import logging
+import sqlite3
+import threading
+from contextvars import ContextVar
+from urllib.parse import urlsplit
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone, time as dt_time
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from contextlib import asynccontextmanager, closing, contextmanager
+import httpx
+import numpy as np
 import xmltodict
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field, ConfigDict, field_validator
-from typing import Optional, List, Dict, Any
+from prometheus_client import CollectorRegistry, Counter, Histogram, generate_latest, multiprocess, CONTENT_TYPE_LATEST
+from pydantic import BaseModel, Field, ConfigDict, field_validator, ValidationError
+from typing import Optional, List, Dict, Any, Hashable, Tuple, Set, Callable, Awaitable, AsyncIterator, Iterator, Literal
+
+try:
+    # Optional: only needed for the Arrow IPC / Parquet output formats
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+try:
+    # Optional: faster JSON serialization of responses, falls back to the json module
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    # Optional: brotli response compression
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    # Optional: zstd response compression
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
 
 # --- Environment and App Setup ---
 load_dotenv()
@@ -20,9 +71,172 @@ if not API_KEY_MASTR or not API_URL_MASTR:
 if not API_KEY_ENTSOE or not API_URL_ENTSOE:
     raise RuntimeError("API_KEY_ENTSOE and API_URL_ENTSOE must be set in .env file")
 
+# --- Upstream connection pool settings ---
+# Each provider gets its own pooled client, so the connection limits below are per upstream host.
+UPSTREAM_TIMEOUT = float(os.getenv("UPSTREAM_TIMEOUT", "15"))
+UPSTREAM_CONNECT_TIMEOUT = float(os.getenv("UPSTREAM_CONNECT_TIMEOUT", "5"))
+UPSTREAM_KEEPALIVE_EXPIRY = float(os.getenv("UPSTREAM_KEEPALIVE_EXPIRY", "30"))
+MASTR_MAX_CONNECTIONS = int(os.getenv("MASTR_MAX_CONNECTIONS", "20"))
+ENTSOE_MAX_CONNECTIONS = int(os.getenv("ENTSOE_MAX_CONNECTIONS", "10"))
+
+# --- Upstream rate limits (token bucket: requests per second and burst size) ---
+MASTR_RATE_LIMIT = float(os.getenv("MASTR_RATE_LIMIT", "10"))
+MASTR_RATE_BURST = int(os.getenv("MASTR_RATE_BURST", "20"))
+# ENTSOE allows 400 requests per minute and security token
+ENTSOE_RATE_LIMIT = float(os.getenv("ENTSOE_RATE_LIMIT", "6"))
+ENTSOE_RATE_BURST = int(os.getenv("ENTSOE_RATE_BURST", "10"))
+
+# --- Retries (idempotent calls only) with jittered exponential backoff, and circuit breaker ---
+UPSTREAM_MAX_RETRIES = int(os.getenv("UPSTREAM_MAX_RETRIES", "3"))
+UPSTREAM_RETRY_BASE_DELAY = float(os.getenv("UPSTREAM_RETRY_BASE_DELAY", "0.5"))
+UPSTREAM_RETRY_MAX_DELAY = float(os.getenv("UPSTREAM_RETRY_MAX_DELAY", "10"))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET_TIMEOUT = float(os.getenv("BREAKER_RESET_TIMEOUT", "30"))
+
+# --- Global budget of concurrent upstream requests (all providers, including background jobs) ---
+UPSTREAM_CONCURRENCY = int(os.getenv("UPSTREAM_CONCURRENCY", "32"))
+
+# --- Metrics: add a Server-Timing header with the per-stage timings to every response ---
+SERVER_TIMING = os.getenv("SERVER_TIMING", "0") == "1"
+
+# --- Response compression: minimum body size in bytes and the encodings in order of preference
+# (br and zstd are only offered if the brotli / zstandard packages are installed) ---
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_ENCODINGS = [e.strip() for e in os.getenv("COMPRESSION_ENCODINGS", "zstd,br,gzip").split(",") if e.strip()]
+
+# --- Response validation against the response models, per endpoint: "strict" (validate once, before caching)
+# or "passthrough" (forward the upstream payload unchanged). Overrides: "GetEinheitWind=passthrough,..." ---
+RESPONSE_VALIDATION = os.getenv("RESPONSE_VALIDATION", "strict")
+RESPONSE_VALIDATION_OVERRIDES = dict(
+    entry.strip().split("=", 1) for entry in os.getenv("RESPONSE_VALIDATION_OVERRIDES", "").split(",") if "=" in entry
+)
+for _mode in (RESPONSE_VALIDATION, *RESPONSE_VALIDATION_OVERRIDES.values()):
+    if _mode not in ("strict", "passthrough"):
+        raise RuntimeError(f"Unknown response validation mode: {_mode} (expected strict or passthrough)")
+
+# --- Response cache settings for the GetEinheit* lookups (seconds, 0 disables caching) ---
+EINHEIT_CACHE_MAXSIZE = int(os.getenv("EINHEIT_CACHE_MAXSIZE", "10000"))
+EINHEIT_CACHE_STALE_TTL = float(os.getenv("EINHEIT_CACHE_STALE_TTL", "86400"))
+EINHEIT_CACHE_TTL = {
+    "GetEinheitWind": float(os.getenv("EINHEIT_CACHE_TTL_WIND", "3600")),
+    "GetEinheitSolar": float(os.getenv("EINHEIT_CACHE_TTL_SOLAR", "3600")),
+    "GetEinheitBiomasse": float(os.getenv("EINHEIT_CACHE_TTL_BIOMASSE", "3600")),
+    "GetEinheitStromSpeicher": float(os.getenv("EINHEIT_CACHE_TTL_STROM_SPEICHER", "3600")),
+}
+
+# --- Spatial index over fetched units: grid cell size in degrees ---
+SPATIAL_CELL_DEGREES = float(os.getenv("SPATIAL_CELL_DEGREES", "0.1"))
+
+# --- Batch endpoint settings ---
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "5000"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "16"))
+
+# --- Netzanschlusspunkte export settings ---
+NETZANSCHLUSSPUNKTE_PAGE_SIZE = int(os.getenv("NETZANSCHLUSSPUNKTE_PAGE_SIZE", "2000"))
+
+# --- ENTSOE period chunking: long ranges are split into windows fetched in parallel, at most
+# ENTSOE_CHUNK_CONCURRENCY upstream calls per request across all its windows and store gaps ---
+ENTSOE_CHUNK_DAYS = int(os.getenv("ENTSOE_CHUNK_DAYS", "31"))
+ENTSOE_CHUNK_CONCURRENCY = int(os.getenv("ENTSOE_CHUNK_CONCURRENCY", "4"))
+
+# --- Multi-zone ENTSOE requests: upstream calls in parallel across the zones (default and upper bound per request) ---
+ZONE_FANOUT_CONCURRENCY = int(os.getenv("ZONE_FANOUT_CONCURRENCY", "4"))
+ZONE_FANOUT_MAX_CONCURRENCY = int(os.getenv("ZONE_FANOUT_MAX_CONCURRENCY", "16"))
+ZONE_FANOUT_MAX_ZONES = int(os.getenv("ZONE_FANOUT_MAX_ZONES", "60"))
+
+# --- In-process cache for days from today (UTC) on, which are not stored yet (seconds, 0 disables caching) ---
+ENTSOE_LIVE_CACHE_TTL = float(os.getenv("ENTSOE_LIVE_CACHE_TTL", "900"))
+ENTSOE_LIVE_CACHE_MAXSIZE = int(os.getenv("ENTSOE_LIVE_CACHE_MAXSIZE", "5000"))
+
+# --- Background ENTSOE prefetch after the daily publication. Jobs are separated by ';', each one is
+# "<documentType>:<processType>:<EIC or group>[+<EIC or group>...]@HH:MM[,HH:MM...]" (times in ENTSOE_PREFETCH_TZ),
+# e.g. "A65:A01:CWE+10YCZ-CEPS-----N@10:15,12:15". Each run refreshes ENTSOE_PREFETCH_DAYS UTC days from today on ---
+ENTSOE_PREFETCH_JOBS = os.getenv("ENTSOE_PREFETCH_JOBS", "")
+ENTSOE_PREFETCH_TZ = os.getenv("ENTSOE_PREFETCH_TZ", "Europe/Brussels")
+ENTSOE_PREFETCH_DAYS = int(os.getenv("ENTSOE_PREFETCH_DAYS", "2"))
+ENTSOE_PREFETCH_CONCURRENCY = int(os.getenv("ENTSOE_PREFETCH_CONCURRENCY", "2"))
+
+# --- Persistent ENTSOE store for published (past) days, empty path disables it ---
+ENTSOE_STORE_PATH = os.getenv("ENTSOE_STORE_PATH", "entsoe_store.sqlite3")
+
+# --- Local MaStR mirror for GetListeAlleNetzanschlusspunkte, empty path disables it ---
+MASTR_MIRROR_PATH = os.getenv("MASTR_MIRROR_PATH", "mastr_mirror.sqlite3")
+# Marktakteure whose Netzanschlusspunkte are mirrored and synced in the background
+MASTR_MIRROR_MARKTAKTEURE = [m.strip() for m in os.getenv("MASTR_MIRROR_MARKTAKTEURE", "").split(",") if m.strip()]
+MASTR_MIRROR_SYNC_INTERVAL = float(os.getenv("MASTR_MIRROR_SYNC_INTERVAL", "3600"))
+# Queries are only answered from the mirror if its last sync is at most this old (seconds)
+MASTR_MIRROR_MAX_AGE = float(os.getenv("MASTR_MIRROR_MAX_AGE", "86400"))
+
+# --- Parse ENTSOE responses incrementally while they download (0 = legacy xmltodict + Pydantic path) ---
+ENTSOE_STREAMING_PARSER = os.getenv("ENTSOE_STREAMING_PARSER", "1") == "1"
+# Documents from this many bytes on are parsed in a worker thread, in batches of this size, so parsing does not
+# block the event loop; smaller ones are parsed on the loop (0 = always in a thread)
+ENTSOE_PARSE_THREAD_BYTES = int(os.getenv("ENTSOE_PARSE_THREAD_BYTES", "65536"))
+ENTSOE_PARSE_SLICE_BYTES = 4096
+
+# --- Backend of the response caches and single-flight locks: "memory" (per process), "sqlite:<path>" (shared by
+# the workers of one host) or "redis://[:password@]host:port/db" (shared by all hosts, any Redis protocol server) ---
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+CACHE_KEY_PREFIX = os.getenv("CACHE_KEY_PREFIX", "msdaten")
+# Shared backends keep entries this long after their TTL, for stale-while-revalidate and stale-if-error (seconds)
+SHARED_CACHE_RETENTION = float(os.getenv("SHARED_CACHE_RETENTION", "604800"))
+REDIS_POOL_SIZE = int(os.getenv("REDIS_POOL_SIZE", "16"))
+# Limit for connecting to Redis and for each command; on timeout the connection is dropped and the call degrades
+# like any backend error (seconds)
+REDIS_TIMEOUT = float(os.getenv("REDIS_TIMEOUT", "1"))
+# Cross-worker single-flight: lock lifetime, how long other workers wait for the lock holder, how often they poll,
+# and how long the holder's result stays readable for them (seconds)
+SHARED_FLIGHT_LOCK_TTL = float(os.getenv("SHARED_FLIGHT_LOCK_TTL", "120"))
+SHARED_FLIGHT_WAIT = float(os.getenv("SHARED_FLIGHT_WAIT", "60"))
+SHARED_FLIGHT_POLL_INTERVAL = float(os.getenv("SHARED_FLIGHT_POLL_INTERVAL", "0.05"))
+SHARED_FLIGHT_RESULT_TTL = float(os.getenv("SHARED_FLIGHT_RESULT_TTL", "5"))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Opens the shared upstream clients and starts the background jobs on startup, stops them on shutdown."""
+    open_http_clients()
+    tasks = [asyncio.create_task(_prefetch_loop(job)) for job in prefetch_jobs]
+    if mastr_mirror is not None and MASTR_MIRROR_MARKTAKTEURE:
+        tasks.append(asyncio.create_task(_mirror_sync_loop()))
+    try:
+        yield
+    finally:
+        for task in tasks:
+            task.cancel()
+        await close_http_clients()
+        await cache_backend.close()
+
+
+def load_json(data: bytes) -> Any:
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def dump_json(content: Any) -> bytes:
+    """Serializes to compact UTF-8 JSON, with orjson if installed."""
+    if orjson is not None:
+        return orjson.dumps(content, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse serialized with dump_json that records its serialization time. Endpoints that return
+    it directly skip FastAPI's response_model validation and jsonable_encoder pass.
+    """
+
+    def render(self, content: Any) -> bytes:
+        started = time.perf_counter()
+        body = dump_json(content)
+        observe_serialize(time.perf_counter() - started)
+        return body
+
+
 app = FastAPI(
     title="MaStR & ENTSOE Proxy API",
-    description="A robust proxy for the Marktstammdatenregister API and ENTSOE Transparency Platform API with detailed documentation."
+    description="A robust proxy for the Marktstammdatenregister API and ENTSOE Transparency Platform API with detailed documentation.",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
 )
 
 app.add_middleware(
@@ -58,6 +272,178 @@ def ensure_list(value: Any) -> List[Any]:
     return [value]
 
 
+# ============================
+#  Streaming ENTSOE XML parser
+# ============================
+
+def _check_required(mapping: Any, fields: Tuple[str, ...], where: str) -> None:
+    if not isinstance(mapping, dict):
+        raise ValueError(f"{where}: expected an element with children")
+    missing = [field for field in fields if mapping.get(field) is None]
+    if missing:
+        raise ValueError(f"{where}: missing {', '.join(missing)}")
+
+
+class EntsoeDocumentParser:
+    """
+    Incremental parser for the ENTSOE GL_MarketDocument, fed with raw bytes while they arrive.
+
+    Produces the same dict shape as xmltodict + DayAheadTotalLoadForecastResponse.model_dump(),
+    without building the intermediate trees: every element is dropped as soon as it has been
+    converted, and plain Points are collected as (position, quantity) text pairs per Period.
+    """
+
+    def __init__(self):
+        self._parser = ET.XMLPullParser(events=("start-ns", "start", "end"))
+        self._namespaces: Dict[str, str] = {}
+        self._pending_xmlns: List[Tuple[str, str]] = []
+        # One frame per open element: [element, name, children dict, Period points or None]
+        self._stack: List[List[Any]] = []
+        # Nesting depth inside the current Point (Points are converted as a whole when they end)
+        self._point_depth = 0
+        self._root: Optional[Tuple[str, Any]] = None
+
+    def _name(self, tag: str) -> str:
+        if tag.startswith("{"):
+            uri, local = tag[1:].split("}", 1)
+            prefix = self._namespaces.get(uri, "")
+            return f"{prefix}:{local}" if prefix else local
+        return tag
+
+    def feed(self, data: bytes) -> None:
+        self._parser.feed(data)
+        for event, payload in self._parser.read_events():
+            if event == "end":
+                self._end(payload)
+            elif event == "start":
+                self._start(payload)
+            else:
+                prefix, uri = payload
+                self._namespaces[uri] = prefix
+                self._pending_xmlns.append((prefix, uri))
+
+    def _start(self, element: ET.Element) -> None:
+        if self._point_depth:
+            self._point_depth += 1
+            return
+        name = self._name(element.tag)
+        if name == "Point" and self._stack and self._stack[-1][3] is not None:
+            self._point_depth = 1
+            return
+
+        children: Dict[str, Any] = {}
+        for prefix, uri in self._pending_xmlns:
+            children[f"@xmlns:{prefix}" if prefix else "@xmlns"] = uri
+        self._pending_xmlns.clear()
+        for attribute, value in element.attrib.items():
+            children[f"@{self._name(attribute)}"] = value
+        period: Optional[List[Any]] = [] if name == "Period" else None
+        self._stack.append([element, name, children, period])
+
+    def _end(self, element: ET.Element) -> None:
+        if self._point_depth:
+            self._point_depth -= 1
+            if self._point_depth:
+                return
+            self._end_point(element)
+            return
+
+        _, name, children, period = self._stack.pop()
+        if self._stack:
+            # Drop the converted element so the tree never grows beyond the open path
+            self._stack[-1][0].remove(element)
+
+        if period is not None:
+            # Point dicts are only materialized once, in document order and with the upstream text
+            children["Point"] = [
+                {"position": point[0], "quantity": point[1]} if isinstance(point, tuple) else point
+                for point in period
+            ]
+
+        text = (element.text or "").strip() or None
+        if children:
+            if text is not None:
+                children["#text"] = text
+            self._add(name, children)
+        else:
+            self._add(name, text)
+
+    def _end_point(self, element: ET.Element) -> None:
+        period_frame = self._stack[-1]
+        period_frame[0].remove(element)
+        if len(element) == 2 and not element.attrib:
+            first, second = element
+            position, quantity = (first.text or "").strip(), (second.text or "").strip()
+            if (self._name(first.tag) == "position" and self._name(second.tag) == "quantity"
+                    and position and quantity and not (len(first) or len(second) or first.attrib or second.attrib)):
+                period_frame[3].append((position, quantity))
+                return
+        # Points with additional content keep the generic xmltodict shape
+        period_frame[3].append(self._convert(element))
+
+    def _convert(self, element: ET.Element) -> Any:
+        """Converts a finished subtree with the xmltodict conventions (@attributes, #text, repeated tags as lists)."""
+        children: Dict[str, Any] = {f"@{self._name(k)}": v for k, v in element.attrib.items()}
+        for child in element:
+            name, value = self._name(child.tag), self._convert(child)
+            if name in children:
+                existing = children[name]
+                children[name] = existing + [value] if isinstance(existing, list) else [existing, value]
+            else:
+                children[name] = value
+        text = (element.text or "").strip() or None
+        if not children:
+            return text
+        if text is not None:
+            children["#text"] = text
+        return children
+
+    def _add(self, name: str, value: Any) -> None:
+        if not self._stack:
+            self._root = (name, value)
+            return
+        siblings = self._stack[-1][2]
+        if name in siblings:
+            existing = siblings[name]
+            if isinstance(existing, list):
+                existing.append(value)
+            else:
+                siblings[name] = [existing, value]
+        else:
+            siblings[name] = value
+
+    def close(self) -> Dict[str, Any]:
+        """Finishes parsing and returns {'GL_MarketDocument': {...}} with TimeSeries and Point as lists."""
+        self._parser.close()
+        if self._root is None:
+            raise ValueError("Empty ENTSOE response")
+        name, document = self._root
+        if name != "GL_MarketDocument":
+            reason = extract_text((document.get("Reason") or {}).get("text")) if isinstance(document, dict) else None
+            raise ValueError(f"Unexpected {name} document" + (f": {reason}" if reason else ""))
+
+        _check_required(document, ("mRID", "revisionNumber", "type", "createdDateTime", "TimeSeries"), "GL_MarketDocument")
+        document["TimeSeries"] = ensure_list(document["TimeSeries"])
+        for series in document["TimeSeries"]:
+            _check_required(series, ("mRID", "businessType", "objectAggregation", "curveType", "Period"), "TimeSeries")
+            period = series["Period"]
+            if isinstance(period, list):
+                raise ValueError("TimeSeries: expected exactly one Period")
+            _check_required(period, ("timeInterval", "resolution"), "Period")
+            _check_required(period["timeInterval"], ("start", "end"), "Period.timeInterval")
+            period["Point"] = ensure_list(period.get("Point"))
+        return {"GL_MarketDocument": document}
+
+
+def parse_entsoe_document(chunks: Any) -> Dict[str, Any]:
+    """Parses an ENTSOE document from an iterable of byte chunks with the streaming parser."""
+    parser = EntsoeDocumentParser()
+    for chunk in chunks:
+        parser.feed(chunk)
+    return parser.close()
+
+
+
 # ==========================================
 #              REQUEST MODELS
 # ==========================================
@@ -68,6 +454,22 @@ class EinheitRequest(BaseModel):
     model_config = ConfigDict(populate_by_name=True)
 
 
+EinheitTyp = Literal["wind", "solar", "biomasse", "strom_speicher"]
+
+
+class EinheitBatchItem(BaseModel):
+    einheit_mastr_nummer: str = Field(..., alias="einheitMastrNummer")
+    einheit_typ: EinheitTyp = Field(..., alias="type")
+    model_config = ConfigDict(populate_by_name=True)
+
+
+class EinheitBatchRequest(BaseModel):
+    marktakteur_mastr_nummer: str = Field(..., alias="marktakteurMastrNummer")
+    einheiten: List[EinheitBatchItem] = Field(..., min_length=1, max_length=BATCH_MAX_ITEMS)
+    concurrency: Optional[int] = Field(None, ge=1, description=f"Parallel upstream calls, capped at {BATCH_CONCURRENCY}")
+    model_config = ConfigDict(populate_by_name=True)
+
+
 class GetListeAlleNetzanschlusspunkteRequest(BaseModel):
     marktakteur_mastr_nummer: str = Field(..., alias="marktakteurMastrNummer")
     start_ab: Optional[int] = Field(None, alias="startAb")
@@ -383,136 +785,3008 @@ class DayAheadTotalLoadForecastResponse(BaseModel):
 
 
 # ==========================================
-#              API LOGIC & ENDPOINTS
+#              METRICS
 # ==========================================
 
-def call_external_api_mastr(endpoint: str, request_data: BaseModel) -> Dict[str, Any]:
-    """Calls the MaStR external API and returns the raw JSON."""
-    url = f"{API_URL_MASTR}/{endpoint}"
-    headers = {"Content-Type": "application/json"}
-    
-    # Convert request model to PascalCase JSON
-    payload = request_data.model_dump(by_alias=True, exclude_none=True)
-    payload['apiKey'] = API_KEY_MASTR
+REQUEST_LATENCY = Histogram(
+    "proxy_request_duration_seconds", "End-to-end request latency per route",
+    ["method", "route", "status"],
+)
+UPSTREAM_STAGE_LATENCY = Histogram(
+    "proxy_upstream_stage_duration_seconds",
+    "Upstream call latency per stage (connect, ttfb, download, parse, validate)",
+    ["upstream", "stage"],
+)
+SERIALIZE_LATENCY = Histogram(
+    "proxy_serialize_duration_seconds", "Response serialization time per route", ["route"],
+)
+UPSTREAM_RESPONSE_BYTES = Histogram(
+    "proxy_upstream_response_bytes", "Upstream response payload size",
+    ["upstream"], buckets=[2 ** exponent for exponent in range(10, 31, 2)],
+)
+RESPONSE_BYTES = Histogram(
+    "proxy_response_bytes", "Response payload size per route (non-streaming responses)",
+    ["route"], buckets=[2 ** exponent for exponent in range(8, 31, 2)],
+)
+UPSTREAM_ERRORS = Counter("proxy_upstream_errors_total", "Failed upstream calls", ["upstream", "status"])
+CACHE_EVENTS = Counter("proxy_cache_events_total", "Cache lookups by result", ["cache", "result"])
 
-    # Handle '[]' suffix for specific list keys in the request
-    for key in ["einheitMastrNummer", "NetzanschlusspunktMastrNummer", "LokationMastrNummer"]:
-        if key in payload and isinstance(payload[key], list):
-            payload[f"{key}[]"] = payload.pop(key)
+# Stage timings (ms) of the current request, used for the Server-Timing header
+_request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_timings", default=None)
 
-    try:
-        response = requests.post(url, json=payload, headers=headers, timeout=15)
-        response.raise_for_status()
-        return response.json()
-    except requests.HTTPError as e:
-        safe_payload = {k: v for k, v in payload.items() if k != 'apiKey'}
-        error_detail = f"External API Error ({response.status_code}): {response.text} | Sent Payload: {safe_payload}"
-        raise HTTPException(status_code=response.status_code, detail=error_detail)
-    except requests.exceptions.RequestException as e:
-        raise HTTPException(status_code=503, detail=f"Could not connect to external API: {e}")
 
+def _add_request_timing(name: str, seconds: float) -> None:
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds * 1000
 
-def call_external_api_entsoe(document_type: str, process_type: str, out_bidding_zone_domain: str, 
-                             period_start: str, period_end: str) -> Dict[str, Any]:
+
+def observe_stage(upstream: str, stage: str, seconds: float) -> None:
+    UPSTREAM_STAGE_LATENCY.labels(upstream=upstream, stage=stage).observe(seconds)
+    _add_request_timing(stage, seconds)
+
+
+def observe_serialize(seconds: float) -> None:
+    # Reported per route by the middleware, the route is only known after routing
+    _add_request_timing("serialize", seconds)
+
+
+def record_cache_event(cache: str, result: str) -> None:
+    CACHE_EVENTS.labels(cache=cache, result=result.lower()).inc()
+
+
+class UpstreamTimer:
     """
-    Calls the ENTSOE Transparency Platform API, parses XML -> dict, normalizes and validates
-    via Pydantic models, then returns a clean JSON-serializable dict.
+    Collects the stage timings of one upstream call. Connect and TTFB come from the httpx trace
+    extension (pass timer.trace as extensions={"trace": ...}), the other stages are measured around the code.
     """
-    params = {
-        "documentType": document_type,
-        "processType": process_type,
-        "out_Domain": out_bidding_zone_domain,   # note: keep param name matching ENTSOE if needed
-        "periodStart": period_start,
-        "periodEnd": period_end,
-        "securityToken": API_KEY_ENTSOE
-    }
 
-    try:
-        response = requests.get(API_URL_ENTSOE, params=params, timeout=15)
-        response.raise_for_status()
-        
-        # Parse XML to a python dict
-        xml_content = response.text
-        parsed = xmltodict.parse(xml_content)
+    def __init__(self, upstream: str):
+        self.upstream = upstream
+        self._marks: Dict[str, float] = {"created": time.perf_counter()}
 
-        # Normalization step: many XML fields come with attribute dicts or single-items.
-        # We'll perform lightweight normalization:
-        # - Convert any {'@...':..., '#text': 'value'} -> 'value'
-        # - Ensure lists (TimeSeries, Point) are lists (handled in validators)
-        # Note: deeper custom normalization could be added if needed.
+    async def trace(self, event_name: str, info: Dict[str, Any]) -> None:
+        self._marks[event_name] = time.perf_counter()
 
-        # Validate/normalize via Pydantic (this will run our validators to ensure lists, allow extra fields)
-        validated = DayAheadTotalLoadForecastResponse.model_validate(parsed)
+    def _span(self, start_event: str, end_event: str) -> Optional[float]:
+        if start_event in self._marks and end_event in self._marks:
+            return self._marks[end_event] - self._marks[start_event]
+        return None
 
-        # Return normalized dict (Pydantic will have coerced lists etc.)
-        return validated.model_dump()
-    except requests.HTTPError as e:
-        error_detail = f"ENTSOE API Error ({response.status_code}): {response.text}"
-        raise HTTPException(status_code=response.status_code, detail=error_detail)
-    except requests.exceptions.RequestException as e:
-        raise HTTPException(status_code=503, detail=f"Could not connect to ENTSOE API: {e}")
-    except Exception as e:
-        # If xmltodict.parse or model validation fails, include the error for debugging
-        raise HTTPException(status_code=500, detail=f"Error parsing/validating ENTSOE response: {e}")
+    def headers_received(self) -> None:
+        """Records connect and TTFB once the response headers are in."""
+        connect = self._span("connection.connect_tcp.started", "connection.start_tls.complete") \
+            or self._span("connection.connect_tcp.started", "connection.connect_tcp.complete")
+        if connect is not None:
+            observe_stage(self.upstream, "connect", connect)
+        for protocol in ("http11", "http2"):
+            ttfb = self._span(f"{protocol}.send_request_headers.started", f"{protocol}.receive_response_headers.complete")
+            if ttfb is not None:
+                self._marks["headers"] = self._marks[f"{protocol}.receive_response_headers.complete"]
+                break
+        else:
+            # Transports without trace events: measure from the start of the call
+            self._marks["headers"] = time.perf_counter()
+            ttfb = self._marks["headers"] - self._marks["created"]
+        observe_stage(self.upstream, "ttfb", ttfb)
 
+    def body_received(self, size: int, exclude: float = 0.0) -> None:
+        """Records the download time (minus time spent in `exclude`, e.g. incremental parsing) and payload size."""
+        observe_stage(self.upstream, "download", max(time.perf_counter() - self._marks["headers"] - exclude, 0.0))
+        UPSTREAM_RESPONSE_BYTES.labels(upstream=self.upstream).observe(size)
 
-# Use response_model and response_model_by_alias=True to ensure 
-# the output is validated and documented with PascalCase keys.
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            observe_stage(self.upstream, name, time.perf_counter() - started)
 
-@app.post("/get_einheit_biomasse", summary="Get Einheit Biomasse", response_model=GetEinheitBiomasseResponse, response_model_by_alias=True)
-def get_einheit_biomasse_proxy(request: EinheitRequest):
-    return call_external_api_mastr("GetEinheitBiomasse", request)
+    def error(self, status: Any) -> None:
+        UPSTREAM_ERRORS.labels(upstream=self.upstream, status=str(status)).inc()
 
-@app.post("/get_einheit_solar", summary="Get Einheit Solar", response_model=GetEinheitSolarResponse, response_model_by_alias=True)
-def get_einheit_solar_proxy(request: EinheitRequest):
-    return call_external_api_mastr("GetEinheitSolar", request)
 
-@app.post("/get_einheit_wind", summary="Get Einheit Wind", response_model=GetEinheitWindResponse, response_model_by_alias=True)
-def get_einheit_wind_proxy(request: EinheitRequest):
-    return call_external_api_mastr("GetEinheitWind", request)
+@app.middleware("http")
+async def metrics_middleware(request: Request, call_next):
+    timings: Dict[str, float] = {}
+    _request_timings.set(timings)
+    started = time.perf_counter()
+    response = await call_next(request)
+    elapsed = time.perf_counter() - started
 
-@app.post("/get_einheit_strom_speicher", summary="Get Einheit Strom Speicher", response_model=GetEinheitStromSpeicherResponse, response_model_by_alias=True)
-def get_einheit_strom_speicher_proxy(request: EinheitRequest):
-    return call_external_api_mastr("GetEinheitStromSpeicher", request)
+    route = request.scope.get("route")
+    route_path = getattr(route, "path", "unmatched")
+    REQUEST_LATENCY.labels(method=request.method, route=route_path, status=str(response.status_code)).observe(elapsed)
+    if "serialize" in timings:
+        SERIALIZE_LATENCY.labels(route=route_path).observe(timings["serialize"] / 1000)
+    content_length = response.headers.get("content-length")
+    if content_length is not None:
+        RESPONSE_BYTES.labels(route=route_path).observe(int(content_length))
+    if SERVER_TIMING:
+        entries = [f"{name};dur={duration:.2f}" for name, duration in timings.items()]
+        entries.append(f"total;dur={elapsed * 1000:.2f}")
+        response.headers["Server-Timing"] = ", ".join(entries)
+    return response
 
-@app.post("/get_liste_alle_netzanschlusspunkte", summary="Get Liste Alle Netzanschlusspunkte", response_model=GetListeAlleNetzanschlusspunkteResponse, response_model_by_alias=True)
-def get_liste_alle_netzanschlusspunkte_proxy(request: GetListeAlleNetzanschlusspunkteRequest):
-    return call_external_api_mastr("GetListeAlleNetzanschlusspunkte", request)
 
-@app.get("/day_ahead_total_load_forecast", 
-         summary="Get Day-Ahead Total Load Forecast from ENTSOE",
-         response_model=DayAheadTotalLoadForecastResponse,
-         description="""
-         Retrieves day-ahead total load forecast data from the ENTSOE Transparency Platform.
-         
-         The API returns data in JSON format (converted from XML) following the IEC 62325-451-6 standard.
-         
-         **Parameters:**
-         - document_type: Document type code (use 'A65' for day-ahead total load forecast)
-         - process_type: Process type code (use 'A01' for day ahead)
-         - out_bidding_zone_domain: EIC code for the bidding zone (e.g., '10YCZ-CEPS-----N' for Czech Republic)
-         - period_start: Start date and time in format YYYYMMDDHHmm (e.g., '202308140000')
-         - period_end: End date and time in format YYYYMMDDHHmm (e.g., '202308170000')
-         
-         **Response Structure:**
-         - GL_MarketDocument: Root object containing all forecast data
-           - mRID: Unique market document identifier
-           - type: Document type (A65)
-           - TimeSeries: Array of time series objects, each representing one day
-             - Period: Contains time interval and data points
-               - Point: Array of hourly load values
-                 - position: Hour of the day (1-24)
-                 - quantity: Forecasted load in MW
-         """)
-def day_ahead_total_load_forecast(
-    document_type: str = Query(..., description="Document type (A65 for day-ahead total load forecast)"),
-    process_type: str = Query(..., description="Process type (A01 for day ahead)"),
-    out_bidding_zone_domain: str = Query(..., description="EIC code for bidding zone (e.g., 10YCZ-CEPS-----N)"),
-    period_start: str = Query(..., description="Start date/time in format YYYYMMDDHHmm (e.g., 202308140000)"),
-    period_end: str = Query(..., description="End date/time in format YYYYMMDDHHmm (e.g., 202308170000)")
-) -> Dict[str, Any]:
-    """Proxy endpoint for ENTSOE day-ahead total load forecast data."""
-    return call_external_api_entsoe(document_type, process_type, out_bidding_zone_domain, period_start, period_end)
+@app.get("/metrics", summary="Prometheus metrics", include_in_schema=False)
+async def metrics():
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+    # Several workers (serve.py): aggregate the samples every worker process writes to the shared directory
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+
+
+# ==========================================
+#       COMPRESSION AND CONDITIONAL REQUESTS
+# ==========================================
+
+# Content types worth compressing (Parquet is compressed already)
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "application/vnd.apache.arrow.stream", "text/")
+
+
+class _Compressor:
+    """Incremental compressor for one response body; flush() makes everything so far decodable."""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "gzip":
+            self._compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        elif encoding == "br":
+            self._compressor = brotli.Compressor(quality=4)
+        else:
+            self._compressor = zstandard.ZstdCompressor(level=3).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.process(data)
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        if self.encoding == "gzip":
+            return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+        if self.encoding == "br":
+            return self._compressor.flush()
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+def _available_encodings() -> List[str]:
+    installed = {"gzip": True, "br": brotli is not None, "zstd": zstandard is not None}
+    return [encoding for encoding in COMPRESSION_ENCODINGS if installed.get(encoding)]
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Picks the preferred available encoding the client accepts (q > 0), None for identity."""
+    accepted: Dict[str, float] = {}
+    for entry in accept_encoding.split(","):
+        name, _, params = entry.strip().partition(";")
+        quality = 1.0
+        match = re.search(r"q=([0-9.]+)", params)
+        if match:
+            try:
+                quality = float(match.group(1))
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    for encoding in _available_encodings():
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+def _revalidated_encoding(etag: Optional[bytes], if_none_match: bytes) -> Optional[str]:
+    """Encoding whose suffixed ETag the client sent in If-None-Match, None if it holds the uncompressed variant."""
+    if etag is None or not etag.endswith(b'"') or etag.startswith(b"W/"):
+        return None
+    candidates = {candidate.strip().removeprefix(b"W/") for candidate in if_none_match.split(b",")}
+    for encoding in ("gzip", "br", "zstd"):
+        if etag[:-1] + b"-" + encoding.encode() + b'"' in candidates:
+            return encoding
+    return None
+
+
+class CompressionMiddleware:
+    """
+    Compresses responses with gzip, br or zstd according to Accept-Encoding. Bodies of known length are
+    compressed as a whole from COMPRESSION_MIN_SIZE bytes on; bodies of unknown length (streams) are
+    compressed chunk by chunk and flushed after each chunk. Strong ETags get the encoding appended,
+    since the bytes differ.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = ""
+        if_none_match = b""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+            elif name == b"if-none-match":
+                if_none_match = value
+        encoding = negotiate_encoding(accept_encoding) if accept_encoding else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Dict[str, Any] = {}
+        mode = None  # "passthrough", "buffer" or "stream", decided on the first body message
+        buffered: List[bytes] = []
+        compressor = _Compressor(encoding)
+
+        def compressed_start(headers: Dict[bytes, bytes], content_length: Optional[int] = None,
+                             content_encoding: bool = True, etag_suffix: Optional[str] = encoding) -> Dict[str, Any]:
+            response_headers = [(name, value) for name, value in start_message["headers"]
+                                if name.lower() not in (b"content-length", b"etag", b"vary")]
+            vary = headers.get(b"vary")
+            response_headers.append((b"vary", vary + b", Accept-Encoding" if vary else b"Accept-Encoding"))
+            if content_encoding:
+                response_headers.append((b"content-encoding", encoding.encode()))
+            etag = headers.get(b"etag")
+            if etag_suffix and etag is not None and etag.endswith(b'"') and not etag.startswith(b"W/"):
+                etag = etag[:-1] + b"-" + etag_suffix.encode() + b'"'
+            if etag is not None:
+                response_headers.append((b"etag", etag))
+            if content_length is not None:
+                response_headers.append((b"content-length", str(content_length).encode()))
+            return dict(start_message, headers=response_headers)
+
+        async def send_compressed(message):
+            nonlocal mode
+            if message["type"] == "http.response.start":
+                start_message.update(message)
+                return
+            if message["type"] != "http.response.body" or mode == "passthrough":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            headers = {name.lower(): value for name, value in start_message["headers"]}
+            if mode is None:
+                content_type = headers.get(b"content-type", b"").decode("latin-1")
+                content_length = int(headers[b"content-length"]) if b"content-length" in headers else None
+                size = content_length if content_length is not None else (None if more_body else len(body))
+                if start_message["status"] == 304:
+                    # Same ETag as the 200 the client is revalidating: suffixed only if that one was compressed
+                    # (bodies below COMPRESSION_MIN_SIZE are sent with the plain ETag)
+                    mode = "passthrough"
+                    suffix = _revalidated_encoding(headers.get(b"etag"), if_none_match)
+                    await send(compressed_start(headers, content_encoding=False, etag_suffix=suffix))
+                    await send(message)
+                    return
+                if (start_message["status"] == 204 or b"content-encoding" in headers
+                        or not content_type.startswith(COMPRESSIBLE_TYPES)
+                        or (size is not None and size < COMPRESSION_MIN_SIZE)):
+                    mode = "passthrough"
+                    await send(start_message)
+                    await send(message)
+                    return
+                mode = "stream" if size is None else "buffer"
+                if mode == "stream":
+                    await send(compressed_start(headers))
+
+            if mode == "buffer":
+                buffered.append(body)
+                if not more_body:
+                    compressed = compressor.compress(b"".join(buffered)) + compressor.finish()
+                    await send(compressed_start(headers, len(compressed)))
+                    await send({"type": "http.response.body", "body": compressed})
+                return
+            chunk = compressor.compress(body) + (compressor.flush() if more_body else compressor.finish())
+            await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
+
+
+app.add_middleware(CompressionMiddleware)
+
+
+def make_etag(*parts: Any) -> str:
+    """Strong ETag over the JSON encoding of parts."""
+    return '"' + hashlib.blake2b(dump_json(parts), digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match uses weak comparison; the encoding suffix added by CompressionMiddleware is ignored."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.strip('"')
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip().removeprefix("W/").strip('"')
+        for encoding in ("gzip", "br", "zstd"):
+            candidate = candidate.removesuffix("-" + encoding)
+        if candidate == opaque:
+            return True
+    return False
+
+
+def not_modified(if_none_match: Optional[str], etag: str, headers: Optional[Dict[str, str]] = None) -> Optional[Response]:
+    """Returns a 304 response if the client already has this ETag, else None."""
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=dict(headers or {}, ETag=etag))
+    return None
+
+
+def conditional_json_response(content: Any, etag: str, if_none_match: Optional[str],
+                              headers: Optional[Dict[str, str]] = None) -> Response:
+    """FastJSONResponse with an ETag, or a 304 (without serializing content) if the client has it."""
+    return not_modified(if_none_match, etag, headers) or FastJSONResponse(content, headers=dict(headers or {}, ETag=etag))
+
+
+# ==========================================
+#              UPSTREAM HTTP CLIENTS
+# ==========================================
+
+_http_clients: Dict[str, httpx.AsyncClient] = {}
+
+_HTTP_CLIENT_MAX_CONNECTIONS = {
+    "mastr": MASTR_MAX_CONNECTIONS,
+    "entsoe": ENTSOE_MAX_CONNECTIONS,
+}
+
+
+def _create_http_client(max_connections: int) -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(UPSTREAM_TIMEOUT, connect=UPSTREAM_CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=UPSTREAM_KEEPALIVE_EXPIRY,
+        ),
+    )
+
+
+def open_http_clients() -> None:
+    """Creates one keep-alive connection pool per upstream provider."""
+    for provider, max_connections in _HTTP_CLIENT_MAX_CONNECTIONS.items():
+        if provider not in _http_clients:
+            _http_clients[provider] = _create_http_client(max_connections)
+
+
+async def close_http_clients() -> None:
+    clients = list(_http_clients.values())
+    _http_clients.clear()
+    for client in clients:
+        await client.aclose()
+
+
+def get_http_client(provider: str) -> httpx.AsyncClient:
+    """
+    Returns the pooled client for 'mastr' or 'entsoe'.
+    Clients are created lazily so the upstream calls also work outside the app lifespan (e.g. scripts).
+    """
+    client = _http_clients.get(provider)
+    if client is None:
+        client = _create_http_client(_HTTP_CLIENT_MAX_CONNECTIONS[provider])
+        _http_clients[provider] = client
+    return client
+
+
+# ==========================================
+#              UPSTREAM RESILIENCE
+# ==========================================
+
+# Upstream statuses that are worth retrying. Every 5xx (including the 500 for a response the proxy cannot parse)
+# counts as an upstream failure for the circuit breaker, 4xx including 429 do not.
+RETRYABLE_STATUS_CODES = {429, 502, 503, 504}
+
+
+class TokenBucket:
+    """Async token bucket; waiters are served in FIFO order."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.waiting = 0
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        self.waiting += 1
+        try:
+            async with self._lock:
+                self._refill()
+                while self.tokens < 1:
+                    await asyncio.sleep((1 - self.tokens) / self.rate)
+                    self._refill()
+                self.tokens -= 1
+        finally:
+            self.waiting -= 1
+
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive upstream failures and rejects calls for reset_timeout seconds.
+    Then one trial call is let through (half-open): success closes the breaker, failure opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    def allow(self) -> bool:
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+            self._trial_in_flight = False
+        if self.state == self.HALF_OPEN:
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+        return self.state == self.CLOSED
+
+    def record_success(self) -> None:
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def release_trial(self) -> None:
+        """Frees the half-open trial slot of a call that ended without a verdict (e.g. it was cancelled)."""
+        self._trial_in_flight = False
+
+
+class UpstreamGuard:
+    """Rate limiter, circuit breaker and counters for one upstream provider."""
+
+    def __init__(self, provider: str, rate: float, burst: int):
+        self.provider = provider
+        self.bucket = TokenBucket(rate, burst)
+        self.breaker = CircuitBreaker(BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_TIMEOUT)
+        self.in_flight = 0
+        self.retries = 0
+        self.rejected = 0
+
+    def status(self) -> Dict[str, Any]:
+        open_for = None
+        if self.breaker.opened_at is not None:
+            open_for = round(time.monotonic() - self.breaker.opened_at, 3)
+        return {
+            "breaker": self.breaker.state,
+            "consecutive_failures": self.breaker.consecutive_failures,
+            "open_for_seconds": open_for,
+            "queue_depth": self.bucket.waiting,
+            "in_flight": self.in_flight,
+            "tokens": round(self.bucket.tokens, 2),
+            "retries": self.retries,
+            "rejected": self.rejected,
+        }
+
+
+upstream_guards: Dict[str, UpstreamGuard] = {
+    "mastr": UpstreamGuard("mastr", MASTR_RATE_LIMIT, MASTR_RATE_BURST),
+    "entsoe": UpstreamGuard("entsoe", ENTSOE_RATE_LIMIT, ENTSOE_RATE_BURST),
+}
+
+
+def retry_after_headers(response: httpx.Response) -> Optional[Dict[str, str]]:
+    """Passes the upstream Retry-After header on to our client (and to the retry logic)."""
+    retry_after = response.headers.get("Retry-After")
+    return {"Retry-After": retry_after} if retry_after else None
+
+
+def _retry_delay(attempt: int, error: HTTPException) -> float:
+    # Full jitter: uniform between 0 and the exponential cap
+    delay = random.uniform(0, min(UPSTREAM_RETRY_MAX_DELAY, UPSTREAM_RETRY_BASE_DELAY * 2 ** attempt))
+    retry_after = (error.headers or {}).get("Retry-After")
+    if retry_after and retry_after.isdigit():
+        delay = max(delay, float(retry_after))
+    return min(delay, UPSTREAM_RETRY_MAX_DELAY)
+
+
+# Shared by all providers; retry backoff happens outside of it
+upstream_budget = asyncio.Semaphore(UPSTREAM_CONCURRENCY)
+
+
+async def call_upstream(provider: str, fn: Callable[[], Awaitable[Any]], idempotent: bool) -> Any:
+    """
+    Runs one upstream call through the provider's rate limiter and circuit breaker, and the global upstream_budget.
+    Idempotent calls are retried on RETRYABLE_STATUS_CODES with jittered exponential backoff.
+    While the breaker is open, calls fail fast with 503.
+    """
+    guard = upstream_guards[provider]
+    attempts = UPSTREAM_MAX_RETRIES + 1 if idempotent else 1
+    for attempt in range(attempts):
+        if not guard.breaker.allow():
+            guard.rejected += 1
+            raise HTTPException(status_code=503, detail=f"{provider} upstream is unavailable (circuit open), retry later",
+                                headers={"Retry-After": str(int(BREAKER_RESET_TIMEOUT))})
+        trial = guard.breaker.state == CircuitBreaker.HALF_OPEN
+        try:
+            await guard.bucket.acquire()
+            async with upstream_budget:
+                guard.in_flight += 1
+                try:
+                    result = await fn()
+                finally:
+                    guard.in_flight -= 1
+        except HTTPException as e:
+            if e.status_code >= 500:
+                guard.breaker.record_failure()
+            elif e.status_code != 429:
+                # The upstream answered a client error, so it is up
+                guard.breaker.record_success()
+            if e.status_code not in RETRYABLE_STATUS_CODES or attempt + 1 >= attempts:
+                raise
+            guard.retries += 1
+            delay = _retry_delay(attempt, e)
+        except Exception:
+            # The upstream callers map their errors to HTTPException; anything else is a failure and is not retried
+            guard.breaker.record_failure()
+            raise
+        else:
+            guard.breaker.record_success()
+            return result
+        finally:
+            # Never leave the half-open breaker waiting for a verdict that will not come
+            if trial:
+                guard.breaker.release_trial()
+        await asyncio.sleep(delay)
+
+
+# ==========================================
+#              REQUEST COALESCING
+# ==========================================
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one in-flight call.
+    Every caller gets the same result object (treat it as read-only) or the same exception.
+    The shared call runs in its own task, so a caller that disconnects does not cancel it for the others.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception as retrieved in case every waiter was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+
+# ==========================================
+#              CACHE BACKENDS
+# ==========================================
+
+class CacheBackendError(Exception):
+    """The shared cache backend failed; callers degrade to a cache miss or an uncoordinated call."""
+
+
+class MemoryCache:
+    """Async facade over a TTLCache, the per-process cache behind CACHE_BACKEND=memory."""
+
+    def __init__(self, maxsize: int):
+        self._cache = TTLCache(maxsize)
+
+    async def get(self, key: Hashable, stale_ttl: float = 0.0) -> Tuple[Optional[Any], str]:
+        return self._cache.get(key, stale_ttl)
+
+    async def get_any(self, key: Hashable) -> Optional[Any]:
+        return self._cache.get_any(key)
+
+    async def set(self, key: Hashable, value: Any, ttl: float) -> None:
+        self._cache.set(key, value, ttl)
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+
+class SharedCache:
+    """
+    One namespace of a shared backend, with the same interface and semantics as MemoryCache.
+    Keys are hashed, values are stored as JSON together with their write time (wall clock, so all workers agree
+    on the age) and TTL. Backend failures are logged and treated as misses.
+    """
+
+    def __init__(self, backend: "CacheBackend", namespace: str):
+        self.backend = backend
+        self.namespace = namespace
+
+    def key(self, key: Hashable) -> str:
+        return f"{CACHE_KEY_PREFIX}:{self.namespace}:{hashlib.blake2b(dump_json(key), digest_size=16).hexdigest()}"
+
+    async def _entry(self, key: Hashable) -> Optional[List[Any]]:
+        try:
+            data = await self.backend.read(self.key(key))
+        except CacheBackendError as e:
+            logger.warning("Cache backend read failed: %s", e)
+            return None
+        return load_json(data) if data is not None else None
+
+    async def get(self, key: Hashable, stale_ttl: float = 0.0) -> Tuple[Optional[Any], str]:
+        entry = await self._entry(key)
+        if entry is None:
+            return None, CACHE_MISS
+        stored_at, ttl, value = entry
+        age = time.time() - stored_at
+        if age <= ttl:
+            return value, CACHE_HIT
+        if age <= ttl + stale_ttl:
+            return value, CACHE_STALE
+        return None, CACHE_MISS
+
+    async def get_any(self, key: Hashable) -> Optional[Any]:
+        entry = await self._entry(key)
+        return entry[2] if entry is not None else None
+
+    async def set(self, key: Hashable, value: Any, ttl: float) -> None:
+        try:
+            await self.backend.write(self.key(key), dump_json([time.time(), ttl, value]), ttl + SHARED_CACHE_RETENTION)
+        except CacheBackendError as e:
+            logger.warning("Cache backend write failed: %s", e)
+
+
+class CacheBackend:
+    """
+    Storage behind the response caches and the single-flight locks. Shared backends implement read/write of
+    opaque bytes with an expiry and a lock with owner token and expiry; entries and locks are never held forever.
+    """
+
+    name = "abstract"
+    shared = True
+
+    def cache(self, namespace: str, maxsize: int) -> Any:
+        return SharedCache(self, namespace)
+
+    async def read(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    async def write(self, key: str, data: bytes, expire: float) -> None:
+        raise NotImplementedError
+
+    async def acquire_lock(self, key: str, ttl: float) -> Optional[str]:
+        """Returns an owner token if the lock was free (or expired), else None."""
+        raise NotImplementedError
+
+    async def release_lock(self, key: str, token: str) -> None:
+        """Releases the lock if it is still held with this token."""
+        raise NotImplementedError
+
+    async def publish(self, key: str, field: str, data: bytes) -> None:
+        """Sets one field of a shared map, replacing what was published for it before."""
+        raise NotImplementedError
+
+    async def read_changes(self, key: str, cursor: float) -> Tuple[List[bytes], float]:
+        """
+        Returns the fields of the map written since `cursor` (0 = all), each in its latest state, and the cursor
+        to continue from. A field may be returned again by the next read. The map holds one entry per field,
+        so a replay from 0 is bounded by the number of fields, not by the number of writes.
+        """
+        raise NotImplementedError
+
+    async def status(self) -> Dict[str, Any]:
+        return {"backend": self.name}
+
+    async def close(self) -> None:
+        pass
+
+
+class MemoryCacheBackend(CacheBackend):
+    """Per-process caches and locks (the default); every worker caches and calls upstream on its own."""
+
+    name = "memory"
+    shared = False
+
+    def __init__(self):
+        self._caches: Dict[str, MemoryCache] = {}
+        # key -> (token, expires_at)
+        self._locks: Dict[str, Tuple[str, float]] = {}
+
+    def cache(self, namespace: str, maxsize: int) -> MemoryCache:
+        self._caches[namespace] = MemoryCache(maxsize)
+        return self._caches[namespace]
+
+    async def acquire_lock(self, key: str, ttl: float) -> Optional[str]:
+        held = self._locks.get(key)
+        if held is not None and held[1] > time.monotonic():
+            return None
+        token = os.urandom(8).hex()
+        self._locks[key] = (token, time.monotonic() + ttl)
+        return token
+
+    async def release_lock(self, key: str, token: str) -> None:
+        if self._locks.get(key, (None,))[0] == token:
+            del self._locks[key]
+
+    async def status(self) -> Dict[str, Any]:
+        return {"backend": self.name, "entries": {namespace: len(cache) for namespace, cache in self._caches.items()}}
+
+
+class SqliteCacheBackend(CacheBackend):
+    """
+    One SQLite file (WAL mode) shared by the worker processes of a host. Each thread keeps its own connection,
+    calls run in the default thread pool. Expired rows are deleted every SQLITE_PRUNE_EVERY writes.
+    """
+
+    name = "sqlite"
+    SQLITE_PRUNE_EVERY = 1000
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, data BLOB, expires_at REAL)")
+            connection.execute("CREATE TABLE IF NOT EXISTS locks (key TEXT PRIMARY KEY, token TEXT, expires_at REAL)")
+            # INSERT OR REPLACE gives a rewritten field a new, higher id, which serves as its version
+            connection.execute("CREATE TABLE IF NOT EXISTS versioned (id INTEGER PRIMARY KEY AUTOINCREMENT, key TEXT, "
+                               "field TEXT, data BLOB, UNIQUE (key, field))")
+            self._local.connection = connection
+        return connection
+
+    async def _run(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        def run() -> Any:
+            try:
+                return fn(self._connection())
+            except sqlite3.Error as e:
+                raise CacheBackendError(f"sqlite: {e}") from e
+        return await asyncio.to_thread(run)
+
+    async def read(self, key: str) -> Optional[bytes]:
+        row = await self._run(lambda c: c.execute(
+            "SELECT data FROM entries WHERE key = ? AND expires_at > ?", (key, time.time())).fetchone())
+        return row[0] if row else None
+
+    async def write(self, key: str, data: bytes, expire: float) -> None:
+        self._writes += 1
+        prune = self._writes % self.SQLITE_PRUNE_EVERY == 0
+
+        def write(connection: sqlite3.Connection) -> None:
+            now = time.time()
+            connection.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?)", (key, data, now + expire))
+            if prune:
+                connection.execute("DELETE FROM entries WHERE expires_at <= ?", (now,))
+                connection.execute("DELETE FROM locks WHERE expires_at <= ?", (now,))
+        await self._run(write)
+
+    async def acquire_lock(self, key: str, ttl: float) -> Optional[str]:
+        token = os.urandom(8).hex()
+
+        def acquire(connection: sqlite3.Connection) -> bool:
+            now = time.time()
+            # One write transaction, so the expiry check and the insert are atomic across processes
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                connection.execute("DELETE FROM locks WHERE key = ? AND expires_at <= ?", (key, now))
+                inserted = connection.execute("INSERT OR IGNORE INTO locks VALUES (?, ?, ?)", (key, token, now + ttl)).rowcount
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            return inserted == 1
+        return token if await self._run(acquire) else None
+
+    async def release_lock(self, key: str, token: str) -> None:
+        await self._run(lambda c: c.execute("DELETE FROM locks WHERE key = ? AND token = ?", (key, token)))
+
+    async def publish(self, key: str, field: str, data: bytes) -> None:
+        await self._run(lambda c: c.execute(
+            "INSERT OR REPLACE INTO versioned (key, field, data) VALUES (?, ?, ?)", (key, field, data)))
+
+    async def read_changes(self, key: str, cursor: float) -> Tuple[List[bytes], float]:
+        rows = await self._run(lambda c: c.execute(
+            "SELECT id, data FROM versioned WHERE key = ? AND id > ? ORDER BY id", (key, cursor)).fetchall())
+        return [data for _, data in rows], rows[-1][0] if rows else cursor
+
+    async def status(self) -> Dict[str, Any]:
+        entries, locks = await self._run(lambda c: (
+            c.execute("SELECT COUNT(*) FROM entries WHERE expires_at > ?", (time.time(),)).fetchone()[0],
+            c.execute("SELECT COUNT(*) FROM locks WHERE expires_at > ?", (time.time(),)).fetchone()[0],
+        ))
+        return {"backend": self.name, "path": self.path, "entries": entries, "locks": locks}
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Redis protocol (RESP2) client on asyncio streams with a small connection pool. Uses GET, SET PX,
+    SET NX PX for locks and WATCH/MULTI/EXEC to release a lock only while it still holds our token.
+    A versioned map is a hash of the data and a sorted set of field -> write time (wall clock, like SharedCache).
+    Connecting and every command are limited to REDIS_TIMEOUT, so a hung server costs a cache miss, not a hang.
+    """
+
+    name = "redis"
+
+    def __init__(self, url: str):
+        parsed = urlsplit(url)
+        self.url = f"redis://{parsed.hostname or '127.0.0.1'}:{parsed.port or 6379}{parsed.path}"
+        self.host = parsed.hostname or "127.0.0.1"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.strip("/") or 0)
+        self._idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+
+    @staticmethod
+    def _encode(*args: Any) -> bytes:
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode("utf-8")
+            parts.append(b"$%d\r\n%b\r\n" % (len(data), data))
+        return b"".join(parts)
+
+    @classmethod
+    async def _read_reply(cls, reader: asyncio.StreamReader) -> Any:
+        line = await reader.readline()
+        if not line.endswith(b"\r\n"):
+            raise ConnectionError("connection closed")
+        prefix, rest = line[:1], line[1:-2]
+        if prefix == b"+":
+            return rest.decode()
+        if prefix == b"-":
+            raise CacheBackendError(f"redis: {rest.decode()}")
+        if prefix == b":":
+            return int(rest)
+        if prefix == b"$":
+            length = int(rest)
+            return None if length < 0 else (await reader.readexactly(length + 2))[:-2]
+        if prefix == b"*":
+            length = int(rest)
+            return None if length < 0 else [await cls._read_reply(reader) for _ in range(length)]
+        raise CacheBackendError(f"redis: unexpected reply {line[:32]!r}")
+
+    async def _command(self, connection: Tuple[asyncio.StreamReader, asyncio.StreamWriter], *args: Any) -> Any:
+        reader, writer = connection
+
+        async def exchange() -> Any:
+            writer.write(self._encode(*args))
+            await writer.drain()
+            return await self._read_reply(reader)
+        return await asyncio.wait_for(exchange(), REDIS_TIMEOUT)
+
+    async def _open(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        connection = await asyncio.wait_for(asyncio.open_connection(self.host, self.port), REDIS_TIMEOUT)
+        try:
+            if self.password:
+                await self._command(connection, "AUTH", self.password)
+            if self.db:
+                await self._command(connection, "SELECT", self.db)
+        except BaseException:
+            connection[1].close()
+            raise
+        return connection
+
+    @asynccontextmanager
+    async def _connection(self) -> AsyncIterator[Tuple[asyncio.StreamReader, asyncio.StreamWriter]]:
+        try:
+            connection = self._idle.pop() if self._idle else await self._open()
+        except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError) as e:
+            raise CacheBackendError(f"redis {self.host}:{self.port}: {e!r}") from e
+        try:
+            yield connection
+        except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError) as e:
+            # The connection state is unknown (e.g. a reply may still arrive), do not reuse it
+            connection[1].close()
+            raise CacheBackendError(f"redis {self.host}:{self.port}: {e!r}") from e
+        except BaseException:
+            connection[1].close()
+            raise
+        if len(self._idle) < REDIS_POOL_SIZE:
+            self._idle.append(connection)
+        else:
+            connection[1].close()
+
+    async def execute(self, *args: Any) -> Any:
+        async with self._connection() as connection:
+            return await self._command(connection, *args)
+
+    async def read(self, key: str) -> Optional[bytes]:
+        return await self.execute("GET", key)
+
+    async def write(self, key: str, data: bytes, expire: float) -> None:
+        await self.execute("SET", key, data, "PX", max(int(expire * 1000), 1))
+
+    async def acquire_lock(self, key: str, ttl: float) -> Optional[str]:
+        token = os.urandom(8).hex()
+        reply = await self.execute("SET", f"{key}:lock", token, "NX", "PX", max(int(ttl * 1000), 1))
+        return token if reply == "OK" else None
+
+    async def release_lock(self, key: str, token: str) -> None:
+        async with self._connection() as connection:
+            await self._command(connection, "WATCH", f"{key}:lock")
+            if await self._command(connection, "GET", f"{key}:lock") != token.encode():
+                await self._command(connection, "UNWATCH")
+                return
+            await self._command(connection, "MULTI")
+            await self._command(connection, "DEL", f"{key}:lock")
+            # A nil reply means the lock expired and was taken over in between, which is fine
+            await self._command(connection, "EXEC")
+
+    async def publish(self, key: str, field: str, data: bytes) -> None:
+        async with self._connection() as connection:
+            await self._command(connection, "MULTI")
+            await self._command(connection, "HSET", key, field, data)
+            await self._command(connection, "ZADD", f"{key}:versions", repr(time.time()), field)
+            await self._command(connection, "EXEC")
+
+    async def read_changes(self, key: str, cursor: float) -> Tuple[List[bytes], float]:
+        started = time.time()
+        async with self._connection() as connection:
+            fields = await self._command(connection, "ZRANGEBYSCORE", f"{key}:versions", f"({cursor!r}", "+inf")
+            values = await self._command(connection, "HMGET", key, *fields) if fields else []
+        # A write stamped shortly before `started` may only commit after this read (each command takes up to
+        # REDIS_TIMEOUT), so the next read starts that much earlier and may return a few fields again
+        return [value for value in values if value is not None], started - 2 * REDIS_TIMEOUT
+
+    async def status(self) -> Dict[str, Any]:
+        return {"backend": self.name, "url": self.url, "keys": await self.execute("DBSIZE"),
+                "idle_connections": len(self._idle)}
+
+    async def close(self) -> None:
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
+
+
+def create_cache_backend(spec: str) -> CacheBackend:
+    if spec == "memory":
+        return MemoryCacheBackend()
+    if spec.startswith("sqlite:"):
+        return SqliteCacheBackend(spec[len("sqlite:"):] or "cache.sqlite3")
+    if spec.startswith("redis://"):
+        return RedisCacheBackend(spec)
+    raise RuntimeError(f"Unknown CACHE_BACKEND '{spec}' (expected memory, sqlite:<path> or redis://host:port/db)")
+
+
+class SharedSingleFlight(SingleFlight):
+    """
+    SingleFlight across worker processes. Calls are first coalesced within the process; the first worker then
+    takes a lock in the shared backend and publishes its result for SHARED_FLIGHT_RESULT_TTL seconds, while the
+    other workers poll for that result. If the holder fails, the next waiter takes the lock and calls itself;
+    after SHARED_FLIGHT_WAIT or on backend errors a worker calls without coordination.
+    """
+
+    def __init__(self, backend: CacheBackend):
+        super().__init__()
+        self.backend = backend
+        self.results = SharedCache(backend, "flight")
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        return await super().do(key, lambda: self._do_shared(key, fn))
+
+    async def _do_shared(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        lock_key = self.results.key(key)
+        token = None
+        deadline = time.monotonic() + SHARED_FLIGHT_WAIT
+        try:
+            while True:
+                result, _ = await self.results.get(key)
+                if result is not None:
+                    return result
+                token = await self.backend.acquire_lock(lock_key, SHARED_FLIGHT_LOCK_TTL)
+                if token is not None or time.monotonic() >= deadline:
+                    break
+                await asyncio.sleep(SHARED_FLIGHT_POLL_INTERVAL)
+        except CacheBackendError as e:
+            logger.warning("Cache backend lock failed, calling upstream uncoordinated: %s", e)
+
+        try:
+            result = await fn()
+            await self.results.set(key, result, SHARED_FLIGHT_RESULT_TTL)
+            return result
+        finally:
+            if token is not None:
+                try:
+                    await self.backend.release_lock(lock_key, token)
+                except CacheBackendError as e:
+                    # The lock expires after SHARED_FLIGHT_LOCK_TTL
+                    logger.warning("Cache backend unlock failed: %s", e)
+
+
+cache_backend = create_cache_backend(CACHE_BACKEND)
+upstream_singleflight = SharedSingleFlight(cache_backend) if cache_backend.shared else SingleFlight()
+
+
+# ==========================================
+#              RESPONSE CACHE
+# ==========================================
+
+CACHE_HIT = "HIT"
+CACHE_STALE = "STALE"
+CACHE_MISS = "MISS"
+CACHE_BYPASS = "BYPASS"
+CACHE_STALE_IF_ERROR = "STALE-IF-ERROR"
+
+
+class TTLCache:
+    """
+    Bounded in-process LRU cache with a TTL per entry and a stale-while-revalidate window.
+    Expired entries are only dropped by LRU eviction, they are never returned once the stale window is over.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        # key -> (stored_at, ttl, value)
+        self._entries: "OrderedDict[Hashable, Tuple[float, float, Any]]" = OrderedDict()
+
+    def get(self, key: Hashable, stale_ttl: float = 0.0) -> Tuple[Optional[Any], str]:
+        """Returns (value, CACHE_HIT) while fresh, (value, CACHE_STALE) inside the stale window, else (None, CACHE_MISS)."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None, CACHE_MISS
+        self._entries.move_to_end(key)
+        stored_at, ttl, value = entry
+        age = time.monotonic() - stored_at
+        if age <= ttl:
+            return value, CACHE_HIT
+        if age <= ttl + stale_ttl:
+            return value, CACHE_STALE
+        return None, CACHE_MISS
+
+    def get_any(self, key: Hashable) -> Optional[Any]:
+        """Returns the entry regardless of its age (used to bridge upstream outages)."""
+        entry = self._entries.get(key)
+        return entry[2] if entry is not None else None
+
+    def set(self, key: Hashable, value: Any, ttl: float) -> None:
+        self._entries[key] = (time.monotonic(), ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Both live in CACHE_BACKEND, so with a shared backend every worker sees the same entries
+einheit_cache = cache_backend.cache("einheit", EINHEIT_CACHE_MAXSIZE)
+# (document_type, process_type, zone, UTC day) -> document with the TimeSeries overlapping that day
+entsoe_live_cache = cache_backend.cache("entsoe_live", ENTSOE_LIVE_CACHE_MAXSIZE)
+
+# Keys with a background revalidation in flight, and the tasks themselves (kept referenced until done)
+_revalidating_keys: Set[Hashable] = set()
+_revalidation_tasks: Set[asyncio.Task] = set()
+
+
+def _einheit_cache_key(endpoint: str, request: "EinheitRequest") -> Tuple[str, str, str]:
+    # The Marktakteur is part of the key, so one Marktakteur's data is never served to another.
+    return (endpoint, request.marktakteur_mastr_nummer, request.einheit_mastr_nummer)
+
+
+def validation_mode(endpoint: str) -> str:
+    return RESPONSE_VALIDATION_OVERRIDES.get(endpoint, RESPONSE_VALIDATION)
+
+
+def validate_response(endpoint: str, response_model: type, data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Validates an upstream payload against its response model (strict mode) and returns the dump by alias,
+    i.e. exactly what FastAPI's response_model handling would send. In passthrough mode the payload is returned as is.
+    """
+    if validation_mode(endpoint) == "passthrough":
+        return data
+    started = time.perf_counter()
+    try:
+        return response_model.model_validate(data).model_dump(by_alias=True)
+    except ValidationError as e:
+        raise HTTPException(status_code=500, detail=f"Invalid {endpoint} response: {e}")
+    finally:
+        observe_stage(endpoint, "validate", time.perf_counter() - started)
+
+
+async def _fetch_einheit(endpoint: str, request: "EinheitRequest") -> Dict[str, Any]:
+    # Validated once here, cache hits are served without another validation pass
+    data = validate_response(endpoint, EINHEIT_RESPONSE_MODELS[endpoint], await call_external_api_mastr(endpoint, request))
+    index_einheit(request.marktakteur_mastr_nummer, endpoint, data)
+    await share_indexed_einheit(request.marktakteur_mastr_nummer, endpoint, data)
+    return data
+
+
+async def _revalidate_einheit(key: Hashable, endpoint: str, request: "EinheitRequest") -> None:
+    try:
+        data = await _fetch_einheit(endpoint, request)
+        await einheit_cache.set(key, data, EINHEIT_CACHE_TTL[endpoint])
+    except Exception as e:
+        # Keep serving the stale entry; the next request after the stale window goes upstream again.
+        logger.warning("Background revalidation of %s failed: %s", key, e)
+    finally:
+        _revalidating_keys.discard(key)
+
+
+def _schedule_revalidation(key: Hashable, endpoint: str, request: "EinheitRequest") -> None:
+    if key in _revalidating_keys:
+        return
+    _revalidating_keys.add(key)
+    task = asyncio.create_task(_revalidate_einheit(key, endpoint, request))
+    _revalidation_tasks.add(task)
+    task.add_done_callback(_revalidation_tasks.discard)
+
+
+async def get_einheit(endpoint: str, request: "EinheitRequest") -> Tuple[Dict[str, Any], str]:
+    """
+    Returns the raw GetEinheit* response and its cache status.
+    Stale entries are served immediately while a single background call refreshes them;
+    expired entries are served if the upstream fails with a 5xx.
+    """
+    ttl = EINHEIT_CACHE_TTL[endpoint]
+    if ttl <= 0:
+        return await _fetch_einheit(endpoint, request), CACHE_BYPASS
+
+    key = _einheit_cache_key(endpoint, request)
+    data, status = await einheit_cache.get(key, EINHEIT_CACHE_STALE_TTL)
+    record_cache_event("einheit", status)
+    if status == CACHE_STALE:
+        _schedule_revalidation(key, endpoint, request)
+    if data is not None:
+        return data, status
+
+    try:
+        data = await _fetch_einheit(endpoint, request)
+    except HTTPException as e:
+        # While the upstream is down (or the breaker is open), an expired entry beats an error
+        fallback = await einheit_cache.get_any(key) if e.status_code >= 500 else None
+        if fallback is None:
+            raise
+        record_cache_event("einheit", CACHE_STALE_IF_ERROR)
+        return fallback, CACHE_STALE_IF_ERROR
+    await einheit_cache.set(key, data, ttl)
+    return data, CACHE_MISS
+
+
+# ==========================================
+#              PERSISTENT ENTSOE STORE
+# ==========================================
+
+class EntsoeStore:
+    """
+    SQLite store for ENTSOE documents of days that are already over; those forecasts no longer change.
+    The coverage table records which (documentType, processType, out_Domain, interval) windows were fetched,
+    the series table holds their TimeSeries. Period bounds are stored as YYYYMMDDHHmm (UTC) strings.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._schema_ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=30)
+        if not self._schema_ready:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript("""
+                CREATE TABLE IF NOT EXISTS coverage (
+                    document_type TEXT NOT NULL,
+                    process_type TEXT NOT NULL,
+                    out_domain TEXT NOT NULL,
+                    start TEXT NOT NULL,
+                    end TEXT NOT NULL,
+                    header TEXT NOT NULL,
+                    PRIMARY KEY (document_type, process_type, out_domain, start, end)
+                );
+                CREATE TABLE IF NOT EXISTS series (
+                    document_type TEXT NOT NULL,
+                    process_type TEXT NOT NULL,
+                    out_domain TEXT NOT NULL,
+                    start TEXT NOT NULL,
+                    end TEXT NOT NULL,
+                    resolution TEXT NOT NULL,
+                    business_type TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    PRIMARY KEY (document_type, process_type, out_domain, start, resolution, business_type)
+                );
+            """)
+            self._schema_ready = True
+        return connection
+
+    def missing_intervals(self, document_type: str, process_type: str, out_domain: str,
+                          start: datetime, end: datetime) -> List[Tuple[datetime, datetime]]:
+        """Returns the sub-intervals of [start, end) that are not covered by the store yet."""
+        key = (document_type, process_type, out_domain)
+        start_key, end_key = format_entsoe_period(start), format_entsoe_period(end)
+        with closing(self._connect()) as connection:
+            covered = connection.execute(
+                "SELECT start, end FROM coverage WHERE document_type = ? AND process_type = ? AND out_domain = ? "
+                "AND start < ? AND end > ? ORDER BY start",
+                key + (end_key, start_key),
+            ).fetchall()
+
+        gaps = []
+        cursor = start_key
+        for covered_start, covered_end in covered:
+            if covered_start > cursor:
+                gaps.append((cursor, covered_start))
+            cursor = max(cursor, covered_end)
+            if cursor >= end_key:
+                break
+        if cursor < end_key:
+            gaps.append((cursor, end_key))
+        return [(parse_entsoe_period(gap_start), parse_entsoe_period(gap_end)) for gap_start, gap_end in gaps]
+
+    def save(self, document_type: str, process_type: str, out_domain: str,
+             start: datetime, end: datetime, document: Dict[str, Any]) -> None:
+        """Stores the TimeSeries of a fetched window and marks the window as covered."""
+        key = (document_type, process_type, out_domain)
+        market_document = document["GL_MarketDocument"]
+        header = {k: v for k, v in market_document.items() if k != "TimeSeries"}
+        rows = []
+        for series in market_document["TimeSeries"]:
+            period = series["Period"]
+            rows.append(key + (
+                format_entsoe_period(parse_entsoe_timestamp(period["timeInterval"]["start"])),
+                format_entsoe_period(parse_entsoe_timestamp(period["timeInterval"]["end"])),
+                period["resolution"],
+                series.get("businessType") or "",
+                json.dumps(series),
+            ))
+        with closing(self._connect()) as connection, connection:
+            connection.executemany("INSERT OR REPLACE INTO series VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            connection.execute(
+                "INSERT OR REPLACE INTO coverage VALUES (?, ?, ?, ?, ?, ?)",
+                key + (format_entsoe_period(start), format_entsoe_period(end), json.dumps(header)),
+            )
+
+    def load(self, document_type: str, process_type: str, out_domain: str,
+             start: datetime, end: datetime) -> Dict[str, Any]:
+        """
+        Builds a GL_MarketDocument from all stored TimeSeries that overlap [start, end), with the header of the
+        first stored window, time_Period set to [start, end) and, like merge_entsoe_documents, an mRID derived
+        from the headers of all stored windows used.
+        """
+        key = (document_type, process_type, out_domain)
+        start_key, end_key = format_entsoe_period(start), format_entsoe_period(end)
+        with closing(self._connect()) as connection:
+            header_rows = connection.execute(
+                "SELECT header FROM coverage WHERE document_type = ? AND process_type = ? AND out_domain = ? "
+                "AND start < ? AND end > ? ORDER BY start",
+                key + (end_key, start_key),
+            ).fetchall()
+            series_rows = connection.execute(
+                "SELECT payload FROM series WHERE document_type = ? AND process_type = ? AND out_domain = ? "
+                "AND start < ? AND end > ? ORDER BY start, end, resolution",
+                key + (end_key, start_key),
+            ).fetchall()
+
+        headers = [json.loads(header) for (header,) in header_rows]
+        header = dict(headers[0]) if headers else {}
+        if len(headers) > 1:
+            header["mRID"] = combined_entsoe_mrid(headers)
+        if isinstance(header.get("time_Period.timeInterval"), dict):
+            header["time_Period.timeInterval"] = {
+                "start": start.strftime(ENTSOE_TIMESTAMP_FORMAT),
+                "end": end.strftime(ENTSOE_TIMESTAMP_FORMAT),
+            }
+        timeseries = [dict(json.loads(payload), mRID=str(index)) for index, (payload,) in enumerate(series_rows, start=1)]
+        return {"GL_MarketDocument": dict(header, TimeSeries=timeseries)}
+
+
+entsoe_store: Optional[EntsoeStore] = EntsoeStore(ENTSOE_STORE_PATH) if ENTSOE_STORE_PATH else None
+
+
+# ==========================================
+#              LOCAL MASTR MIRROR
+# ==========================================
+
+# Request fields (by attribute name) the mirror can answer, mapped to their indexed column
+MIRROR_FILTER_COLUMNS = {
+    "einheit_postleitzahl": ("EinheitPostleitzahl", "einheit_postleitzahl"),
+    "regel_zone": ("Regelzone", "regelzone"),
+    "spannungs_ebene": ("Spannungsebene", "spannungsebene"),
+    "netzbetreiber_mastr_nummer": ("NetzbetreiberMastrNummer", "netzbetreiber_mastr_nummer"),
+}
+_MIRROR_PAGING_FIELDS = {"marktakteur_mastr_nummer", "start_ab", "limit_param"}
+
+
+class MastrMirror:
+    """
+    SQLite mirror of the GetListeAlleNetzanschlusspunkte rows per Marktakteur, with secondary indexes on
+    the filter fields in MIRROR_FILTER_COLUMNS. Rows are synced incrementally via datumAb. A full sync is
+    staged under its own sync id and swapped in at once, so readers never see a partially loaded Marktakteur.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._schema_ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=30)
+        if not self._schema_ready:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript("""
+                CREATE TABLE IF NOT EXISTS netzanschlusspunkte (
+                    marktakteur TEXT NOT NULL,
+                    row_key TEXT NOT NULL,
+                    einheit_postleitzahl TEXT,
+                    regelzone TEXT,
+                    spannungsebene TEXT,
+                    netzbetreiber_mastr_nummer TEXT,
+                    payload TEXT NOT NULL,
+                    PRIMARY KEY (marktakteur, row_key)
+                );
+                CREATE INDEX IF NOT EXISTS idx_nap_postleitzahl ON netzanschlusspunkte (marktakteur, einheit_postleitzahl);
+                CREATE INDEX IF NOT EXISTS idx_nap_regelzone ON netzanschlusspunkte (marktakteur, regelzone);
+                CREATE INDEX IF NOT EXISTS idx_nap_spannungsebene ON netzanschlusspunkte (marktakteur, spannungsebene);
+                CREATE INDEX IF NOT EXISTS idx_nap_netzbetreiber ON netzanschlusspunkte (marktakteur, netzbetreiber_mastr_nummer);
+                CREATE TABLE IF NOT EXISTS netzanschlusspunkte_staging (
+                    sync_id TEXT NOT NULL,
+                    marktakteur TEXT NOT NULL,
+                    row_key TEXT NOT NULL,
+                    einheit_postleitzahl TEXT,
+                    regelzone TEXT,
+                    spannungsebene TEXT,
+                    netzbetreiber_mastr_nummer TEXT,
+                    payload TEXT NOT NULL,
+                    PRIMARY KEY (sync_id, row_key)
+                );
+                CREATE TABLE IF NOT EXISTS sync_state (
+                    marktakteur TEXT PRIMARY KEY,
+                    synced_at REAL NOT NULL,
+                    datum_ab TEXT NOT NULL,
+                    envelope TEXT NOT NULL
+                );
+            """)
+            self._schema_ready = True
+        return connection
+
+    @staticmethod
+    def _row_key(row: Dict[str, Any]) -> str:
+        parts = [str(row.get(k) or "") for k in ("NetzanschlusspunktMastrNummer", "LokationMastrNummer", "EinheitMastrNummer")]
+        return "|".join(parts) if any(parts) else json.dumps(row, sort_keys=True, default=str)
+
+    def _row_values(self, marktakteur: str, rows: List[Dict[str, Any]]) -> List[Tuple[Any, ...]]:
+        return [
+            (marktakteur, self._row_key(row))
+            + tuple(row.get(field) for field, _ in MIRROR_FILTER_COLUMNS.values())
+            + (json.dumps(row, default=str),)
+            for row in rows
+        ]
+
+    def upsert(self, marktakteur: str, rows: List[Dict[str, Any]]) -> None:
+        with closing(self._connect()) as connection, connection:
+            connection.executemany("INSERT OR REPLACE INTO netzanschlusspunkte VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                   self._row_values(marktakteur, rows))
+
+    def stage(self, sync_id: str, marktakteur: str, rows: List[Dict[str, Any]]) -> None:
+        """Adds rows of a full sync; they are not visible to queries until replace_with_staged."""
+        with closing(self._connect()) as connection, connection:
+            connection.executemany("INSERT OR REPLACE INTO netzanschlusspunkte_staging VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                   [(sync_id,) + values for values in self._row_values(marktakteur, rows)])
+
+    def discard_staged(self, sync_id: str) -> None:
+        with closing(self._connect()) as connection, connection:
+            connection.execute("DELETE FROM netzanschlusspunkte_staging WHERE sync_id = ?", (sync_id,))
+
+    def _mark_synced(self, connection: sqlite3.Connection, marktakteur: str, synced_at: float, datum_ab: str,
+                     envelope: Dict[str, Any]) -> None:
+        connection.execute("INSERT OR REPLACE INTO sync_state VALUES (?, ?, ?, ?)",
+                           (marktakteur, synced_at, datum_ab, json.dumps(envelope, default=str)))
+
+    def mark_synced(self, marktakteur: str, synced_at: float, datum_ab: str, envelope: Dict[str, Any]) -> None:
+        with closing(self._connect()) as connection, connection:
+            self._mark_synced(connection, marktakteur, synced_at, datum_ab, envelope)
+
+    def replace_with_staged(self, sync_id: str, marktakteur: str, synced_at: float, datum_ab: str,
+                            envelope: Dict[str, Any]) -> None:
+        """Replaces all rows of the Marktakteur with the staged ones and marks it synced, in one transaction."""
+        with closing(self._connect()) as connection, connection:
+            connection.execute("DELETE FROM netzanschlusspunkte WHERE marktakteur = ?", (marktakteur,))
+            connection.execute(
+                "INSERT INTO netzanschlusspunkte SELECT marktakteur, row_key, einheit_postleitzahl, regelzone, "
+                "spannungsebene, netzbetreiber_mastr_nummer, payload FROM netzanschlusspunkte_staging WHERE sync_id = ?",
+                (sync_id,))
+            connection.execute("DELETE FROM netzanschlusspunkte_staging WHERE sync_id = ?", (sync_id,))
+            self._mark_synced(connection, marktakteur, synced_at, datum_ab, envelope)
+
+    def sync_state(self, marktakteur: str) -> Optional[Dict[str, Any]]:
+        with closing(self._connect()) as connection:
+            row = connection.execute("SELECT synced_at, datum_ab, envelope FROM sync_state WHERE marktakteur = ?",
+                                     (marktakteur,)).fetchone()
+        if row is None:
+            return None
+        return {"synced_at": row[0], "datum_ab": row[1], "envelope": json.loads(row[2])}
+
+    def status(self) -> List[Dict[str, Any]]:
+        with closing(self._connect()) as connection:
+            rows = connection.execute(
+                "SELECT s.marktakteur, s.synced_at, s.datum_ab, "
+                "(SELECT COUNT(*) FROM netzanschlusspunkte n WHERE n.marktakteur = s.marktakteur) "
+                "FROM sync_state s ORDER BY s.marktakteur"
+            ).fetchall()
+        return [{"marktakteurMastrNummer": m, "syncedAt": synced_at, "datumAb": datum_ab, "rows": count}
+                for m, synced_at, datum_ab, count in rows]
+
+    def query(self, marktakteur: str, filters: Dict[str, Any], start_ab: int, limit: Optional[int]) -> List[Dict[str, Any]]:
+        where = ["marktakteur = ?"] + [f"{column} = ?" for column in filters]
+        sql = f"SELECT payload FROM netzanschlusspunkte WHERE {' AND '.join(where)} ORDER BY row_key LIMIT ? OFFSET ?"
+        with closing(self._connect()) as connection:
+            rows = connection.execute(sql, [marktakteur, *filters.values(), -1 if limit is None else limit, start_ab]).fetchall()
+        return [json.loads(payload) for (payload,) in rows]
+
+
+mastr_mirror: Optional[MastrMirror] = MastrMirror(MASTR_MIRROR_PATH) if MASTR_MIRROR_PATH else None
+
+
+async def _sync_mirror(mirror: MastrMirror, marktakteur_mastr_nummer: str, full: bool) -> Dict[str, Any]:
+    state = None if full else await asyncio.to_thread(mirror.sync_state, marktakteur_mastr_nummer)
+    started = datetime.now(timezone.utc)
+    request = GetListeAlleNetzanschlusspunkteRequest(
+        marktakteurMastrNummer=marktakteur_mastr_nummer,
+        datumAb=state["datum_ab"] if state else None,
+    )
+    envelope: Dict[str, Any] = dict(state["envelope"]) if state else {}
+    # Deletions are not reported by incremental syncs, a full sync loads every row into staging and replaces
+    # the Marktakteur's rows only once all pages arrived. Until then the mirror keeps serving the previous sync.
+    sync_id = os.urandom(8).hex()
+    count = 0
+    try:
+        async for rows in iter_netzanschlusspunkte_pages(request, envelope=envelope):
+            if full:
+                await asyncio.to_thread(mirror.stage, sync_id, marktakteur_mastr_nummer, rows)
+            else:
+                await asyncio.to_thread(mirror.upsert, marktakteur_mastr_nummer, rows)
+            count += len(rows)
+        # The next incremental sync asks for everything changed since this one started
+        datum_ab = started.strftime("%Y-%m-%dT%H:%M:%S")
+        if full:
+            await asyncio.to_thread(mirror.replace_with_staged, sync_id, marktakteur_mastr_nummer,
+                                    started.timestamp(), datum_ab, envelope)
+        else:
+            await asyncio.to_thread(mirror.mark_synced, marktakteur_mastr_nummer, started.timestamp(), datum_ab, envelope)
+    finally:
+        if full:
+            # Rows of a failed or cancelled full sync
+            await asyncio.to_thread(mirror.discard_staged, sync_id)
+    return {"marktakteurMastrNummer": marktakteur_mastr_nummer, "full": full, "rows": count, "datumAb": datum_ab}
+
+
+async def sync_mastr_mirror(marktakteur_mastr_nummer: str, full: bool = False) -> Dict[str, Any]:
+    """Pulls the rows changed since the last sync (all rows on the first or a full sync) into the mirror."""
+    if mastr_mirror is None:
+        raise HTTPException(status_code=404, detail="The MaStR mirror is disabled (MASTR_MIRROR_PATH is empty)")
+    return await upstream_singleflight.do(
+        ("mirror-sync", marktakteur_mastr_nummer, full),
+        lambda: _sync_mirror(mastr_mirror, marktakteur_mastr_nummer, full),
+    )
+
+
+async def _mirror_sync_loop() -> None:
+    while True:
+        slot = int(time.time() // MASTR_MIRROR_SYNC_INTERVAL)
+        try:
+            # With a shared CACHE_BACKEND every worker runs this loop, one of them syncs per interval. The lock is not
+            # released, it expires with the interval. A sync that outlasts the interval may overlap with the next
+            # one; full syncs are swapped in atomically and incremental upserts are idempotent, so both stay consistent.
+            if await cache_backend.acquire_lock(f"{CACHE_KEY_PREFIX}:mirror-sync:{slot}", MASTR_MIRROR_SYNC_INTERVAL) is not None:
+                for marktakteur_mastr_nummer in MASTR_MIRROR_MARKTAKTEURE:
+                    try:
+                        await sync_mastr_mirror(marktakteur_mastr_nummer)
+                    except Exception as e:
+                        logger.warning("MaStR mirror sync for %s failed: %s", marktakteur_mastr_nummer, e)
+        except Exception:
+            logger.exception("MaStR mirror sync loop failed")
+        # All workers wake up at the start of the same interval
+        await asyncio.sleep(max((slot + 1) * MASTR_MIRROR_SYNC_INTERVAL - time.time(), 0))
+
+
+async def query_mastr_mirror(request: "GetListeAlleNetzanschlusspunkteRequest",
+                             max_age: float) -> Optional[Dict[str, Any]]:
+    """
+    Answers a GetListeAlleNetzanschlusspunkte request from the mirror, or returns None if the request
+    uses filters the mirror does not index or the Marktakteur was not synced within max_age seconds.
+    """
+    if mastr_mirror is None:
+        return None
+    used = request.model_dump(exclude_none=True)
+    if not set(used) <= _MIRROR_PAGING_FIELDS | set(MIRROR_FILTER_COLUMNS):
+        return None
+    state = await asyncio.to_thread(mastr_mirror.sync_state, request.marktakteur_mastr_nummer)
+    if state is None or time.time() - state["synced_at"] > max_age:
+        record_cache_event("mastr_mirror", CACHE_MISS)
+        return None
+    record_cache_event("mastr_mirror", CACHE_HIT)
+
+    filters = {column: used[name] for name, (_, column) in MIRROR_FILTER_COLUMNS.items() if name in used}
+    rows = await asyncio.to_thread(mastr_mirror.query, request.marktakteur_mastr_nummer, filters,
+                                   request.start_ab or 0, request.limit_param)
+    return dict(state["envelope"], **{"ListeNetzanschlusspunkte[]": rows})
+
+
+# ==========================================
+#              SPATIAL INDEX
+# ==========================================
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 111.32
+
+# Fields of a GetEinheit* response that are kept in the spatial index
+SPATIAL_SUMMARY_FIELDS = (
+    "EinheitMastrNummer", "NameStromerzeugungseinheit", "Energietraeger", "EinheitBetriebsstatus",
+    "Bruttoleistung", "Nettonennleistung", "Postleitzahl", "Ort", "Laengengrad", "Breitengrad",
+)
+
+
+class GridIndex:
+    """
+    In-memory grid index over WGS84 points. Points are bucketed into square cells of cell_degrees,
+    so radius and bounding-box queries only scan the cells they overlap.
+    """
+
+    def __init__(self, cell_degrees: float):
+        self.cell_degrees = cell_degrees
+        # cell -> key -> (lat, lon, item)
+        self._cells: Dict[Tuple[int, int], Dict[str, Tuple[float, float, Dict[str, Any]]]] = {}
+        self._key_cells: Dict[str, Tuple[int, int]] = {}
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return (math.floor(lat / self.cell_degrees), math.floor(lon / self.cell_degrees))
+
+    def add(self, key: str, lat: float, lon: float, item: Dict[str, Any]) -> None:
+        self.remove(key)
+        cell = self._cell(lat, lon)
+        self._cells.setdefault(cell, {})[key] = (lat, lon, item)
+        self._key_cells[key] = cell
+
+    def remove(self, key: str) -> None:
+        cell = self._key_cells.pop(key, None)
+        if cell is not None:
+            entries = self._cells[cell]
+            entries.pop(key, None)
+            if not entries:
+                del self._cells[cell]
+
+    def bbox(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> List[Tuple[float, float, Dict[str, Any]]]:
+        (min_row, min_col), (max_row, max_col) = self._cell(min_lat, min_lon), self._cell(max_lat, max_lon)
+        if (max_row - min_row + 1) * (max_col - min_col + 1) > len(self._cells):
+            # Large boxes: walking the occupied cells is cheaper than enumerating the box
+            cells = [(cell, entries) for cell, entries in self._cells.items()
+                     if min_row <= cell[0] <= max_row and min_col <= cell[1] <= max_col]
+        else:
+            cells = [((row, col), self._cells[(row, col)]) for row in range(min_row, max_row + 1)
+                     for col in range(min_col, max_col + 1) if (row, col) in self._cells]
+        result = []
+        for (row, col), entries in cells:
+            if min_row < row < max_row and min_col < col < max_col:
+                # Inner cells lie completely inside the box
+                result.extend(entries.values())
+            else:
+                result.extend(entry for entry in entries.values()
+                              if min_lat <= entry[0] <= max_lat and min_lon <= entry[1] <= max_lon)
+        return result
+
+    def near(self, lat: float, lon: float, radius_km: float) -> List[Tuple[float, Dict[str, Any]]]:
+        """Returns (distance_km, item) for all points within radius_km, nearest first."""
+        lat_delta = radius_km / KM_PER_DEGREE
+        lon_delta = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(lat)), 1e-6))
+        candidates = self.bbox(lat - lat_delta, lon - lon_delta, lat + lat_delta, lon + lon_delta)
+        if not candidates:
+            return []
+        # Vectorized haversine over all candidates
+        lats = np.radians(np.fromiter((entry[0] for entry in candidates), dtype=np.float64, count=len(candidates)))
+        lons = np.radians(np.fromiter((entry[1] for entry in candidates), dtype=np.float64, count=len(candidates)))
+        lat0, lon0 = math.radians(lat), math.radians(lon)
+        a = np.sin((lats - lat0) / 2) ** 2 + math.cos(lat0) * np.cos(lats) * np.sin((lons - lon0) / 2) ** 2
+        distances = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+        inside = np.flatnonzero(distances <= radius_km)
+        inside = inside[np.argsort(distances[inside], kind="stable")]
+        return [(float(distances[i]), candidates[i][2]) for i in inside]
+
+    def __len__(self) -> int:
+        return len(self._key_cells)
+
+
+# One index per Marktakteur, so units are only found by the Marktakteur that fetched them
+einheit_spatial_index: Dict[str, GridIndex] = {}
+
+# With a shared CACHE_BACKEND every indexed unit is also published to this versioned map (latest entry per
+# Marktakteur and unit), and each worker applies the entries changed since its last sync before answering a
+# spatial query, so all workers find the same units
+SPATIAL_INDEX_KEY = f"{CACHE_KEY_PREFIX}:spatial_index"
+_spatial_index_cursor = 0.0
+_spatial_sync_lock = asyncio.Lock()
+
+
+def index_einheit(marktakteur_mastr_nummer: str, endpoint: str, data: Dict[str, Any]) -> None:
+    """Adds (or moves/removes) a fetched unit in the Marktakteur's spatial index."""
+    einheit_mastr_nummer = data.get("EinheitMastrNummer")
+    if not einheit_mastr_nummer:
+        return
+    index = einheit_spatial_index.setdefault(marktakteur_mastr_nummer, GridIndex(SPATIAL_CELL_DEGREES))
+    lat, lon = data.get("Breitengrad"), data.get("Laengengrad")
+    try:
+        lat, lon = float(lat), float(lon)
+    except (TypeError, ValueError):
+        index.remove(einheit_mastr_nummer)
+        return
+    item = {field: data.get(field) for field in SPATIAL_SUMMARY_FIELDS}
+    item["type"] = endpoint
+    index.add(einheit_mastr_nummer, lat, lon, item)
+
+
+async def share_indexed_einheit(marktakteur_mastr_nummer: str, endpoint: str, data: Dict[str, Any]) -> None:
+    if not cache_backend.shared or not data.get("EinheitMastrNummer"):
+        return
+    summary = {field: data.get(field) for field in SPATIAL_SUMMARY_FIELDS}
+    try:
+        await cache_backend.publish(SPATIAL_INDEX_KEY, f"{marktakteur_mastr_nummer}|{summary['EinheitMastrNummer']}",
+                                    dump_json([marktakteur_mastr_nummer, endpoint, summary]))
+    except CacheBackendError as e:
+        logger.warning("Could not share the spatial index entry of %s: %s", summary["EinheitMastrNummer"], e)
+
+
+async def sync_spatial_index() -> None:
+    """Applies the units other workers indexed or moved since the last sync."""
+    global _spatial_index_cursor
+    if not cache_backend.shared:
+        return
+    async with _spatial_sync_lock:
+        try:
+            entries, _spatial_index_cursor = await cache_backend.read_changes(SPATIAL_INDEX_KEY, _spatial_index_cursor)
+        except CacheBackendError as e:
+            logger.warning("Spatial index sync failed, answering from the local index: %s", e)
+            return
+        for entry in entries:
+            index_einheit(*load_json(entry))
+
+
+def _matches_energietraeger(item: Dict[str, Any], energietraeger: Optional[str]) -> bool:
+    return energietraeger is None or str(item.get("Energietraeger") or "").lower() == energietraeger.lower()
+
+
+# ==========================================
+#              COLUMNAR TIME SERIES
+# ==========================================
+
+_RESOLUTION_PATTERN = re.compile(r"^P(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?)?$")
+
+# zone -> (UTC epoch-ms timestamps, {column name: values})
+LoadColumns = Dict[str, Tuple[np.ndarray, Dict[str, np.ndarray]]]
+
+MS_PER_HOUR = 3_600_000
+MS_PER_DAY = 24 * MS_PER_HOUR
+
+# Peak load hours (local time, Monday to Friday), as used for EEX peak/off-peak products
+PEAK_HOURS = (8, 20)
+
+
+def resolution_to_ms(resolution: str) -> int:
+    """Converts a fixed ISO 8601 duration such as PT15M, PT60M or P1D to milliseconds."""
+    match = _RESOLUTION_PATTERN.match(resolution or "")
+    if not match or not any(match.groups()):
+        raise ValueError(f"Unsupported resolution '{resolution}'")
+    days, hours, minutes = (int(group or 0) for group in match.groups())
+    return ((days * 24 + hours) * 60 + minutes) * 60_000
+
+
+def document_to_columns(document: Dict[str, Any], align: bool = False) -> Tuple[LoadColumns, int]:
+    """
+    Flattens the TimeSeries of a GL_MarketDocument into (timestamp, quantity) arrays per bidding zone
+    and returns them with the finest resolution (ms) found in the document.
+    Timestamps are UTC epoch milliseconds computed as timeInterval.start + resolution * (position - 1);
+    they are sorted and duplicate timestamps are kept once.
+    With align=True, coarser series are expanded (step-hold) to the finest resolution, so series with
+    mixed resolutions (e.g. PT15M and PT60M) end up on one regular grid.
+    """
+    raw = []
+    for series in document["GL_MarketDocument"]["TimeSeries"]:
+        zone = extract_text(series.get("outBiddingZone_Domain.mRID")) or ""
+        period = series["Period"]
+        points = period["Point"]
+        start_ms = int(parse_entsoe_timestamp(period["timeInterval"]["start"]).timestamp() * 1000)
+        step_ms = resolution_to_ms(period["resolution"])
+        positions = np.fromiter((int(point["position"]) for point in points), dtype=np.int64, count=len(points))
+        quantities = np.fromiter((float(point["quantity"]) for point in points), dtype=np.float64, count=len(points))
+        raw.append((zone, step_ms, start_ms + (positions - 1) * step_ms, quantities))
+
+    finest_ms = min((step_ms for _, step_ms, _, _ in raw), default=MS_PER_HOUR)
+    parts: Dict[str, List[Tuple[np.ndarray, np.ndarray]]] = {}
+    for zone, step_ms, timestamps, quantities in raw:
+        if align and step_ms != finest_ms:
+            if step_ms % finest_ms:
+                raise ValueError(f"Cannot align resolution of {step_ms} ms to {finest_ms} ms")
+            factor = step_ms // finest_ms
+            timestamps = (np.repeat(timestamps, factor) + np.tile(np.arange(factor, dtype=np.int64) * finest_ms, len(timestamps)))
+            quantities = np.repeat(quantities, factor)
+        parts.setdefault(zone, []).append((timestamps, quantities))
+
+    columns: LoadColumns = {}
+    for zone, arrays in parts.items():
+        timestamps = np.concatenate([timestamps for timestamps, _ in arrays])
+        quantities = np.concatenate([quantities for _, quantities in arrays])
+        timestamps, first_index = np.unique(timestamps, return_index=True)
+        columns[zone] = (timestamps, {"quantity": quantities[first_index]})
+    return columns, finest_ms
+
+
+def _utc_offsets_ms(timestamps: np.ndarray, tz: ZoneInfo) -> np.ndarray:
+    """UTC offset (ms) of the given time zone for each timestamp, looked up once per distinct hour."""
+    hours, inverse = np.unique(timestamps // MS_PER_HOUR, return_inverse=True)
+    offsets = np.array(
+        [int(datetime.fromtimestamp(int(hour) * 3600, timezone.utc).astimezone(tz).utcoffset().total_seconds() * 1000)
+         for hour in hours],
+        dtype=np.int64,
+    )
+    return offsets[inverse]
+
+
+_PERCENTILE_PATTERN = re.compile(r"^p(\d{1,2}(?:\.\d+)?|100)$")
+AGGREGATIONS = ("mean", "min", "max", "sum")
+
+
+def parse_aggregations(agg: str) -> List[str]:
+    """Parses a comma separated list of mean, min, max, sum and percentiles (p0-p100, e.g. p95)."""
+    names = [name.strip().lower() for name in agg.split(",") if name.strip()]
+    invalid = [name for name in names if name not in AGGREGATIONS and not _PERCENTILE_PATTERN.match(name)]
+    if not names or invalid:
+        raise ValueError(f"Invalid agg '{agg}', use mean, min, max, sum or percentiles like p95")
+    return names
+
+
+def resample_columns(columns: LoadColumns, base_step_ms: int, resample: str, aggregations: List[str],
+                     tz_name: str = "UTC") -> LoadColumns:
+    """
+    Aggregates aligned columns into buckets, computed with NumPy per zone.
+    resample is a fixed duration (PT60M, P1D, ...) that is a multiple of the series resolution, or 'peak'
+    for one peak and one off-peak bucket per day (see PEAK_HOURS). Whole-day buckets and peak hours follow
+    tz_name; shorter buckets are aligned to UTC, so the repeated local hour of a DST change stays two buckets.
+    Bucket labels are the UTC start of each bucket; 'peak' adds a boolean peak column.
+    """
+    try:
+        tz = ZoneInfo(tz_name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"Unknown time zone '{tz_name}'")
+
+    peak = resample.lower() == "peak"
+    if not peak:
+        bucket_ms = resolution_to_ms(resample)
+        if bucket_ms < base_step_ms or bucket_ms % base_step_ms:
+            raise ValueError(f"resample={resample} must be a multiple of the series resolution ({base_step_ms // 60_000} min)")
+    local_days = peak or bucket_ms % MS_PER_DAY == 0
+
+    result: LoadColumns = {}
+    for zone, (timestamps, values) in columns.items():
+        quantities = values["quantity"]
+        if not len(timestamps):
+            result[zone] = (timestamps, {name: quantities for name in aggregations})
+            continue
+        offsets = _utc_offsets_ms(timestamps, tz) if local_days else np.zeros_like(timestamps)
+        local = timestamps + offsets
+        if peak:
+            days = local // MS_PER_DAY
+            hours = (local % MS_PER_DAY) // MS_PER_HOUR
+            weekdays = (days + 3) % 7  # 1970-01-01 was a Thursday, Monday = 0
+            is_peak = (weekdays < 5) & (hours >= PEAK_HOURS[0]) & (hours < PEAK_HOURS[1])
+            keys = days * 2 + is_peak
+        else:
+            keys = local // bucket_ms
+
+        order = np.argsort(keys, kind="stable")
+        keys, quantities, offsets = keys[order], quantities[order], offsets[order]
+        boundaries = np.flatnonzero(np.diff(keys)) + 1
+        starts = np.concatenate(([0], boundaries))
+        counts = np.diff(np.concatenate((starts, [len(keys)])))
+        group_keys = keys[starts]
+
+        if peak:
+            labels = (group_keys // 2) * MS_PER_DAY - offsets[starts]
+        else:
+            labels = group_keys * bucket_ms - offsets[starts]
+
+        aggregated: Dict[str, np.ndarray] = {}
+        for name in aggregations:
+            if name == "mean":
+                aggregated[name] = np.add.reduceat(quantities, starts) / counts
+            elif name == "sum":
+                aggregated[name] = np.add.reduceat(quantities, starts)
+            elif name == "min":
+                aggregated[name] = np.minimum.reduceat(quantities, starts)
+            elif name == "max":
+                aggregated[name] = np.maximum.reduceat(quantities, starts)
+            else:
+                q = float(name[1:])
+                aggregated[name] = np.array([np.percentile(group, q) for group in np.split(quantities, boundaries)])
+        if peak:
+            aggregated = dict(peak=(group_keys % 2).astype(bool), **aggregated)
+        result[zone] = (labels, aggregated)
+    return result
+
+
+def _arrow_column(values: np.ndarray) -> "pa.Array":
+    return pa.array(values, pa.bool_() if values.dtype == bool else pa.float64())
+
+
+def columns_to_arrow(columns: LoadColumns) -> "pa.Table":
+    if pa is None:
+        raise HTTPException(status_code=501, detail="Arrow/Parquet output requires the optional pyarrow package")
+    zones = list(columns)
+    lengths = [len(columns[zone][0]) for zone in zones]
+    names = list(columns[zones[0]][1]) if zones else ["quantity"]
+    data = {
+        "zone": pa.DictionaryArray.from_arrays(
+            pa.array(np.repeat(np.arange(len(zones), dtype=np.int32), lengths)), pa.array(zones, pa.string())),
+        "timestamp": pa.array(
+            np.concatenate([columns[zone][0] for zone in zones]) if zones else np.array([], dtype=np.int64),
+            pa.timestamp("ms", tz="UTC")),
+    }
+    for name in names:
+        data[name] = _arrow_column(
+            np.concatenate([columns[zone][1][name] for zone in zones]) if zones else np.array([], dtype=np.float64))
+    return pa.table(data)
+
+
+def _json_values(values: np.ndarray) -> List[Any]:
+    if values.dtype.kind == "f":
+        return np.where(np.isnan(values), None, values).tolist()
+    return values.tolist()
+
+
+def render_columns(columns: LoadColumns, output_format: str, extra: Optional[Dict[str, Any]] = None) -> Response:
+    """
+    Renders per-zone columns as columnar JSON, Arrow IPC stream or Parquet.
+    Columnar JSON: {"timestamp_unit": "ms", "zones": {zone: {"timestamp": [...], <column>: [...]}}}
+    """
+    if output_format in ("json", "columnar"):
+        content = dict(extra or {})
+        content["timestamp_unit"] = "ms"
+        content["zones"] = {
+            zone: dict(timestamp=timestamps.tolist(), **{name: _json_values(v) for name, v in values.items()})
+            for zone, (timestamps, values) in columns.items()
+        }
+        return FastJSONResponse(content)
+
+    table = columns_to_arrow(columns)
+    sink = io.BytesIO()
+    if output_format == "arrow":
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return Response(sink.getvalue(), media_type="application/vnd.apache.arrow.stream")
+    pq.write_table(table, sink)
+    return Response(sink.getvalue(), media_type="application/vnd.apache.parquet")
+
+
+# ==========================================
+#              API LOGIC & ENDPOINTS
+# ==========================================
+
+async def call_external_api_mastr(endpoint: str, request_data: BaseModel) -> Dict[str, Any]:
+    """
+    Calls the MaStR external API and returns the raw JSON.
+    Identical concurrent calls share one upstream request.
+    """
+    url = f"{API_URL_MASTR}/{endpoint}"
+    
+    # Convert request model to PascalCase JSON
+    payload = request_data.model_dump(by_alias=True, exclude_none=True)
+
+    # Handle '[]' suffix for specific list keys in the request
+    for key in ["einheitMastrNummer", "NetzanschlusspunktMastrNummer", "LokationMastrNummer"]:
+        if key in payload and isinstance(payload[key], list):
+            payload[f"{key}[]"] = payload.pop(key)
+
+    # The coalescing key is built before the apiKey is added
+    flight_key = ("mastr", endpoint, json.dumps(payload, sort_keys=True, default=str))
+    payload['apiKey'] = API_KEY_MASTR
+    # All MaStR Get* calls are read-only and may be retried
+    idempotent = endpoint.startswith("Get")
+    return await upstream_singleflight.do(
+        flight_key, lambda: call_upstream("mastr", lambda: _post_mastr(endpoint, url, payload), idempotent))
+
+
+async def _post_mastr(endpoint: str, url: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    headers = {"Content-Type": "application/json"}
+    timer = UpstreamTimer(endpoint)
+    try:
+        response = await get_http_client("mastr").post(url, json=payload, headers=headers,
+                                                        extensions={"trace": timer.trace})
+        timer.headers_received()
+        timer.body_received(len(response.content))
+        response.raise_for_status()
+        with timer.stage("parse"):
+            try:
+                return response.json()
+            except ValueError as e:
+                timer.error("invalid_json")
+                raise HTTPException(status_code=502, detail=f"External API returned invalid JSON ({endpoint}): {e}")
+    except httpx.HTTPStatusError as e:
+        timer.error(response.status_code)
+        safe_payload = {k: v for k, v in payload.items() if k != 'apiKey'}
+        error_detail = f"External API Error ({response.status_code}): {response.text} | Sent Payload: {safe_payload}"
+        raise HTTPException(status_code=response.status_code, detail=error_detail, headers=retry_after_headers(response))
+    except httpx.RequestError as e:
+        timer.error("connection")
+        raise HTTPException(status_code=503, detail=f"Could not connect to external API: {e}")
+
+
+def _parse_entsoe_xml(xml_content: str, timer: Optional[UpstreamTimer] = None) -> Dict[str, Any]:
+    """Parses the ENTSOE XML, validates it via the Pydantic models and returns the normalized dict."""
+    timer = timer or UpstreamTimer("ENTSOE")
+    # Parse XML to a python dict
+    with timer.stage("parse"):
+        parsed = xmltodict.parse(xml_content)
+
+    # Normalization step: many XML fields come with attribute dicts or single-items.
+    # We'll perform lightweight normalization:
+    # - Convert any {'@...':..., '#text': 'value'} -> 'value'
+    # - Ensure lists (TimeSeries, Point) are lists (handled in validators)
+    # Note: deeper custom normalization could be added if needed.
+
+    # Validate/normalize via Pydantic (this will run our validators to ensure lists, allow extra fields)
+    with timer.stage("validate"):
+        validated = DayAheadTotalLoadForecastResponse.model_validate(parsed)
+
+        # Return normalized dict (Pydantic will have coerced lists etc.)
+        return validated.model_dump()
+
+
+async def call_external_api_entsoe(document_type: str, process_type: str, out_bidding_zone_domain: str, 
+                             period_start: str, period_end: str) -> Dict[str, Any]:
+    """
+    Calls the ENTSOE Transparency Platform API, parses XML -> dict, normalizes and validates
+    via Pydantic models, then returns a clean JSON-serializable dict.
+    Identical concurrent calls share one upstream request and its parsed result.
+    """
+    params = {
+        "documentType": document_type,
+        "processType": process_type,
+        "out_Domain": out_bidding_zone_domain,   # note: keep param name matching ENTSOE if needed
+        "periodStart": period_start,
+        "periodEnd": period_end,
+    }
+    flight_key = ("entsoe",) + tuple(sorted(params.items()))
+    params["securityToken"] = API_KEY_ENTSOE
+    return await upstream_singleflight.do(
+        flight_key, lambda: call_upstream("entsoe", lambda: _get_entsoe(params), idempotent=True))
+
+
+async def _get_entsoe(params: Dict[str, str]) -> Dict[str, Any]:
+    timer = UpstreamTimer("ENTSOE")
+    try:
+        async with get_http_client("entsoe").stream("GET", API_URL_ENTSOE, params=params,
+                                                     extensions={"trace": timer.trace}) as response:
+            timer.headers_received()
+            if not response.is_success:
+                await response.aread()
+                timer.error(response.status_code)
+                error_detail = f"ENTSOE API Error ({response.status_code}): {response.text}"
+                raise HTTPException(status_code=response.status_code, detail=error_detail,
+                                    headers=retry_after_headers(response))
+
+            if not ENTSOE_STREAMING_PARSER:
+                await response.aread()
+                timer.body_received(len(response.content))
+                # Parsing large documents is CPU-bound, keep it off the event loop
+                return await asyncio.to_thread(_parse_entsoe_xml, response.text, timer)
+
+            # Parse the body while it arrives instead of buffering it. Batches of ENTSOE_PARSE_THREAD_BYTES
+            # are fed in a worker thread while the next batch downloads; only small documents are parsed on the loop.
+            parser = EntsoeDocumentParser()
+            size = 0
+            parse_seconds = 0.0
+            waited = 0.0
+            pending: List[bytes] = []
+            pending_size = 0
+            feeding: Optional[asyncio.Future] = None
+
+            def feed(chunks: List[bytes]) -> float:
+                started = time.perf_counter()
+                for chunk in chunks:
+                    # expat holds the GIL for a whole feed() call, small slices let the loop thread run in between
+                    for offset in range(0, len(chunk), ENTSOE_PARSE_SLICE_BYTES):
+                        parser.feed(chunk[offset:offset + ENTSOE_PARSE_SLICE_BYTES])
+                return time.perf_counter() - started
+
+            try:
+                async for chunk in response.aiter_bytes():
+                    size += len(chunk)
+                    pending.append(chunk)
+                    pending_size += len(chunk)
+                    if pending_size >= ENTSOE_PARSE_THREAD_BYTES:
+                        if feeding is not None:
+                            started = time.perf_counter()
+                            parse_seconds += await feeding
+                            waited += time.perf_counter() - started
+                        feeding = asyncio.ensure_future(asyncio.to_thread(feed, pending))
+                        pending, pending_size = [], 0
+                timer.body_received(size, exclude=waited)
+                if feeding is not None:
+                    parse_seconds += await feeding
+                    feeding = None
+            finally:
+                if feeding is not None:
+                    feeding.cancel()
+
+            if size < ENTSOE_PARSE_THREAD_BYTES:
+                parse_seconds += feed(pending)
+                observe_stage("ENTSOE", "parse", parse_seconds)
+                with timer.stage("validate"):
+                    return parser.close()
+            parse_seconds += await asyncio.to_thread(feed, pending)
+            observe_stage("ENTSOE", "parse", parse_seconds)
+            with timer.stage("validate"):
+                return await asyncio.to_thread(parser.close)
+    except HTTPException:
+        raise
+    except httpx.RequestError as e:
+        timer.error("connection")
+        raise HTTPException(status_code=503, detail=f"Could not connect to ENTSOE API: {e}")
+    except Exception as e:
+        timer.error("invalid_response")
+        # If parsing or validation fails, include the error for debugging
+        raise HTTPException(status_code=500, detail=f"Error parsing/validating ENTSOE response: {e}")
+
+
+# Upstream endpoint and response model per Einheit type, used by the batch endpoint
+EINHEIT_ENDPOINTS: Dict[str, Tuple[str, type]] = {
+    "wind": ("GetEinheitWind", GetEinheitWindResponse),
+    "solar": ("GetEinheitSolar", GetEinheitSolarResponse),
+    "biomasse": ("GetEinheitBiomasse", GetEinheitBiomasseResponse),
+    "strom_speicher": ("GetEinheitStromSpeicher", GetEinheitStromSpeicherResponse),
+}
+EINHEIT_RESPONSE_MODELS = dict(EINHEIT_ENDPOINTS.values())
+
+
+def einheit_etag(endpoint: str, data: Dict[str, Any]) -> str:
+    """A unit only changes together with its DatumLetzteAktualisierung; without one the payload is hashed."""
+    version = data.get("DatumLetzteAktualisierung")
+    if version is None:
+        return make_etag(endpoint, data)
+    return make_etag(endpoint, validation_mode(endpoint), data.get("EinheitMastrNummer"), version)
+
+
+def netzanschlusspunkte_etag(request: GetListeAlleNetzanschlusspunkteRequest, data: Dict[str, Any]) -> str:
+    """Hashes the query, the envelope and (NetzanschlusspunktMastrNummer, DatumLetzteAktualisierung) of every row."""
+    rows = data.get("ListeNetzanschlusspunkte[]") or []
+    versions = [
+        (row.get("NetzanschlusspunktMastrNummer"), row["DatumLetzteAktualisierung"])
+        if "DatumLetzteAktualisierung" in row else row
+        for row in rows
+    ]
+    envelope = {k: v for k, v in data.items() if k != "ListeNetzanschlusspunkte[]"}
+    return make_etag("GetListeAlleNetzanschlusspunkte", validation_mode("GetListeAlleNetzanschlusspunkte"),
+                     request.model_dump(by_alias=True, exclude_none=True), envelope, versions)
+
+
+def entsoe_version(document: Dict[str, Any]) -> List[Any]:
+    market_document = document["GL_MarketDocument"]
+    return [market_document.get(field) for field in ENTSOE_VERSION_FIELDS]
+
+
+def entsoe_etag(variant: Dict[str, Any], *versions: Any) -> str:
+    """
+    Hashes the requested representation and the version header fields of the document(s), not the document
+    itself. Documents merged from several windows, days or stored intervals carry an mRID derived from all
+    their sources (see combined_entsoe_mrid), so a change in any source changes the ETag.
+    """
+    return make_etag(variant, *versions)
+
+
+async def _fetch_batch_item(index: int, marktakteur_mastr_nummer: str, item: EinheitBatchItem,
+                            semaphore: asyncio.Semaphore) -> Dict[str, Any]:
+    """Fetches one batch item; errors are reported in the item instead of raised."""
+    endpoint, _ = EINHEIT_ENDPOINTS[item.einheit_typ]
+    result: Dict[str, Any] = {
+        "index": index,
+        "einheitMastrNummer": item.einheit_mastr_nummer,
+        "type": item.einheit_typ,
+    }
+    request = EinheitRequest(marktakteurMastrNummer=marktakteur_mastr_nummer, einheitMastrNummer=item.einheit_mastr_nummer)
+    async with semaphore:
+        try:
+            data, cache_status = await get_einheit(endpoint, request)
+        except HTTPException as e:
+            result.update(status=e.status_code, error=e.detail)
+            return result
+    result.update(status=200, cache=cache_status, data=data)
+    return result
+
+
+async def stream_einheiten_batch(request: EinheitBatchRequest) -> AsyncIterator[bytes]:
+    """Fans out to the GetEinheit* calls and yields one NDJSON line per item in completion order."""
+    concurrency = min(request.concurrency or BATCH_CONCURRENCY, BATCH_CONCURRENCY)
+    semaphore = asyncio.Semaphore(concurrency)
+    tasks = [
+        asyncio.create_task(_fetch_batch_item(index, request.marktakteur_mastr_nummer, item, semaphore))
+        for index, item in enumerate(request.einheiten)
+    ]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield dump_json(await next_done) + b"\n"
+    finally:
+        # Client went away or the stream was closed early
+        for task in tasks:
+            task.cancel()
+
+
+async def iter_netzanschlusspunkte_pages(request: GetListeAlleNetzanschlusspunkteRequest,
+                                         max_rows: Optional[int] = None,
+                                         envelope: Optional[Dict[str, Any]] = None) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Walks GetListeAlleNetzanschlusspunkte page by page, starting at request.startAb.
+    The next page is requested while the caller is still consuming the current one.
+    If given, envelope is updated with the non-list fields of the responses (Ergebniscode, AufrufVersion, ...).
+    """
+    page_size = request.limit_param or NETZANSCHLUSSPUNKTE_PAGE_SIZE
+    start_ab = request.start_ab or 0
+    remaining = max_rows
+
+    async def fetch_page(page_start: int, page_limit: int) -> List[Dict[str, Any]]:
+        page_request = request.model_copy(update={"start_ab": page_start, "limit_param": page_limit})
+        data = await call_external_api_mastr("GetListeAlleNetzanschlusspunkte", page_request)
+        if envelope is not None:
+            envelope.update((k, v) for k, v in data.items() if k != "ListeNetzanschlusspunkte[]")
+        return data.get("ListeNetzanschlusspunkte[]") or []
+
+    def next_limit() -> int:
+        return page_size if remaining is None else min(page_size, remaining)
+
+    next_page: Optional[asyncio.Task] = asyncio.create_task(fetch_page(start_ab, next_limit()))
+    try:
+        while next_page is not None:
+            page_limit = next_limit()
+            rows = await next_page
+            next_page = None
+            start_ab += len(rows)
+            if remaining is not None:
+                rows = rows[:remaining]
+                remaining -= len(rows)
+            # A short page is the last one
+            if len(rows) >= page_limit and (remaining is None or remaining > 0):
+                next_page = asyncio.create_task(fetch_page(start_ab, next_limit()))
+            if rows:
+                yield rows
+    finally:
+        if next_page is not None:
+            next_page.cancel()
+
+
+# CSV export columns: the Netzanschlusspunkt fields (the same names MaStR accepts as filters). Fields outside
+# this list are not dropped, they go to NETZANSCHLUSSPUNKT_CSV_EXTRA_COLUMN as a JSON object.
+NETZANSCHLUSSPUNKT_CSV_COLUMNS = (
+    "NetzanschlusspunktMastrNummer", "EinheitMastrNummer", "LokationMastrNummer", "NetzanschlusspunktBezeichnung",
+    "NameDerTechnischenLokation", "Messlokation", "Einheitart", "Einheittyp", "EinheitPostleitzahl", "EinheitOrt",
+    "EinheitGemeinde", "EinheitGemeindeschluessel", "Regelzone", "NetzbetreiberMastrNummer", "Spannungsebene",
+    "Nettoengpassleistung", "Netzanschlusskapazitaet", "MaximaleEinspeiseleistung", "MaximaleAusspeiseleistung",
+    "Gasqualitaet", "GeplanterNetzanschlusspunkt", "Yeic", "DatumLetzteAktualisierung",
+)
+NETZANSCHLUSSPUNKT_CSV_EXTRA_COLUMN = "WeitereFelder"
+
+
+def _netzanschlusspunkt_csv_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    values = {k: json.dumps(v) if isinstance(v, (list, dict)) else v for k, v in row.items()
+              if k in NETZANSCHLUSSPUNKT_CSV_COLUMNS}
+    extra = {k: v for k, v in row.items() if k not in NETZANSCHLUSSPUNKT_CSV_COLUMNS}
+    if extra:
+        values[NETZANSCHLUSSPUNKT_CSV_EXTRA_COLUMN] = json.dumps(extra, default=str)
+    return values
+
+
+async def stream_netzanschlusspunkte_export(request: GetListeAlleNetzanschlusspunkteRequest, export_format: str,
+                                           max_rows: Optional[int]) -> AsyncIterator[bytes]:
+    """Serializes the paged rows as NDJSON or CSV (fixed columns, see NETZANSCHLUSSPUNKT_CSV_COLUMNS), one page at a time."""
+    fieldnames = list(NETZANSCHLUSSPUNKT_CSV_COLUMNS) + [NETZANSCHLUSSPUNKT_CSV_EXTRA_COLUMN]
+    write_header = True
+    async for rows in iter_netzanschlusspunkte_pages(request, max_rows):
+        if export_format == "ndjson":
+            yield b"".join(dump_json(row) + b"\n" for row in rows)
+            continue
+
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=fieldnames)
+        if write_header:
+            writer.writeheader()
+            write_header = False
+        writer.writerows(_netzanschlusspunkt_csv_row(row) for row in rows)
+        yield buffer.getvalue().encode("utf-8")
+    if export_format == "csv" and write_header:
+        # No rows at all: still a valid CSV file
+        yield (",".join(fieldnames) + "\r\n").encode("utf-8")
+
+
+ENTSOE_PERIOD_FORMAT = "%Y%m%d%H%M"
+ENTSOE_TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%MZ"
+
+
+def parse_entsoe_period(value: str) -> datetime:
+    """Parses a YYYYMMDDHHmm period bound (UTC)."""
+    try:
+        return datetime.strptime(value, ENTSOE_PERIOD_FORMAT).replace(tzinfo=timezone.utc)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid period '{value}', expected format YYYYMMDDHHmm")
+
+
+def parse_entsoe_period_range(period_start: str, period_end: str) -> Tuple[datetime, datetime]:
+    """Parses both period bounds and checks their order (400 otherwise)."""
+    start = parse_entsoe_period(period_start)
+    end = parse_entsoe_period(period_end)
+    if end <= start:
+        raise HTTPException(status_code=400, detail="period_end must be after period_start")
+    return start, end
+
+
+def format_entsoe_period(value: datetime) -> str:
+    return value.astimezone(timezone.utc).strftime(ENTSOE_PERIOD_FORMAT)
+
+
+def parse_entsoe_timestamp(value: str) -> datetime:
+    """Parses an ENTSOE document timestamp such as '2023-08-13T22:00Z'."""
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).astimezone(timezone.utc)
+
+
+def split_entsoe_period(start: datetime, end: datetime, chunk: timedelta) -> List[Tuple[datetime, datetime]]:
+    """Splits [start, end) into consecutive windows of at most one chunk."""
+    windows = []
+    while start < end:
+        window_end = min(start + chunk, end)
+        windows.append((start, window_end))
+        start = window_end
+    return windows
+
+
+def _timeseries_sort_key(series: Dict[str, Any]) -> Tuple[str, str, str]:
+    period = series.get("Period") or {}
+    interval = period.get("timeInterval") or {}
+    return (interval.get("start") or "", interval.get("end") or "", period.get("resolution") or "")
+
+
+# Header fields that identify one ENTSOE document version: mRID and createdDateTime are new for every generated
+# document, revisionNumber is bumped when a forecast is revised
+ENTSOE_VERSION_FIELDS = ("mRID", "revisionNumber", "createdDateTime")
+
+
+def combined_entsoe_mrid(headers: List[Dict[str, Any]]) -> str:
+    """mRID of a document built from several documents; it changes whenever one of their versions does."""
+    versions = [[header.get(field) for field in ENTSOE_VERSION_FIELDS] for header in headers]
+    return hashlib.blake2b(dump_json(versions), digest_size=16).hexdigest()
+
+
+def merge_entsoe_documents(documents: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Merges the GL_MarketDocuments of consecutive windows into one document.
+    TimeSeries are ordered chronologically; series returned by two windows (e.g. a day that
+    straddles a window boundary) are kept once. The header is taken from the first document, except for
+    mRID, which is derived from the headers of all documents (see combined_entsoe_mrid).
+    """
+    if len(documents) == 1:
+        return documents[0]
+
+    merged_series: Dict[Tuple[Any, ...], Dict[str, Any]] = {}
+    for document in documents:
+        for series in document["GL_MarketDocument"]["TimeSeries"]:
+            key = (
+                extract_text(series.get("outBiddingZone_Domain.mRID")),
+                series.get("businessType"),
+            ) + _timeseries_sort_key(series)
+            merged_series.setdefault(key, series)
+
+    ordered = sorted(merged_series.values(), key=_timeseries_sort_key)
+    # mRIDs are only unique within one upstream document, renumber them for the merged one
+    timeseries = [dict(series, mRID=str(index)) for index, series in enumerate(ordered, start=1)]
+
+    first = documents[0]["GL_MarketDocument"]
+    merged = dict(first, mRID=combined_entsoe_mrid([document["GL_MarketDocument"] for document in documents]),
+                  TimeSeries=timeseries)
+    if isinstance(first.get("time_Period.timeInterval"), dict):
+        merged["time_Period.timeInterval"] = {
+            "start": first["time_Period.timeInterval"].get("start"),
+            "end": (documents[-1]["GL_MarketDocument"].get("time_Period.timeInterval") or {}).get("end"),
+        }
+    return dict(documents[0], GL_MarketDocument=merged)
+
+
+def entsoe_request_budget() -> asyncio.Semaphore:
+    """Bounds the upstream calls of one request; shared by all its gaps, windows and zones."""
+    return asyncio.Semaphore(ENTSOE_CHUNK_CONCURRENCY)
+
+
+async def _fetch_entsoe_period(document_type: str, process_type: str, out_bidding_zone_domain: str,
+                              start: datetime, end: datetime,
+                              semaphore: Optional[asyncio.Semaphore] = None) -> Dict[str, Any]:
+    """
+    Fetches [start, end) from ENTSOE. Periods longer than ENTSOE_CHUNK_DAYS are split into windows
+    that are fetched in parallel, at most as many at once as the semaphore allows (a new
+    entsoe_request_budget() if none is passed), and merged again.
+    """
+    semaphore = semaphore or entsoe_request_budget()
+
+    async def fetch_window(window_start: datetime, window_end: datetime) -> Dict[str, Any]:
+        async with semaphore:
+            return await call_external_api_entsoe(document_type, process_type, out_bidding_zone_domain,
+                                                  format_entsoe_period(window_start), format_entsoe_period(window_end))
+
+    windows = split_entsoe_period(start, end, timedelta(days=ENTSOE_CHUNK_DAYS))
+    documents = await asyncio.gather(*(fetch_window(*window) for window in windows))
+    return merge_entsoe_documents(list(documents))
+
+
+async def _fill_entsoe_store(store: EntsoeStore, document_type: str, process_type: str, out_bidding_zone_domain: str,
+                             start: datetime, end: datetime, semaphore: asyncio.Semaphore) -> None:
+    """Fetches the sub-intervals of [start, end) that are missing in the store and saves them."""
+    key = (document_type, process_type, out_bidding_zone_domain)
+    gaps = await asyncio.to_thread(store.missing_intervals, *key, start, end)
+    record_cache_event("entsoe_store", CACHE_MISS if gaps else CACHE_HIT)
+
+    async def fill_gap(gap_start: datetime, gap_end: datetime) -> None:
+        document = await _fetch_entsoe_period(*key, gap_start, gap_end, semaphore)
+        await asyncio.to_thread(store.save, *key, gap_start, gap_end, document)
+
+    await asyncio.gather(*(fill_gap(*gap) for gap in gaps))
+
+
+async def fetch_day_ahead_total_load_forecast(document_type: str, process_type: str, out_bidding_zone_domain: str,
+                                              period_start: str, period_end: str,
+                                              semaphore: Optional[asyncio.Semaphore] = None) -> Dict[str, Any]:
+    """
+    Fetches a (possibly long) period. With the persistent store enabled, the part of the period before
+    today (UTC) is served from disk and only its missing sub-intervals are fetched from ENTSOE;
+    the rest goes through the live cache (see fetch_live_entsoe). All upstream calls share the semaphore
+    (default: a new entsoe_request_budget()).
+    """
+    start, end = parse_entsoe_period_range(period_start, period_end)
+    semaphore = semaphore or entsoe_request_budget()
+
+    key = (document_type, process_type, out_bidding_zone_domain)
+    published_until = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    documents = []
+    if start < published_until:
+        stored_end = min(end, published_until)
+        if entsoe_store is None:
+            documents.append(await _fetch_entsoe_period(*key, start, stored_end, semaphore))
+        else:
+            await _fill_entsoe_store(entsoe_store, *key, start, stored_end, semaphore)
+            documents.append(await asyncio.to_thread(entsoe_store.load, *key, start, stored_end))
+    if end > published_until:
+        documents.append(await fetch_live_entsoe(*key, max(start, published_until), end, semaphore=semaphore))
+    return merge_entsoe_documents(documents)
+
+
+def select_timeseries(document: Dict[str, Any], start: datetime, end: datetime) -> Dict[str, Any]:
+    """Copy of the document with only the TimeSeries that overlap [start, end)."""
+    market_document = document["GL_MarketDocument"]
+    selected = []
+    for series in market_document["TimeSeries"]:
+        interval = series["Period"]["timeInterval"]
+        if parse_entsoe_timestamp(interval["start"]) < end and parse_entsoe_timestamp(interval["end"]) > start:
+            selected.append(series)
+    return dict(document, GL_MarketDocument=dict(market_document, TimeSeries=selected))
+
+
+async def fetch_live_entsoe(document_type: str, process_type: str, out_bidding_zone_domain: str,
+                            start: datetime, end: datetime, refresh: bool = False,
+                            ttl: Optional[float] = None, semaphore: Optional[asyncio.Semaphore] = None) -> Dict[str, Any]:
+    """
+    Fetches a period that is not in the store (today and later) through entsoe_live_cache, which holds one
+    entry per UTC day. If every day of the period is fresh in the cache, no upstream call is made. Otherwise
+    (or with refresh=True) the period, widened to whole UTC days, is fetched and each day that has data is cached
+    for ttl seconds (default ENTSOE_LIVE_CACHE_TTL). Like the store, the result holds whole TimeSeries that
+    overlap [start, end).
+    """
+    key = (document_type, process_type, out_bidding_zone_domain)
+    days = []
+    day = start.replace(hour=0, minute=0, second=0, microsecond=0)
+    while day < end:
+        days.append(day)
+        day += timedelta(days=1)
+
+    if not refresh:
+        cached = [(await entsoe_live_cache.get(key + (day,)))[0] for day in days]
+        if all(document is not None for document in cached):
+            record_cache_event("entsoe_live", CACHE_HIT)
+            return select_timeseries(merge_entsoe_documents(cached), start, end)
+        record_cache_event("entsoe_live", CACHE_MISS)
+
+    try:
+        document = await _fetch_entsoe_period(*key, days[0], days[-1] + timedelta(days=1), semaphore)
+    except HTTPException as e:
+        fallback = [await entsoe_live_cache.get_any(key + (day,)) for day in days]
+        if refresh or e.status_code < 500 or any(document is None for document in fallback):
+            raise
+        record_cache_event("entsoe_live", CACHE_STALE_IF_ERROR)
+        return select_timeseries(merge_entsoe_documents(fallback), start, end)
+
+    day_documents = [select_timeseries(document, day, day + timedelta(days=1)) for day in days]
+    for day, day_document in zip(days, day_documents):
+        if day_document["GL_MarketDocument"]["TimeSeries"]:
+            await entsoe_live_cache.set(key + (day,), day_document, ENTSOE_LIVE_CACHE_TTL if ttl is None else ttl)
+    # Merged from the days like a cache hit, so the result (and its mRID, see entsoe_etag) is the same either way
+    return select_timeseries(merge_entsoe_documents(day_documents), start, end)
+
+
+# Named groups of bidding zones (EIC codes) for the multi-zone endpoint
+BIDDING_ZONE_GROUPS: Dict[str, List[str]] = {
+    "CWE": ["10YAT-APG------L", "10YBE----------2", "10YFR-RTE------C", "10Y1001A1001A82H", "10YNL----------L"],
+    "CORE": [
+        "10YAT-APG------L", "10YBE----------2", "10YHR-HEP------M", "10YCZ-CEPS-----N", "10YFR-RTE------C",
+        "10Y1001A1001A82H", "10YHU-MAVIR----U", "10YNL----------L", "10YPL-AREA-----S", "10YRO-TEL------P",
+        "10YSK-SEPS-----K", "10YSI-ELES-----O",
+    ],
+    "NORDIC": [
+        "10YDK-1--------W", "10YDK-2--------M", "10YFI-1--------U", "10YNO-1--------2", "10YNO-2--------T",
+        "10YNO-3--------J", "10YNO-4--------9", "10Y1001A1001A48H", "10Y1001A1001A44P", "10Y1001A1001A45N",
+        "10Y1001A1001A46L", "10Y1001A1001A47J",
+    ],
+    "BALTIC": ["10Y1001A1001A39I", "10YLV-1001A00074", "10YLT-1001A0008Q"],
+}
+
+
+def resolve_zones(zones: Optional[str], group: Optional[str]) -> List[str]:
+    """Comma separated EIC codes and/or a named group, deduplicated in order."""
+    requested = [zone.strip() for zone in (zones or "").split(",") if zone.strip()]
+    if group:
+        if group.upper() not in BIDDING_ZONE_GROUPS:
+            raise HTTPException(status_code=400, detail=f"Unknown zone group '{group}', use one of {', '.join(BIDDING_ZONE_GROUPS)}")
+        requested.extend(BIDDING_ZONE_GROUPS[group.upper()])
+    resolved = list(dict.fromkeys(requested))
+    if not resolved:
+        raise HTTPException(status_code=400, detail="Pass zones (EIC codes) and/or group")
+    if len(resolved) > ZONE_FANOUT_MAX_ZONES:
+        raise HTTPException(status_code=400, detail=f"At most {ZONE_FANOUT_MAX_ZONES} zones per request")
+    return resolved
+
+
+async def fetch_zones(document_type: str, process_type: str, zones: List[str], period_start: str, period_end: str,
+                      concurrency: int) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Dict[str, Any]]]:
+    """
+    Fetches the same period for several zones with at most `concurrency` upstream calls in flight, shared by
+    the zones and their chunk windows. Returns the documents of the zones that succeeded and {"status", "detail"}
+    for those that failed.
+    """
+    # Invalid periods fail the whole request, not every zone
+    parse_entsoe_period_range(period_start, period_end)
+    semaphore = asyncio.Semaphore(concurrency)
+    results = await asyncio.gather(
+        *(fetch_day_ahead_total_load_forecast(document_type, process_type, zone, period_start, period_end, semaphore)
+          for zone in zones),
+        return_exceptions=True,
+    )
+    documents: Dict[str, Dict[str, Any]] = {}
+    errors: Dict[str, Dict[str, Any]] = {}
+    for zone, result in zip(zones, results):
+        if isinstance(result, HTTPException):
+            errors[zone] = {"status": result.status_code, "detail": result.detail}
+        elif isinstance(result, Exception):
+            logger.exception("Fetching zone %s failed", zone, exc_info=result)
+            errors[zone] = {"status": 500, "detail": str(result)}
+        else:
+            documents[zone] = result
+    return documents, errors
+
+
+def zone_matrix(documents: Dict[str, Dict[str, Any]], resample: Optional[str] = None, aggregation: str = "mean",
+                tz_name: str = "UTC") -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """
+    Aligns the series of several zones on the union of their timestamps (UTC epoch ms). Timestamps a zone
+    has no value for are NaN, e.g. the :15/:30/:45 slots of a PT60M zone next to a PT15M one unless
+    resample puts all zones on one grid first.
+    """
+    series: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+    for zone, document in documents.items():
+        columns, step_ms = document_to_columns(document, align=resample is not None)
+        name = "quantity"
+        if resample is not None:
+            columns = resample_columns(columns, step_ms, resample, [aggregation], tz_name)
+            name = aggregation
+        # One document per zone; concatenating also covers an EIC spelled differently upstream
+        timestamps = np.concatenate([ts for ts, _ in columns.values()]) if columns else np.empty(0, dtype=np.int64)
+        values = np.concatenate([v[name] for _, v in columns.values()]) if columns else np.empty(0)
+        series[zone] = (timestamps, values)
+
+    all_timestamps = [timestamps for timestamps, _ in series.values()]
+    grid = np.unique(np.concatenate(all_timestamps)) if all_timestamps else np.empty(0, dtype=np.int64)
+    aligned: Dict[str, np.ndarray] = {}
+    for zone, (timestamps, values) in series.items():
+        row = np.full(len(grid), np.nan)
+        row[np.searchsorted(grid, timestamps)] = values
+        aligned[zone] = row
+    return grid, aligned
+
+
+# ==========================================
+#              BACKGROUND PREFETCH
+# ==========================================
+
+class PrefetchJob:
+    """Refreshes the live ENTSOE cache for a set of zones daily at fixed local times."""
+
+    def __init__(self, spec: str, document_type: str, process_type: str, zones: List[str], times: List[dt_time]):
+        self.spec = spec
+        self.document_type = document_type
+        self.process_type = process_type
+        self.zones = zones
+        self.times = sorted(times)
+        self.running = False
+        self.runs = 0
+        # Scheduled runs done by another worker sharing the cache backend
+        self.skipped = 0
+        self.next_run: Optional[datetime] = None
+        self.last_run: Optional[float] = None
+        self.last_duration: Optional[float] = None
+        # zone -> unix time of the last successful refresh / detail of the last failure
+        self.last_success: Dict[str, float] = {}
+        self.last_error: Dict[str, Any] = {}
+
+    def next_run_after(self, now: datetime) -> datetime:
+        tz = ZoneInfo(ENTSOE_PREFETCH_TZ)
+        local = now.astimezone(tz)
+        for days in (0, 1):
+            date = local.date() + timedelta(days=days)
+            for at in self.times:
+                candidate = datetime.combine(date, at, tzinfo=tz)
+                if candidate > local:
+                    return candidate
+        raise AssertionError("unreachable: tomorrow always has a run")
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "job": self.spec,
+            "zones": self.zones,
+            "times": [at.strftime("%H:%M") for at in self.times],
+            "running": self.running,
+            "runs": self.runs,
+            "skipped": self.skipped,
+            "next_run": self.next_run.isoformat() if self.next_run else None,
+            "last_run": self.last_run,
+            "last_duration_seconds": round(self.last_duration, 3) if self.last_duration is not None else None,
+            "last_success": self.last_success,
+            "last_error": self.last_error,
+        }
+
+
+def parse_prefetch_jobs(spec: str) -> List[PrefetchJob]:
+    jobs = []
+    for job_spec in (part.strip() for part in spec.split(";")):
+        if not job_spec:
+            continue
+        try:
+            target, times = job_spec.split("@")
+            document_type, process_type, zones = target.split(":")
+            zone_list = []
+            for zone in (zone.strip() for zone in zones.split("+")):
+                zone_list.extend(BIDDING_ZONE_GROUPS.get(zone.upper(), [zone]))
+            zone_list = list(dict.fromkeys(zone for zone in zone_list if zone))
+            if not zone_list:
+                raise ValueError("no zones")
+            run_times = [datetime.strptime(at.strip(), "%H:%M").time() for at in times.split(",")]
+        except ValueError as e:
+            raise RuntimeError(f"Invalid ENTSOE_PREFETCH_JOBS entry '{job_spec}': {e}")
+        jobs.append(PrefetchJob(job_spec, document_type, process_type, zone_list, run_times))
+    return jobs
+
+
+try:
+    ZoneInfo(ENTSOE_PREFETCH_TZ)
+except (ZoneInfoNotFoundError, ValueError):
+    raise RuntimeError(f"Unknown ENTSOE_PREFETCH_TZ '{ENTSOE_PREFETCH_TZ}'")
+prefetch_jobs = parse_prefetch_jobs(ENTSOE_PREFETCH_JOBS)
+# Background refreshes use at most this many upstream slots, the rest of upstream_budget stays with requests
+prefetch_semaphore = asyncio.Semaphore(ENTSOE_PREFETCH_CONCURRENCY)
+
+
+async def run_prefetch_job(job: PrefetchJob) -> None:
+    """Fetches ENTSOE_PREFETCH_DAYS days from today for every zone and keeps them cached until the next run."""
+    job.running = True
+    started = time.time()
+    today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    now = datetime.now(timezone.utc)
+    ttl = (job.next_run_after(now) - now).total_seconds() + ENTSOE_LIVE_CACHE_TTL
+
+    async def refresh(zone: str) -> None:
+        async with prefetch_semaphore:
+            await fetch_live_entsoe(job.document_type, job.process_type, zone,
+                                    today, today + timedelta(days=ENTSOE_PREFETCH_DAYS), refresh=True, ttl=ttl)
+
+    try:
+        results = await asyncio.gather(*(refresh(zone) for zone in job.zones), return_exceptions=True)
+        for zone, result in zip(job.zones, results):
+            if isinstance(result, Exception):
+                detail = result.detail if isinstance(result, HTTPException) else str(result)
+                job.last_error[zone] = {"at": time.time(), "detail": detail}
+                logger.warning("ENTSOE prefetch of %s for %s failed: %s", job.spec, zone, detail)
+            else:
+                job.last_success[zone] = time.time()
+                job.last_error.pop(zone, None)
+    finally:
+        job.running = False
+        job.runs += 1
+        job.last_run = started
+        job.last_duration = time.time() - started
+
+
+async def _prefetch_loop(job: PrefetchJob) -> None:
+    while True:
+        job.next_run = job.next_run_after(datetime.now(timezone.utc))
+        await asyncio.sleep(max((job.next_run - datetime.now(timezone.utc)).total_seconds(), 0))
+        try:
+            # With a shared CACHE_BACKEND every worker runs this loop, one of them refreshes the shared cache.
+            # The lock is not released, it expires well after the other workers woke up for the same run.
+            if await cache_backend.acquire_lock(f"{CACHE_KEY_PREFIX}:prefetch:{job.spec}:{job.next_run.isoformat()}", 3600) is None:
+                job.skipped += 1
+                continue
+            await run_prefetch_job(job)
+        except Exception:
+            logger.exception("ENTSOE prefetch job %s failed", job.spec)
+
+
+# response_model and response_model_by_alias=True document the output with PascalCase keys. The endpoints return
+# a FastJSONResponse with the payload validated once by validate_response (see RESPONSE_VALIDATION), so FastAPI
+# does not validate and encode it a second time.
+# The GetEinheit* endpoints report their cache status (HIT, STALE, MISS, BYPASS, STALE-IF-ERROR) in the X-Cache header.
+# JSON endpoints send a strong ETag and answer a matching If-None-Match with 304; with a cached unit (or mirrored
+# Netzanschlusspunkte, or a stored ENTSOE period) that costs neither an upstream call nor serialization.
+
+@app.post("/get_einheit_biomasse", summary="Get Einheit Biomasse", response_model=GetEinheitBiomasseResponse, response_model_by_alias=True)
+async def get_einheit_biomasse_proxy(request: EinheitRequest, if_none_match: Optional[str] = Header(None)):
+    data, cache_status = await get_einheit("GetEinheitBiomasse", request)
+    return conditional_json_response(data, einheit_etag("GetEinheitBiomasse", data), if_none_match, {"X-Cache": cache_status})
+
+@app.post("/get_einheit_solar", summary="Get Einheit Solar", response_model=GetEinheitSolarResponse, response_model_by_alias=True)
+async def get_einheit_solar_proxy(request: EinheitRequest, if_none_match: Optional[str] = Header(None)):
+    data, cache_status = await get_einheit("GetEinheitSolar", request)
+    return conditional_json_response(data, einheit_etag("GetEinheitSolar", data), if_none_match, {"X-Cache": cache_status})
+
+@app.post("/get_einheit_wind", summary="Get Einheit Wind", response_model=GetEinheitWindResponse, response_model_by_alias=True)
+async def get_einheit_wind_proxy(request: EinheitRequest, if_none_match: Optional[str] = Header(None)):
+    data, cache_status = await get_einheit("GetEinheitWind", request)
+    return conditional_json_response(data, einheit_etag("GetEinheitWind", data), if_none_match, {"X-Cache": cache_status})
+
+@app.post("/get_einheit_strom_speicher", summary="Get Einheit Strom Speicher", response_model=GetEinheitStromSpeicherResponse, response_model_by_alias=True)
+async def get_einheit_strom_speicher_proxy(request: EinheitRequest, if_none_match: Optional[str] = Header(None)):
+    data, cache_status = await get_einheit("GetEinheitStromSpeicher", request)
+    return conditional_json_response(data, einheit_etag("GetEinheitStromSpeicher", data), if_none_match, {"X-Cache": cache_status})
+
+@app.post("/get_einheiten_batch",
+          summary="Get many Einheiten in one call",
+          response_class=StreamingResponse,
+          description="""
+          Fetches a list of Einheiten (einheitMastrNummer + type) with bounded parallel upstream calls.
+
+          The response is NDJSON, one line per item in completion order:
+          - index, einheitMastrNummer, type: identify the requested item
+          - status: 200 on success, otherwise the upstream/validation error status
+          - data: the validated GetEinheit* response (on success)
+          - cache: cache status of the lookup (on success)
+          - error: error detail (on failure)
+          """)
+async def get_einheiten_batch(request: EinheitBatchRequest):
+    return StreamingResponse(stream_einheiten_batch(request), media_type="application/x-ndjson")
+
+@app.get("/einheiten/near",
+         summary="Find fetched Einheiten within a radius",
+         description="""
+         Searches the Einheiten this proxy has already fetched for the given Marktakteur (through the GetEinheit*
+         and batch endpoints) by distance to a point, nearest first. Units without Laengengrad/Breitengrad are not indexed.
+         """)
+async def einheiten_near(
+    marktakteur_mastr_nummer: str = Query(..., alias="marktakteurMastrNummer"),
+    lat: float = Query(..., ge=-90, le=90, description="Latitude (WGS84)"),
+    lon: float = Query(..., ge=-180, le=180, description="Longitude (WGS84)"),
+    radius_km: float = Query(..., gt=0, le=1000, description="Search radius in km"),
+    energietraeger: Optional[str] = Query(None, description="Only units with this Energietraeger (e.g. Wind)"),
+    limit: int = Query(1000, ge=1, le=100000),
+):
+    await sync_spatial_index()
+    index = einheit_spatial_index.get(marktakteur_mastr_nummer)
+    hits = index.near(lat, lon, radius_km) if index is not None else []
+    einheiten = [dict(item, distance_km=round(distance, 3)) for distance, item in hits
+                 if _matches_energietraeger(item, energietraeger)][:limit]
+    return {"count": len(einheiten), "einheiten": einheiten}
+
+
+@app.get("/einheiten/bbox",
+         summary="Find fetched Einheiten within a bounding box",
+         description="Bounding-box variant of /einheiten/near over the same index.")
+async def einheiten_bbox(
+    marktakteur_mastr_nummer: str = Query(..., alias="marktakteurMastrNummer"),
+    min_lat: float = Query(..., ge=-90, le=90),
+    min_lon: float = Query(..., ge=-180, le=180),
+    max_lat: float = Query(..., ge=-90, le=90),
+    max_lon: float = Query(..., ge=-180, le=180),
+    energietraeger: Optional[str] = Query(None, description="Only units with this Energietraeger (e.g. Wind)"),
+    limit: int = Query(1000, ge=1, le=100000),
+):
+    if min_lat > max_lat or min_lon > max_lon:
+        raise HTTPException(status_code=400, detail="min_lat/min_lon must not be greater than max_lat/max_lon")
+    await sync_spatial_index()
+    index = einheit_spatial_index.get(marktakteur_mastr_nummer)
+    entries = index.bbox(min_lat, min_lon, max_lat, max_lon) if index is not None else []
+    einheiten = [item for _, _, item in entries if _matches_energietraeger(item, energietraeger)][:limit]
+    return {"count": len(einheiten), "einheiten": einheiten}
+
+@app.post("/get_liste_alle_netzanschlusspunkte", summary="Get Liste Alle Netzanschlusspunkte", response_model=GetListeAlleNetzanschlusspunkteResponse, response_model_by_alias=True,
+          description="""
+          Requests that only filter by EinheitPostleitzahl, Regelzone, Spannungsebene and/or NetzbetreiberMastrNummer
+          are answered from the local mirror if the Marktakteur is mirrored and was synced within mirror_max_age seconds,
+          otherwise they go to MaStR. The X-Data-Source header tells which one answered (mirror or upstream).
+          """)
+async def get_liste_alle_netzanschlusspunkte_proxy(
+    request: GetListeAlleNetzanschlusspunkteRequest,
+    mirror_max_age: float = Query(MASTR_MIRROR_MAX_AGE, ge=0, description="Maximum age of the mirror in seconds (0 = always ask MaStR)"),
+    if_none_match: Optional[str] = Header(None),
+):
+    endpoint = "GetListeAlleNetzanschlusspunkte"
+    data = await query_mastr_mirror(request, mirror_max_age) if mirror_max_age > 0 else None
+    source = "mirror" if data is not None else "upstream"
+    if data is None:
+        data = await call_external_api_mastr(endpoint, request)
+    data = validate_response(endpoint, GetListeAlleNetzanschlusspunkteResponse, data)
+    return conditional_json_response(data, netzanschlusspunkte_etag(request, data), if_none_match, {"X-Data-Source": source})
+
+
+@app.post("/mirror/netzanschlusspunkte/sync", summary="Sync the local MaStR mirror")
+async def sync_netzanschlusspunkte_mirror(
+    marktakteur_mastr_nummer: str = Query(..., alias="marktakteurMastrNummer"),
+    full: bool = Query(False, description="Re-download everything instead of the changes since the last sync"),
+):
+    return await sync_mastr_mirror(marktakteur_mastr_nummer, full)
+
+
+@app.get("/mirror/netzanschlusspunkte/status", summary="Sync status of the local MaStR mirror")
+async def netzanschlusspunkte_mirror_status():
+    if mastr_mirror is None:
+        raise HTTPException(status_code=404, detail="The MaStR mirror is disabled (MASTR_MIRROR_PATH is empty)")
+    return await asyncio.to_thread(mastr_mirror.status)
+
+
+@app.post("/get_liste_alle_netzanschlusspunkte/export",
+          summary="Export all Netzanschlusspunkte as a stream",
+          response_class=StreamingResponse,
+          description="""
+          Walks all GetListeAlleNetzanschlusspunkte pages (page size = limit) starting at startAb and streams
+          the rows as NDJSON or CSV. The next page is fetched while the current one is written out.
+
+          **Resuming:** the startAb of the next export is startAb + number of rows received. With max_rows set,
+          receiving fewer than max_rows rows means the export is complete.
+
+          CSV has a fixed set of columns; fields MaStR adds beyond them end up in the WeitereFelder column as JSON.
+          """)
+async def export_liste_alle_netzanschlusspunkte(
+    request: GetListeAlleNetzanschlusspunkteRequest,
+    response_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format", description="Row format: ndjson or csv"),
+    max_rows: Optional[int] = Query(None, ge=1, description="Stop after this many rows"),
+):
+    media_type = "application/x-ndjson" if response_format == "ndjson" else "text/csv"
+    return StreamingResponse(stream_netzanschlusspunkte_export(request, response_format, max_rows), media_type=media_type)
+
+@app.get("/day_ahead_total_load_forecast", 
+         summary="Get Day-Ahead Total Load Forecast from ENTSOE",
+         response_model=DayAheadTotalLoadForecastResponse,
+         description="""
+         Retrieves day-ahead total load forecast data from the ENTSOE Transparency Platform.
+         
+         The API returns data in JSON format (converted from XML) following the IEC 62325-451-6 standard.
+         
+         **Parameters:**
+         - document_type: Document type code (use 'A65' for day-ahead total load forecast)
+         - process_type: Process type code (use 'A01' for day ahead)
+         - out_bidding_zone_domain: EIC code for the bidding zone (e.g., '10YCZ-CEPS-----N' for Czech Republic)
+         - period_start: Start date and time in format YYYYMMDDHHmm (e.g., '202308140000')
+         - period_end: End date and time in format YYYYMMDDHHmm (e.g., '202308170000')
+         
+         Long periods are split into windows of ENTSOE_CHUNK_DAYS days, fetched in parallel and merged
+         into one chronologically ordered document. Days before today (UTC) are kept in a local store
+         and only fetched from ENTSOE once.
+         
+         **Response Structure:**
+         - GL_MarketDocument: Root object containing all forecast data
+           - mRID: Unique market document identifier
+           - type: Document type (A65)
+           - TimeSeries: Array of time series objects, each representing one day
+             - Period: Contains time interval and data points
+               - Point: Array of hourly load values
+                 - position: Hour of the day (1-24)
+                 - quantity: Forecasted load in MW
+         
+         **Other formats** (format=columnar|arrow|parquet): one flat, sorted series per bidding zone with
+         UTC timestamps (timeInterval.start + resolution * (position - 1)) and float quantities.
+         - columnar: JSON {"timestamp_unit": "ms", "zones": {EIC: {"timestamp": [...], "quantity": [...]}}}
+         - arrow: Arrow IPC stream with columns zone, timestamp (UTC), quantity
+         - parquet: Parquet file with the same columns
+         
+         **Resampling** (resample=PT60M|P1D|...|peak, agg=mean,min,max,sum,p95, tz=Europe/Berlin): series with
+         mixed resolutions are aligned to the finest one, then aggregated per bucket on the server. The result
+         has one column per aggregation (plus 'peak' for resample=peak) and is returned in the columnar
+         layout (json and columnar are the same here), or as arrow/parquet.
+
+         The response has a strong ETag over the version (mRID, revisionNumber, createdDateTime) of the source
+         documents and the requested representation; send it back in If-None-Match to get a 304 instead of the body. Responses are compressed (gzip, br, zstd) per Accept-Encoding.
+         """)
+async def day_ahead_total_load_forecast(
+    document_type: str = Query(..., description="Document type (A65 for day-ahead total load forecast)"),
+    process_type: str = Query(..., description="Process type (A01 for day ahead)"),
+    out_bidding_zone_domain: str = Query(..., description="EIC code for bidding zone (e.g., 10YCZ-CEPS-----N)"),
+    period_start: str = Query(..., description="Start date/time in format YYYYMMDDHHmm (e.g., 202308140000)"),
+    period_end: str = Query(..., description="End date/time in format YYYYMMDDHHmm (e.g., 202308170000)"),
+    output_format: Literal["json", "columnar", "arrow", "parquet"] = Query("json", alias="format", description="Output format: json (GL_MarketDocument), columnar, arrow or parquet"),
+    resample: Optional[str] = Query(None, description="Bucket size as ISO 8601 duration (e.g. PT60M, P1D) or 'peak' for daily peak/off-peak"),
+    agg: str = Query("mean", description="Comma separated aggregations for resample: mean, min, max, sum, p<N> (e.g. p95)"),
+    tz: str = Query("UTC", description="Time zone for day buckets and peak hours (e.g. Europe/Berlin)"),
+    if_none_match: Optional[str] = Header(None),
+) -> Dict[str, Any]:
+    """Proxy endpoint for ENTSOE day-ahead total load forecast data."""
+    if resample is not None:
+        try:
+            aggregations = parse_aggregations(agg)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    document = await fetch_day_ahead_total_load_forecast(document_type, process_type, out_bidding_zone_domain, period_start, period_end)
+    variant = {"params": [document_type, process_type, out_bidding_zone_domain, period_start, period_end],
+               "format": output_format, "resample": resample, "agg": agg if resample else None, "tz": tz if resample else None}
+    etag = entsoe_etag(variant, entsoe_version(document))
+    unchanged = not_modified(if_none_match, etag)
+    if unchanged is not None:
+        return unchanged
+    if output_format == "json" and resample is None:
+        # Already validated by the parser (or the model in the legacy path)
+        return FastJSONResponse(document, headers={"ETag": etag})
+    try:
+        columns, step_ms = document_to_columns(document, align=resample is not None)
+    except ValueError as e:
+        raise HTTPException(status_code=500, detail=f"Error converting ENTSOE response: {e}")
+    if resample is None:
+        response = render_columns(columns, output_format)
+    else:
+        try:
+            columns = resample_columns(columns, step_ms, resample, aggregations, tz)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        response = render_columns(columns, output_format, extra={"resample": resample, "agg": aggregations, "tz": tz})
+    response.headers["ETag"] = etag
+    return response
+
+@app.get("/day_ahead_total_load_forecast/zones",
+         summary="Day-Ahead Total Load Forecast for several bidding zones",
+         description=f"""
+         Fetches the same period for a list of bidding zones (zones=EIC,EIC,... and/or group=
+         {"|".join(BIDDING_ZONE_GROUPS)}) with at most `concurrency` upstream calls in parallel across all zones and
+         their chunk windows, and returns one matrix
+         aligned on the union of all timestamps (UTC epoch ms):
+
+         - json: {{"timestamp_unit": "ms", "timestamp": [...], "zones": [EIC, ...], "values": [[v(t0, z0), v(t0, z1), ...], ...],
+           "errors": {{EIC: {{"status": ..., "detail": ...}}}}}} with null where a zone has no value
+         - arrow/parquet: a wide table with a timestamp column and one column per zone; failed zones are listed in the
+           X-Failed-Zones header and the "errors" schema metadata
+
+         Zones that fail are reported in errors and left out of the matrix; only if all zones fail the request fails (502).
+         Zones with different resolutions (PT15M vs PT60M) leave gaps; resample (e.g. PT60M, P1D) with one
+         aggregation puts them on one grid. Each zone goes through the same store, chunking and rate limiting as
+         /day_ahead_total_load_forecast.
+         """)
+async def day_ahead_total_load_forecast_zones(
+    document_type: str = Query(..., description="Document type (A65 for day-ahead total load forecast)"),
+    process_type: str = Query(..., description="Process type (A01 for day ahead)"),
+    period_start: str = Query(..., description="Start date/time in format YYYYMMDDHHmm (e.g., 202308140000)"),
+    period_end: str = Query(..., description="End date/time in format YYYYMMDDHHmm (e.g., 202308170000)"),
+    zones: Optional[str] = Query(None, description="Comma separated EIC codes"),
+    group: Optional[str] = Query(None, description=f"Named zone group: {', '.join(BIDDING_ZONE_GROUPS)}"),
+    concurrency: int = Query(ZONE_FANOUT_CONCURRENCY, ge=1, le=ZONE_FANOUT_MAX_CONCURRENCY, description="Upstream calls in parallel across all zones"),
+    output_format: Literal["json", "arrow", "parquet"] = Query("json", alias="format"),
+    resample: Optional[str] = Query(None, description="Bucket size as ISO 8601 duration (e.g. PT60M, P1D)"),
+    agg: str = Query("mean", description="Aggregation for resample: mean, min, max, sum or p<N>"),
+    tz: str = Query("UTC", description="Time zone for day buckets (e.g. Europe/Berlin)"),
+    if_none_match: Optional[str] = Header(None),
+):
+    zone_list = resolve_zones(zones, group)
+    if resample is not None:
+        try:
+            aggregations = parse_aggregations(agg)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if len(aggregations) != 1 or resample.lower() == "peak":
+            raise HTTPException(status_code=400, detail="The zone matrix takes one aggregation and a fixed resample duration")
+        aggregation = aggregations[0]
+
+    documents, errors = await fetch_zones(document_type, process_type, zone_list, period_start, period_end, concurrency)
+    if not documents:
+        raise HTTPException(status_code=502, detail={"message": "All zones failed", "errors": errors})
+
+    variant = {"params": [document_type, process_type, period_start, period_end], "zones": zone_list,
+               "format": output_format, "resample": resample, "agg": agg if resample else None, "tz": tz if resample else None}
+    etag = entsoe_etag(variant, {zone: entsoe_version(document) for zone, document in documents.items()}, errors)
+    unchanged = not_modified(if_none_match, etag)
+    if unchanged is not None:
+        return unchanged
+    try:
+        timestamps, aligned = zone_matrix(documents, resample, aggregation if resample else "mean", tz)
+    except ValueError as e:
+        raise HTTPException(status_code=400 if resample else 500, detail=str(e))
+    # Keep the requested zone order
+    matrix_zones = [zone for zone in zone_list if zone in aligned]
+
+    if output_format == "json":
+        matrix = np.column_stack([aligned[zone] for zone in matrix_zones])
+        content = {
+            "timestamp_unit": "ms",
+            "timestamp": timestamps.tolist(),
+            "zones": matrix_zones,
+            "values": np.where(np.isnan(matrix), None, matrix).tolist(),
+            "errors": errors,
+        }
+        if resample is not None:
+            content.update(resample=resample, agg=agg, tz=tz)
+        return FastJSONResponse(content, headers={"ETag": etag})
+
+    if pa is None:
+        raise HTTPException(status_code=501, detail="Arrow/Parquet output requires the optional pyarrow package")
+    data = {"timestamp": pa.array(timestamps, pa.timestamp("ms", tz="UTC"))}
+    data.update((zone, pa.array(aligned[zone], pa.float64(), from_pandas=True)) for zone in matrix_zones)
+    table = pa.table(data).replace_schema_metadata({"errors": json.dumps(errors)})
+    sink = io.BytesIO()
+    if output_format == "arrow":
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        media_type = "application/vnd.apache.arrow.stream"
+    else:
+        pq.write_table(table, sink)
+        media_type = "application/vnd.apache.parquet"
+    return Response(sink.getvalue(), media_type=media_type, headers={"ETag": etag, "X-Failed-Zones": ",".join(errors)})
+
+@app.get("/admin/upstreams", summary="Upstream rate limiter and circuit breaker state")
+async def upstreams_status():
+    return {provider: guard.status() for provider, guard in upstream_guards.items()}
+
+@app.get("/admin/cache", summary="Cache backend state")
+async def cache_status():
+    try:
+        return await cache_backend.status()
+    except CacheBackendError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+@app.get("/admin/prefetch", summary="Background ENTSOE prefetch jobs")
+async def prefetch_status():
+    return {
+        "timezone": ENTSOE_PREFETCH_TZ,
+        "days": ENTSOE_PREFETCH_DAYS,
+        "concurrency": ENTSOE_PREFETCH_CONCURRENCY,
+        "upstream_budget": {"limit": UPSTREAM_CONCURRENCY,
+                            "in_flight": sum(guard.in_flight for guard in upstream_guards.values())},
+        "jobs": [job.status() for job in prefetch_jobs],
+    }
+
+@app.post("/admin/prefetch/{job_index}/run", summary="Run a prefetch job now")
+async def run_prefetch_job_now(job_index: int):
+    if not 0 <= job_index < len(prefetch_jobs):
+        raise HTTPException(status_code=404, detail=f"No prefetch job {job_index} (ENTSOE_PREFETCH_JOBS has {len(prefetch_jobs)})")
+    job = prefetch_jobs[job_index]
+    if job.running:
+        raise HTTPException(status_code=409, detail="The job is already running")
+    await run_prefetch_job(job)
+    return job.status()
 
 @app.get("/", summary="API Root", include_in_schema=False)
 async def root():
@@ -0,0 +1,71 @@
+"""
+Starts the proxy with several uvicorn worker processes. To share cached upstream responses and coalesce identical
+upstream calls across the workers, point them at one cache backend:
+
+    CACHE_BACKEND=sqlite:cache.sqlite3 python serve.py --workers 4          # workers on this host
+    CACHE_BACKEND=redis://127.0.0.1:6379/0 python serve.py --workers 8      # workers on any number of hosts
+
+Shared by all workers (with a shared CACHE_BACKEND):
+    - the GetEinheit* and ENTSOE live caches, and the single-flight of upstream calls
+    - the spatial index behind /einheiten/near and /einheiten/bbox: each worker keeps its own copy and replays
+      the units the other workers indexed before every query
+    - the ENTSOE store and the MaStR mirror (SQLite files), the prefetch jobs (one worker runs each scheduled run)
+      and the background mirror sync (one worker per MASTR_MIRROR_SYNC_INTERVAL)
+    - /metrics: the workers write their samples to PROMETHEUS_MULTIPROC_DIR (a fresh temporary directory unless
+      set) and every scrape aggregates all of them
+
+Per worker, whatever the backend:
+    - rate limits (MASTR_RATE_LIMIT / ENTSOE_RATE_LIMIT and their bursts), circuit breakers and the
+      UPSTREAM_CONCURRENCY budget: for a fixed upstream quota, divide them by the number of workers
+    - upstream connection pools and background revalidation of stale GetEinheit* entries
+    - /admin/upstreams, /admin/prefetch and /admin/cache report the state of the worker that answers
+      (/admin/prefetch counts runs done by another worker as "skipped")
+
+With CACHE_BACKEND=memory (the default) caches, single-flight and the spatial index are per worker as well.
+
+Usage:
+    python serve.py --workers 4 --port 8000 --cache-backend sqlite:cache.sqlite3
+"""
+import os
+import sys
+import argparse
+import shutil
+import tempfile
+
+import uvicorn
+from dotenv import load_dotenv
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--cache-backend", help="Overrides CACHE_BACKEND (memory, sqlite:<path>, redis://host:port/db)")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    # The workers load .env themselves, this only makes its settings visible to the checks below
+    load_dotenv()
+    if args.cache_backend:
+        os.environ["CACHE_BACKEND"] = args.cache_backend
+    if args.workers > 1 and os.getenv("CACHE_BACKEND", "memory") == "memory":
+        print(f"warning: CACHE_BACKEND=memory, the {args.workers} workers will not share their caches", file=sys.stderr)
+
+    # prometheus_client reads PROMETHEUS_MULTIPROC_DIR at import, so it has to be set before the workers start.
+    # Samples of a previous run must not be aggregated into this one.
+    metrics_dir = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    created_metrics_dir = False
+    if args.workers > 1:
+        if metrics_dir:
+            shutil.rmtree(metrics_dir, ignore_errors=True)
+            os.makedirs(metrics_dir)
+        else:
+            metrics_dir = tempfile.mkdtemp(prefix="msdaten-metrics-")
+            created_metrics_dir = True
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = metrics_dir
+    try:
+        uvicorn.run("main:app", host=args.host, port=args.port, workers=args.workers, log_level=args.log_level)
+    finally:
+        if created_metrics_dir:
+            shutil.rmtree(metrics_dir, ignore_errors=True)
@@ -0,0 +1,11 @@
+import os
+import sys
+from pathlib import Path
+
+# main.py requires the upstream settings at import; the tests never reach the real APIs
+os.environ.update(
+    API_KEY_MASTR="test", API_URL_MASTR="http://mastr.test",
+    API_KEY_ENTSOE="test", API_URL_ENTSOE="http://entsoe.test/api",
+    ENTSOE_STORE_PATH="", MASTR_MIRROR_PATH="", CACHE_BACKEND="memory",
+)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
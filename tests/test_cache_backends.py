@@ -0,0 +1,98 @@
+import asyncio
+import contextlib
+
+import pytest
+
+import main
+from benchmarks.fake_redis import FakeRedis, create_server
+
+
+@contextlib.asynccontextmanager
+async def sqlite_or_redis(kind, tmp_path):
+    if kind == "sqlite":
+        yield main.SqliteCacheBackend(str(tmp_path / "cache.sqlite3"))
+        return
+    server = await create_server(FakeRedis(), "127.0.0.1", 0)
+    backend = main.RedisCacheBackend(f"redis://127.0.0.1:{server.sockets[0].getsockname()[1]}/0")
+    async with server:
+        yield backend
+        await backend.close()
+
+
+@pytest.mark.parametrize("kind", ["sqlite", "redis"])
+def test_versioned_map_keeps_the_latest_entry_per_field(kind, tmp_path):
+    async def run():
+        async with sqlite_or_redis(kind, tmp_path) as backend:
+            await backend.publish("map", "a", b"a1")
+            await backend.publish("other", "a", b"x")
+            await backend.publish("map", "b", b"b1")
+            first, cursor = await backend.read_changes("map", 0)
+            await backend.publish("map", "a", b"a2")
+            second, _ = await backend.read_changes("map", cursor)
+            # A new worker replays one entry per field, not the history
+            replay, _ = await backend.read_changes("map", 0)
+            return first, second, replay
+
+    first, second, replay = asyncio.run(run())
+    assert sorted(first) == [b"a1", b"b1"]
+    # Fields may be returned again, but always in their latest state
+    assert b"a2" in second and b"a1" not in second
+    assert sorted(replay) == [b"a2", b"b1"]
+
+
+@pytest.mark.parametrize("kind", ["sqlite", "redis"])
+def test_spatial_index_is_synced_from_the_shared_backend(kind, tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "einheit_spatial_index", {})
+    monkeypatch.setattr(main, "_spatial_index_cursor", 0.0)
+    unit = {"EinheitMastrNummer": "SEE1", "Breitengrad": 52.5, "Laengengrad": 13.4, "Energietraeger": "Wind"}
+
+    async def run():
+        async with sqlite_or_redis(kind, tmp_path) as backend:
+            monkeypatch.setattr(main, "cache_backend", backend)
+            # Indexed by another worker: only the shared map has it
+            await main.share_indexed_einheit("SNB1", "GetEinheitWind", unit)
+            assert "SNB1" not in main.einheit_spatial_index
+            await main.sync_spatial_index()
+            # Moved later: the newest entry wins
+            await main.share_indexed_einheit("SNB1", "GetEinheitWind", dict(unit, Breitengrad=48.1, Laengengrad=11.6))
+            await main.sync_spatial_index()
+
+    asyncio.run(run())
+    index = main.einheit_spatial_index["SNB1"]
+    assert [item["EinheitMastrNummer"] for _, item in index.near(48.1, 11.6, 1)] == ["SEE1"]
+    assert index.near(52.5, 13.4, 1) == []
+
+
+def test_hung_redis_is_a_cache_miss(monkeypatch):
+    monkeypatch.setattr(main, "REDIS_TIMEOUT", 0.05)
+
+    async def run():
+        # Accepts connections and reads commands, but never answers
+        async def handle(reader, writer):
+            await reader.read()
+        server = await asyncio.start_server(handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        backend = main.RedisCacheBackend(f"redis://127.0.0.1:{port}/0")
+        async with server:
+            value, result = await asyncio.wait_for(main.SharedCache(backend, "test").get("key"), 1)
+            with pytest.raises(main.CacheBackendError):
+                await asyncio.wait_for(backend.acquire_lock("key", 1), 1)
+        return value, result, len(backend._idle)
+
+    # The timed out connections are dropped, not returned to the pool
+    assert asyncio.run(run()) == (None, main.CACHE_MISS, 0)
+
+
+def test_blackholed_redis_connect_times_out(monkeypatch):
+    monkeypatch.setattr(main, "REDIS_TIMEOUT", 0.05)
+
+    async def never_connects(host, port):
+        await asyncio.sleep(3600)
+    monkeypatch.setattr(asyncio, "open_connection", never_connects)
+
+    async def run():
+        backend = main.RedisCacheBackend("redis://10.255.255.1:6379/0")
+        with pytest.raises(main.CacheBackendError):
+            await asyncio.wait_for(backend.read("key"), 1)
+
+    asyncio.run(run())
@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from benchmarks.entsoe_fixtures import make_gl_market_document
+from benchmarks.mastr_fixtures import make_einheit
+
+
+@pytest.fixture
+def client(monkeypatch):
+    def handler(request):
+        return httpx.Response(200, json=make_einheit(main.GetEinheitWindResponse, "SEE1"))
+    monkeypatch.setitem(main._http_clients, "mastr", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    with TestClient(main.app) as client:
+        yield client
+
+
+def get_einheit(client, **headers):
+    return client.post("/get_einheit_wind", json={"marktakteurMastrNummer": "SNB1", "einheitMastrNummer": "SEE1"},
+                       headers=headers)
+
+
+def test_small_body_304_repeats_the_plain_etag(client, monkeypatch):
+    monkeypatch.setattr(main, "COMPRESSION_MIN_SIZE", 1_000_000)
+    first = get_einheit(client, **{"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in first.headers
+    etag = first.headers["etag"]
+    assert not etag.endswith('-gzip"')
+
+    revalidated = get_einheit(client, **{"Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["etag"] == etag
+
+
+def test_compressed_body_304_repeats_the_suffixed_etag(client, monkeypatch):
+    monkeypatch.setattr(main, "COMPRESSION_MIN_SIZE", 1)
+    first = get_einheit(client, **{"Accept-Encoding": "gzip"})
+    assert first.headers["content-encoding"] == "gzip"
+    etag = first.headers["etag"]
+    assert etag.endswith('-gzip"')
+
+    revalidated = get_einheit(client, **{"Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["etag"] == etag
+
+
+@pytest.fixture
+def entsoe(monkeypatch):
+    """ENTSOE stand-in whose documents carry the current `revision`; counts the upstream calls."""
+    state = {"revision": 1, "calls": 0}
+
+    def handler(request):
+        state["calls"] += 1
+        start = datetime.strptime(request.url.params["periodStart"], "%Y%m%d%H%M").replace(tzinfo=timezone.utc)
+        end = datetime.strptime(request.url.params["periodEnd"], "%Y%m%d%H%M").replace(tzinfo=timezone.utc)
+        xml = make_gl_market_document(start, end).replace(
+            "<revisionNumber>1</revisionNumber>", f"<revisionNumber>{state['revision']}</revisionNumber>")
+        return httpx.Response(200, text=xml)
+
+    monkeypatch.setitem(main._http_clients, "entsoe", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    monkeypatch.setattr(main, "entsoe_live_cache", main.MemoryCache(100))
+    return state
+
+
+def get_forecast(client, **headers):
+    today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    return client.get("/day_ahead_total_load_forecast", headers=headers, params={
+        "document_type": "A65", "process_type": "A01", "out_bidding_zone_domain": "10YCZ-CEPS-----N",
+        "period_start": f"{today:%Y%m%d%H%M}", "period_end": f"{today + timedelta(days=2):%Y%m%d%H%M}",
+    })
+
+
+def test_entsoe_etag_is_stable_across_cache_hits_and_follows_revisions(client, entsoe, monkeypatch):
+    first = get_forecast(client)
+    etag = first.headers["etag"]
+    # Answered from the live cache: same ETag as the response built from the upstream document
+    assert get_forecast(client, **{"If-None-Match": etag}).status_code == 304
+    assert entsoe["calls"] == 1
+
+    entsoe["revision"] = 2
+    monkeypatch.setattr(main, "entsoe_live_cache", main.MemoryCache(100))
+    revised = get_forecast(client, **{"If-None-Match": etag})
+    assert revised.status_code == 200
+    assert revised.headers["etag"] != etag
+    assert revised.json()["GL_MarketDocument"]["revisionNumber"] == "2"
+
+
+def test_merged_entsoe_mrid_follows_every_source():
+    def document(revision, created):
+        return {"GL_MarketDocument": {"mRID": "a", "revisionNumber": revision, "createdDateTime": created,
+                                      "TimeSeries": []}}
+
+    merged = main.merge_entsoe_documents([document("1", "t1"), document("1", "t2")])
+    # Only the second window was revised; the merged header still shows the first one
+    revised = main.merge_entsoe_documents([document("1", "t1"), document("2", "t2")])
+    assert revised["GL_MarketDocument"]["revisionNumber"] == "1"
+    assert main.entsoe_version(merged) != main.entsoe_version(revised)
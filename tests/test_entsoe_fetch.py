@@ -0,0 +1,146 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+
+import main
+from benchmarks.entsoe_fixtures import make_gl_market_document
+
+ZONE = "10YCZ-CEPS-----N"
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+class FakeEntsoe:
+    """ENTSOE API stand-in that records the requested windows and the most calls it had in flight."""
+
+    def __init__(self):
+        self.windows = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def handler(self, request):
+        params = request.url.params
+        start, end = (main.parse_entsoe_period(params[name]) for name in ("periodStart", "periodEnd"))
+        self.windows.append((params["out_Domain"], start, end))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        return httpx.Response(200, text=make_gl_market_document(start, end, zone=params["out_Domain"]))
+
+
+@pytest.fixture
+def entsoe(monkeypatch):
+    fake = FakeEntsoe()
+    monkeypatch.setitem(main._http_clients, "entsoe", httpx.AsyncClient(transport=httpx.MockTransport(fake.handler)))
+    # A fresh guard: its rate limiter must not be bound to the event loop of another test
+    monkeypatch.setitem(main.upstream_guards, "entsoe", main.UpstreamGuard("entsoe", rate=1000, burst=1000))
+    monkeypatch.setattr(main, "ENTSOE_CHUNK_DAYS", 10)
+    monkeypatch.setattr(main, "ENTSOE_CHUNK_CONCURRENCY", 2)
+    return fake
+
+
+def test_split_entsoe_period_covers_the_range_in_chunks():
+    windows = main.split_entsoe_period(utc(2024, 1, 1), utc(2024, 1, 25), timedelta(days=10))
+    assert windows == [
+        (utc(2024, 1, 1), utc(2024, 1, 11)),
+        (utc(2024, 1, 11), utc(2024, 1, 21)),
+        (utc(2024, 1, 21), utc(2024, 1, 25)),
+    ]
+    assert main.split_entsoe_period(utc(2024, 1, 1), utc(2024, 1, 11), timedelta(days=10)) == [
+        (utc(2024, 1, 1), utc(2024, 1, 11))]
+    assert main.split_entsoe_period(utc(2024, 1, 1), utc(2024, 1, 1), timedelta(days=10)) == []
+
+
+def test_merge_keeps_a_series_returned_by_two_windows_once():
+    # Windows that end mid-day both return the TimeSeries of that day
+    first = main.parse_entsoe_document([make_gl_market_document(utc(2024, 1, 1), utc(2024, 1, 3)).encode()])
+    second = main.parse_entsoe_document([make_gl_market_document(utc(2024, 1, 2), utc(2024, 1, 4)).encode()])
+    merged = main.merge_entsoe_documents([first, second])["GL_MarketDocument"]
+    starts = [series["Period"]["timeInterval"]["start"] for series in merged["TimeSeries"]]
+    assert starts == ["2024-01-01T00:00Z", "2024-01-02T00:00Z", "2024-01-03T00:00Z"]
+    assert [series["mRID"] for series in merged["TimeSeries"]] == ["1", "2", "3"]
+    assert merged["time_Period.timeInterval"] == {"start": "2024-01-01T00:00Z", "end": "2024-01-04T00:00Z"}
+
+
+def test_zones_share_one_upstream_budget(entsoe):
+    zones = [ZONE, "10YAT-APG------L", "10YBE----------2"]
+    documents, errors = asyncio.run(main.fetch_zones("A65", "A01", zones, "202401010000", "202402100000", 2))
+    assert not errors and set(documents) == set(zones)
+    # 3 zones x 4 windows, never more than `concurrency` of them at once
+    assert len(entsoe.windows) == 12
+    assert entsoe.max_in_flight == 2
+
+
+def test_store_gaps_share_one_upstream_budget(entsoe, tmp_path, monkeypatch):
+    store = main.EntsoeStore(str(tmp_path / "entsoe.sqlite3"))
+    monkeypatch.setattr(main, "entsoe_store", store)
+
+    async def run():
+        # Covering Jan 21-31 leaves two gaps of two windows each
+        await main.fetch_day_ahead_total_load_forecast("A65", "A01", ZONE, "202401210000", "202401310000")
+        entsoe.windows.clear()
+        await main.fetch_day_ahead_total_load_forecast("A65", "A01", ZONE, "202401010000", "202402200000")
+
+    asyncio.run(run())
+    assert len(entsoe.windows) == 4
+    assert entsoe.max_in_flight == 2
+
+
+# --- EntsoeStore ---
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = main.EntsoeStore(str(tmp_path / "entsoe.sqlite3"))
+    monkeypatch.setattr(main, "entsoe_store", store)
+    return store
+
+
+def test_missing_intervals_skip_the_covered_windows(store):
+    key = ("A65", "A01", ZONE)
+    assert store.missing_intervals(*key, utc(2024, 1, 1), utc(2024, 1, 20)) == [(utc(2024, 1, 1), utc(2024, 1, 20))]
+    # Overlapping windows count as one covered stretch
+    for start, end in ((utc(2024, 1, 5), utc(2024, 1, 8)), (utc(2024, 1, 7), utc(2024, 1, 10)),
+                       (utc(2024, 1, 15), utc(2024, 1, 25))):
+        document = main.parse_entsoe_document([make_gl_market_document(start, end).encode()])
+        store.save(*key, start, end, document)
+    assert store.missing_intervals(*key, utc(2024, 1, 1), utc(2024, 1, 20)) == [
+        (utc(2024, 1, 1), utc(2024, 1, 5)), (utc(2024, 1, 10), utc(2024, 1, 15))]
+    assert store.missing_intervals(*key, utc(2024, 1, 6), utc(2024, 1, 9)) == []
+    # Other zones have their own coverage
+    assert store.missing_intervals("A65", "A01", "10YAT-APG------L", utc(2024, 1, 6), utc(2024, 1, 9)) == [
+        (utc(2024, 1, 6), utc(2024, 1, 9))]
+
+
+def test_partially_stored_period_fetches_only_the_gaps(entsoe, store):
+    key = ("A65", "A01", ZONE)
+
+    async def run():
+        await main.fetch_day_ahead_total_load_forecast(*key, "202401100000", "202401150000")
+        entsoe.windows.clear()
+        document = await main.fetch_day_ahead_total_load_forecast(*key, "202401010000", "202401200000")
+        fetched = list(entsoe.windows)
+        # Fully covered now: served from the store without upstream calls
+        again = await main.fetch_day_ahead_total_load_forecast(*key, "202401010000", "202401200000")
+        return document, fetched, again
+
+    document, fetched, again = asyncio.run(run())
+    assert fetched == [(ZONE, utc(2024, 1, 1), utc(2024, 1, 10)), (ZONE, utc(2024, 1, 15), utc(2024, 1, 20))]
+    assert len(entsoe.windows) == 2 and again == document
+
+    market_document = document["GL_MarketDocument"]
+    starts = [series["Period"]["timeInterval"]["start"] for series in market_document["TimeSeries"]]
+    assert starts == [f"2024-01-{day:02d}T00:00Z" for day in range(1, 20)]
+    assert [series["mRID"] for series in market_document["TimeSeries"]] == [str(index) for index in range(1, 20)]
+    assert all(len(series["Period"]["Point"]) == 24 for series in market_document["TimeSeries"])
+    assert market_document["time_Period.timeInterval"] == {"start": "2024-01-01T00:00Z", "end": "2024-01-20T00:00Z"}
+    assert market_document["type"] == "A65" and market_document["revisionNumber"] == "1"
+    # Three stored windows: the mRID is derived from all of their headers
+    headers = [main.parse_entsoe_document([make_gl_market_document(start, end).encode()])["GL_MarketDocument"]
+               for start, end in ((utc(2024, 1, 1), utc(2024, 1, 10)), (utc(2024, 1, 10), utc(2024, 1, 15)),
+                                  (utc(2024, 1, 15), utc(2024, 1, 20)))]
+    assert market_document["mRID"] == main.combined_entsoe_mrid(headers)
@@ -0,0 +1,52 @@
+import pytest
+
+import main
+from benchmarks.entsoe_fixtures import make_document_for_days
+
+DOCUMENT = """<?xml version="1.0" encoding="UTF-8"?>
+<GL_MarketDocument xmlns="urn:iec62325.351:tc57wg16:451-6:generationloaddocument:3:0">
+  <mRID>abc</mRID>
+  <revisionNumber>1</revisionNumber>
+  <type>A65</type>
+  <createdDateTime>2024-01-01T00:00:00Z</createdDateTime>
+  <time_Period.timeInterval><start>2024-01-01T00:00Z</start><end>2024-01-01T01:00Z</end></time_Period.timeInterval>
+  <TimeSeries>
+    <mRID>1</mRID>
+    <businessType>A04</businessType>
+    <objectAggregation>A01</objectAggregation>
+    <outBiddingZone_Domain.mRID codingScheme="A01">10YCZ-CEPS-----N</outBiddingZone_Domain.mRID>
+    <curveType>A01</curveType>
+    <Period>
+      <timeInterval><start>2024-01-01T00:00Z</start><end>2024-01-01T01:00Z</end></timeInterval>
+      <resolution>PT15M</resolution>
+      <Point><position>1</position><quantity>5133.50</quantity></Point>
+      <Point><position>2</position><quantity>5098</quantity><secondaryQuantity>1</secondaryQuantity></Point>
+      <Point><position>3</position><quantity>4933.0</quantity></Point>
+      <Point><position>4</position><quantity>1e3</quantity></Point>
+    </Period>
+  </TimeSeries>
+</GL_MarketDocument>
+"""
+
+
+def test_streaming_parser_matches_the_xmltodict_path():
+    body = DOCUMENT.encode()
+    streamed = main.parse_entsoe_document(body[i:i + 7] for i in range(0, len(body), 7))
+    assert streamed == main._parse_entsoe_xml(DOCUMENT)
+    points = streamed["GL_MarketDocument"]["TimeSeries"][0]["Period"]["Point"]
+    # Upstream text and document order are kept, also around Points with extra content
+    assert [point["position"] for point in points] == ["1", "2", "3", "4"]
+    assert points[0]["quantity"] == "5133.50" and points[3]["quantity"] == "1e3"
+    assert points[1]["secondaryQuantity"] == "1"
+
+
+def test_streaming_parser_matches_the_xmltodict_path_on_a_full_document():
+    text = make_document_for_days(3, "PT15M")
+    assert main.parse_entsoe_document([text.encode()]) == main._parse_entsoe_xml(text)
+
+
+def test_acknowledgement_document_is_rejected_with_its_reason():
+    text = ('<Acknowledgement_MarketDocument><mRID>x</mRID><Reason><code>999</code>'
+            '<text>No matching data found</text></Reason></Acknowledgement_MarketDocument>')
+    with pytest.raises(ValueError, match="No matching data found"):
+        main.parse_entsoe_document([text.encode()])
@@ -0,0 +1,36 @@
+import csv
+import io
+import json
+
+import httpx
+from fastapi.testclient import TestClient
+
+import main
+
+
+def mastr_rows(total):
+    def handler(request):
+        payload = json.loads(request.content)
+        start, limit = payload.get("startAb", 0), payload.get("limit", 100)
+        rows = [{"NetzanschlusspunktMastrNummer": f"SAN{index}", "Regelzone": "Amprion"}
+                for index in range(start, min(start + limit, total))]
+        # A field that only appears in later rows
+        for row in rows:
+            if row["NetzanschlusspunktMastrNummer"] == "SAN3":
+                row["NeuesFeld"] = "x"
+        return httpx.Response(200, json={"Ergebniscode": "OK", "AufrufVeraltet": False, "AufrufVersion": 1,
+                                         "ListeNetzanschlusspunkte[]": rows})
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def test_csv_export_keeps_fields_of_later_rows(monkeypatch):
+    monkeypatch.setitem(main._http_clients, "mastr", mastr_rows(5))
+    with TestClient(main.app) as client:
+        response = client.post("/get_liste_alle_netzanschlusspunkte/export", params={"format": "csv", "max_rows": 100},
+                               json={"marktakteurMastrNummer": "SNB1", "limit": 2})
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [row["NetzanschlusspunktMastrNummer"] for row in rows] == [f"SAN{index}" for index in range(5)]
+    assert json.loads(rows[3]["WeitereFelder"]) == {"NeuesFeld": "x"}
+    assert rows[0]["WeitereFelder"] == ""
+    # Fewer rows than max_rows: the client knows the export is complete, no (wrong) cursor header is sent
+    assert "x-next-start-ab" not in response.headers
@@ -0,0 +1,122 @@
+import asyncio
+import json
+from contextlib import closing
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+import main
+
+
+class FakeMastr:
+    """GetListeAlleNetzanschlusspunkte over a mutable row list; fail_at_start_ab answers that page with 400."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.fail_at_start_ab = None
+        self.on_page = None
+
+    def handler(self, request):
+        payload = json.loads(request.content)
+        start, limit = payload.get("startAb", 0), payload.get("limit", 100)
+        if self.on_page:
+            self.on_page(start)
+        if start == self.fail_at_start_ab:
+            return httpx.Response(400, text="bad request")
+        return httpx.Response(200, json={"Ergebniscode": "OK", "AufrufVersion": 1,
+                                         "ListeNetzanschlusspunkte[]": self.rows[start:start + limit]})
+
+
+def row(index, regelzone="Amprion"):
+    return {"NetzanschlusspunktMastrNummer": f"SAN{index}", "Regelzone": regelzone}
+
+
+@pytest.fixture
+def mirror(tmp_path, monkeypatch):
+    mirror = main.MastrMirror(str(tmp_path / "mirror.sqlite3"))
+    monkeypatch.setattr(main, "mastr_mirror", mirror)
+    monkeypatch.setattr(main, "NETZANSCHLUSSPUNKTE_PAGE_SIZE", 2)
+    return mirror
+
+
+@pytest.fixture
+def mastr(monkeypatch):
+    fake = FakeMastr([row(index) for index in range(5)])
+    monkeypatch.setitem(main._http_clients, "mastr", httpx.AsyncClient(transport=httpx.MockTransport(fake.handler)))
+    return fake
+
+
+def keys(mirror):
+    return [item["NetzanschlusspunktMastrNummer"] for item in mirror.query("SMA1", {}, 0, None)]
+
+
+def staged_rows(mirror):
+    with closing(mirror._connect()) as connection:
+        return connection.execute("SELECT COUNT(*) FROM netzanschlusspunkte_staging").fetchone()[0]
+
+
+def test_full_sync_replaces_rows_and_drops_deleted_ones(mirror, mastr):
+    asyncio.run(main.sync_mastr_mirror("SMA1"))
+    assert keys(mirror) == [f"SAN{index}" for index in range(5)]
+
+    mastr.rows = [row(0), row(2), row(4, "TenneT")]
+    result = asyncio.run(main.sync_mastr_mirror("SMA1", full=True))
+    assert result["rows"] == 3
+    assert keys(mirror) == ["SAN0", "SAN2", "SAN4"]
+    assert staged_rows(mirror) == 0
+
+
+def test_mirror_keeps_serving_the_previous_sync_during_a_full_sync(mirror, mastr):
+    asyncio.run(main.sync_mastr_mirror("SMA1"))
+    seen = []
+    mastr.on_page = lambda start: seen.append(len(keys(mirror)))
+    mastr.rows = [row(index) for index in range(3)]
+    asyncio.run(main.sync_mastr_mirror("SMA1", full=True))
+    # Every page request saw the five rows of the first sync, the swap happened at the end
+    assert seen == [5, 5]
+    assert len(keys(mirror)) == 3
+
+
+def test_failed_full_sync_keeps_the_previous_rows_and_state(mirror, mastr):
+    asyncio.run(main.sync_mastr_mirror("SMA1"))
+    state = mirror.sync_state("SMA1")
+
+    mastr.rows = [row(index) for index in range(3)]
+    mastr.fail_at_start_ab = 2
+    with pytest.raises(HTTPException):
+        asyncio.run(main.sync_mastr_mirror("SMA1", full=True))
+    assert len(keys(mirror)) == 5
+    assert mirror.sync_state("SMA1") == state
+    assert staged_rows(mirror) == 0
+
+
+def test_query_uses_the_indexed_filters(mirror, mastr):
+    mastr.rows = [row(0), row(1, "TenneT"), row(2), row(3, "TenneT")]
+    asyncio.run(main.sync_mastr_mirror("SMA1"))
+    request = main.GetListeAlleNetzanschlusspunkteRequest(marktakteurMastrNummer="SMA1", Regelzone="TenneT")
+    data = asyncio.run(main.query_mastr_mirror(request, max_age=60))
+    assert [item["NetzanschlusspunktMastrNummer"] for item in data["ListeNetzanschlusspunkte[]"]] == ["SAN1", "SAN3"]
+    assert data["Ergebniscode"] == "OK"
+
+
+def test_sync_loop_runs_once_per_interval_across_workers(monkeypatch):
+    synced = []
+
+    async def sync(marktakteur_mastr_nummer, full=False):
+        synced.append(marktakteur_mastr_nummer)
+
+    monkeypatch.setattr(main, "sync_mastr_mirror", sync)
+    monkeypatch.setattr(main, "MASTR_MIRROR_MARKTAKTEURE", ["SMA1", "SMA2"])
+    monkeypatch.setattr(main, "cache_backend", main.MemoryCacheBackend())
+
+    async def run():
+        # Three workers sharing one backend
+        workers = [asyncio.create_task(main._mirror_sync_loop()) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    asyncio.run(run())
+    assert synced == ["SMA1", "SMA2"]
@@ -0,0 +1,77 @@
+from datetime import datetime, timezone
+
+import numpy as np
+
+import main
+
+
+def make_document(*series):
+    """GL_MarketDocument with one TimeSeries per (zone, start, resolution, quantities)."""
+    return {"GL_MarketDocument": {"TimeSeries": [
+        {
+            "outBiddingZone_Domain.mRID": {"@codingScheme": "A01", "#text": zone},
+            "Period": {
+                "timeInterval": {"start": start, "end": start},
+                "resolution": resolution,
+                "Point": [{"position": str(i + 1), "quantity": str(q)} for i, q in enumerate(quantities)],
+            },
+        }
+        for zone, start, resolution, quantities in series
+    ]}}
+
+
+def utc_ms(value):
+    return int(datetime.fromisoformat(value).replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+
+# 2023-10-29 in Europe/Berlin: 25 hours from 2023-10-28T22:00Z, 02:00-03:00 local time occurs twice
+DST_DAY = make_document(("DE", "2023-10-28T22:00Z", "PT60M", range(25)))
+
+
+def resample(document, resample, aggregations, tz="Europe/Berlin"):
+    columns, step_ms = main.document_to_columns(document, align=True)
+    return main.resample_columns(columns, step_ms, resample, aggregations, tz)
+
+
+def test_day_bucket_of_a_dst_day_follows_the_local_day():
+    labels, values = resample(DST_DAY, "P1D", ["mean", "sum"])["DE"]
+    assert labels.tolist() == [utc_ms("2023-10-28T22:00")]
+    assert values["sum"].tolist() == [sum(range(25))]
+    assert values["mean"].tolist() == [12.0]
+
+
+def test_hour_buckets_keep_both_repeated_hours_of_a_dst_day():
+    labels, values = resample(DST_DAY, "PT60M", ["mean"])["DE"]
+    assert len(labels) == 25
+    assert labels.tolist() == [utc_ms("2023-10-28T22:00") + i * main.MS_PER_HOUR for i in range(25)]
+    assert values["mean"].tolist() == [float(i) for i in range(25)]
+
+
+def test_peak_buckets_follow_local_hours_and_weekdays():
+    # Sunday 2023-10-29 (DST, 25 h) and Monday 2023-10-30 (24 h) in Europe/Berlin
+    document = make_document(("DE", "2023-10-28T22:00Z", "PT60M", range(49)))
+    labels, values = resample(document, "peak", ["mean"])["DE"]
+    monday = utc_ms("2023-10-29T23:00")
+    assert labels.tolist() == [utc_ms("2023-10-28T22:00"), monday, monday]
+    assert values["peak"].tolist() == [False, False, True]
+    # Monday peak is 08:00-20:00 local, i.e. points 25 + 8 to 25 + 19
+    assert values["mean"].tolist() == [12.0, (sum(range(25, 33)) + sum(range(45, 49))) / 12, np.mean(range(33, 45))]
+
+
+def test_mixed_resolutions_are_aligned_to_the_finest():
+    document = make_document(
+        ("DE", "2024-01-01T00:00Z", "PT15M", [1, 2, 3, 4, 5, 6, 7, 8]),
+        ("FR", "2024-01-01T00:00Z", "PT60M", [10, 20]),
+    )
+    columns, step_ms = main.document_to_columns(document, align=True)
+    assert step_ms == 15 * 60_000
+    start = utc_ms("2024-01-01T00:00")
+    grid = [start + i * step_ms for i in range(8)]
+    assert columns["DE"][0].tolist() == grid
+    assert columns["FR"][0].tolist() == grid
+    assert columns["FR"][1]["quantity"].tolist() == [10] * 4 + [20] * 4
+
+    resampled = main.resample_columns(columns, step_ms, "PT60M", ["mean"])
+    assert resampled["DE"][1]["mean"].tolist() == [2.5, 6.5]
+    assert resampled["FR"][1]["mean"].tolist() == [10.0, 20.0]
+    assert resampled["DE"][0].tolist() == resampled["FR"][0].tolist() == [start, start + main.MS_PER_HOUR]
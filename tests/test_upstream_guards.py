@@ -0,0 +1,228 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+import main
+
+
+@pytest.fixture
+def guard(monkeypatch):
+    guard = main.UpstreamGuard("test", rate=1000, burst=1000)
+    guard.breaker = main.CircuitBreaker(failure_threshold=5, reset_timeout=60)
+    monkeypatch.setitem(main.upstream_guards, "test", guard)
+    monkeypatch.setattr(main, "_retry_delay", lambda attempt, error: 0)
+    return guard
+
+
+def failing(status_code, calls):
+    async def fn():
+        calls.append(status_code)
+        raise HTTPException(status_code=status_code, detail="upstream error")
+    return fn
+
+
+def open_breaker_for_trial(breaker):
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    breaker.opened_at -= breaker.reset_timeout
+
+
+# --- CircuitBreaker ---
+
+def test_breaker_opens_after_threshold_and_rejects():
+    breaker = main.CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    breaker.record_failure()
+    assert breaker.state == breaker.CLOSED and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == breaker.OPEN
+    assert not breaker.allow()
+
+
+def test_breaker_half_open_lets_one_trial_through():
+    breaker = main.CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    open_breaker_for_trial(breaker)
+    assert breaker.allow()
+    assert breaker.state == breaker.HALF_OPEN
+    assert not breaker.allow()
+
+
+def test_breaker_trial_success_closes_and_failure_reopens():
+    breaker = main.CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    open_breaker_for_trial(breaker)
+    breaker.allow()
+    breaker.record_success()
+    assert breaker.state == breaker.CLOSED and breaker.consecutive_failures == 0
+
+    open_breaker_for_trial(breaker)
+    breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == breaker.OPEN
+    assert not breaker.allow()
+
+
+# --- call_upstream ---
+
+def test_retries_retryable_status_then_succeeds(guard):
+    calls = []
+
+    async def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise HTTPException(status_code=503, detail="busy")
+        return "ok"
+
+    assert asyncio.run(main.call_upstream("test", flaky, idempotent=True)) == "ok"
+    assert len(calls) == 3 and guard.retries == 2
+    assert guard.breaker.state == guard.breaker.CLOSED
+
+
+def test_gives_up_after_max_retries(guard):
+    calls = []
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(main.call_upstream("test", failing(502, calls), idempotent=True))
+    assert error.value.status_code == 502
+    assert len(calls) == main.UPSTREAM_MAX_RETRIES + 1
+
+
+def test_non_idempotent_and_client_errors_are_not_retried(guard):
+    calls = []
+    with pytest.raises(HTTPException):
+        asyncio.run(main.call_upstream("test", failing(503, calls), idempotent=False))
+    with pytest.raises(HTTPException):
+        asyncio.run(main.call_upstream("test", failing(404, calls), idempotent=True))
+    assert calls == [503, 404]
+    # The 404 shows the upstream is up
+    assert guard.breaker.consecutive_failures == 0
+
+
+def test_upstream_500_opens_the_breaker(guard):
+    calls = []
+    for _ in range(guard.breaker.failure_threshold):
+        with pytest.raises(HTTPException) as error:
+            asyncio.run(main.call_upstream("test", failing(500, calls), idempotent=True))
+        assert error.value.status_code == 500
+    # 500 is not retried, but every one counts as a failure
+    assert len(calls) == guard.breaker.failure_threshold
+    assert guard.breaker.state == guard.breaker.OPEN
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(main.call_upstream("test", failing(500, calls), idempotent=True))
+    assert error.value.status_code == 503 and len(calls) == guard.breaker.failure_threshold
+
+
+def test_unparseable_entsoe_document_counts_as_failure(guard, monkeypatch):
+    client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(200, text="<html>")))
+    monkeypatch.setitem(main._http_clients, "entsoe", client)
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(main.call_upstream("test", lambda: main._get_entsoe({}), idempotent=True))
+    assert error.value.status_code == 500
+    assert guard.breaker.consecutive_failures == 1
+
+
+def test_rate_limit_does_not_count_as_failure(guard):
+    calls = []
+    with pytest.raises(HTTPException):
+        asyncio.run(main.call_upstream("test", failing(429, calls), idempotent=True))
+    assert len(calls) == main.UPSTREAM_MAX_RETRIES + 1
+    assert guard.breaker.consecutive_failures == 0
+
+
+def test_open_breaker_fails_fast(guard):
+    for _ in range(guard.breaker.failure_threshold):
+        guard.breaker.record_failure()
+    calls = []
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(main.call_upstream("test", failing(500, calls), idempotent=True))
+    assert error.value.status_code == 503 and not calls and guard.rejected == 1
+
+
+def test_unexpected_error_in_trial_reopens_breaker(guard):
+    open_breaker_for_trial(guard.breaker)
+
+    async def malformed():
+        raise ValueError("not JSON")
+
+    with pytest.raises(ValueError):
+        asyncio.run(main.call_upstream("test", malformed, idempotent=True))
+    assert guard.breaker.state == guard.breaker.OPEN
+    # Once the reset timeout is over, the next trial is let through again
+    guard.breaker.opened_at -= guard.breaker.reset_timeout
+
+    async def ok():
+        return "ok"
+
+    assert asyncio.run(main.call_upstream("test", ok, idempotent=True)) == "ok"
+    assert guard.breaker.state == guard.breaker.CLOSED
+
+
+def test_cancelled_trial_frees_the_trial_slot(guard):
+    open_breaker_for_trial(guard.breaker)
+
+    async def cancel_trial():
+        task = asyncio.create_task(main.call_upstream("test", lambda: asyncio.sleep(10), idempotent=True))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_trial())
+    assert guard.breaker.state == guard.breaker.HALF_OPEN
+    assert guard.breaker.allow()
+
+
+def test_rate_limited_trial_does_not_block_its_retry(guard):
+    open_breaker_for_trial(guard.breaker)
+    calls = []
+
+    async def rate_limited_once():
+        calls.append(1)
+        if len(calls) == 1:
+            raise HTTPException(status_code=429, detail="slow down")
+        return "ok"
+
+    assert asyncio.run(main.call_upstream("test", rate_limited_once, idempotent=True)) == "ok"
+    assert guard.breaker.state == guard.breaker.CLOSED
+
+
+def test_invalid_json_from_mastr_is_a_502(monkeypatch):
+    client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(200, text="<html>")))
+    monkeypatch.setitem(main._http_clients, "mastr", client)
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(main._post_mastr("GetEinheitWind", "http://mastr.test/GetEinheitWind", {"apiKey": "x"}))
+    assert error.value.status_code == 502
+
+
+# --- TokenBucket ---
+
+def test_token_bucket_serves_burst_then_waits_for_refill():
+    async def run():
+        bucket = main.TokenBucket(rate=50, burst=3)
+        started = time.monotonic()
+        for _ in range(3):
+            await bucket.acquire()
+        burst_elapsed = time.monotonic() - started
+        await bucket.acquire()
+        return burst_elapsed, time.monotonic() - started
+
+    burst_elapsed, total_elapsed = asyncio.run(run())
+    assert burst_elapsed < 0.01
+    # The fourth token takes 1 / rate seconds to refill
+    assert total_elapsed >= 0.015
+
+
+def test_token_bucket_serves_waiters_in_order():
+    async def run():
+        bucket = main.TokenBucket(rate=200, burst=1)
+        order = []
+
+        async def take(index):
+            await bucket.acquire()
+            order.append(index)
+
+        await asyncio.gather(*(take(index) for index in range(5)))
+        return order, bucket.waiting
+
+    order, waiting = asyncio.run(run())
+    assert order == list(range(5)) and waiting == 0
@@ -0,0 +1,13 @@
+from fastapi.testclient import TestClient
+
+import main
+
+
+def test_reversed_period_is_rejected_before_the_fan_out():
+    with TestClient(main.app) as client:
+        response = client.get("/day_ahead_total_load_forecast/zones", params={
+            "document_type": "A65", "process_type": "A01", "group": "CWE",
+            "period_start": "202401030000", "period_end": "202401010000",
+        })
+    assert response.status_code == 400
+    assert response.json()["detail"] == "period_end must be after period_start"
@@ -0,0 +1,44 @@
+"""
+Backfills the persistent ENTSOE store ahead of time, so later requests for that range are served from disk.
+
+Example:
+    python warmup.py --zone 10YCZ-CEPS-----N --zone 10YPL-AREA-----S --start 202301010000 --end 202401010000
+"""
+import argparse
+import asyncio
+from datetime import datetime, timezone
+
+import main
+
+
+async def warmup(zones, document_type: str, process_type: str, period_start: str, period_end: str) -> None:
+    if main.entsoe_store is None:
+        raise SystemExit("ENTSOE_STORE_PATH is empty, the persistent store is disabled")
+
+    start = main.parse_entsoe_period(period_start)
+    end = main.parse_entsoe_period(period_end)
+    # Only days that are over are stored
+    published_until = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    end = min(end, published_until)
+    if end <= start:
+        raise SystemExit("Nothing to backfill: the range must start before today (UTC)")
+
+    try:
+        for zone in zones:
+            print(f"Backfilling {zone} {main.format_entsoe_period(start)} - {main.format_entsoe_period(end)} ...")
+            await main._fill_entsoe_store(main.entsoe_store, document_type, process_type, zone, start, end)
+    except main.HTTPException as e:
+        raise SystemExit(f"Backfill failed ({e.status_code}): {e.detail}")
+    finally:
+        await main.close_http_clients()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill the persistent ENTSOE store.")
+    parser.add_argument("--zone", action="append", required=True, help="EIC code of the bidding zone (repeatable)")
+    parser.add_argument("--start", required=True, help="Start in format YYYYMMDDHHmm (UTC)")
+    parser.add_argument("--end", required=True, help="End in format YYYYMMDDHHmm (UTC)")
+    parser.add_argument("--document-type", default="A65", help="Document type (default: A65)")
+    parser.add_argument("--process-type", default="A01", help="Process type (default: A01)")
+    args = parser.parse_args()
+    asyncio.run(warmup(args.zone, args.document_type, args.process_type, args.start, args.end))